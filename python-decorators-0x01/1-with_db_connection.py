@@ -1,12 +1,13 @@
-import sqlite3 
 import functools
+from db_pool import get_pool
 
 def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections"""
+    """Decorator that automatically borrows a pooled database connection and returns it afterwards"""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open a new database connection
-        conn = sqlite3.connect('database.db')  # You can modify the database path as needed
+        # Borrow a connection from the pool for this database (WAL mode, opened once per connection)
+        pool = get_pool('database.db')  # You can modify the database path as needed
+        conn = pool.acquire()
         
         try:
             # Call the original function with the connection as the first argument
@@ -16,8 +17,8 @@ def with_db_connection(func):
             # Re-raise any exceptions that occur
             raise e
         finally:
-            # Always close the connection, whether successful or not
-            conn.close()
+            # Always return the connection; anything left uncommitted is rolled back
+            pool.release(conn)
     
     return wrapper
 
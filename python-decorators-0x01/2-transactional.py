@@ -1,12 +1,14 @@
-import sqlite3 
 import functools
+from db_pool import get_pool
+from db_transactions import batched, transactional
 
 def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections"""
+    """Decorator that automatically borrows a pooled database connection and returns it afterwards"""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open a new database connection
-        conn = sqlite3.connect('database.db')  # You can modify the database path as needed
+        # Borrow a connection from the pool for this database (WAL mode, opened once per connection)
+        pool = get_pool('database.db')  # You can modify the database path as needed
+        conn = pool.acquire()
         
         try:
             # Call the original function with the connection as the first argument
@@ -16,26 +18,8 @@ def with_db_connection(func):
             # Re-raise any exceptions that occur
             raise e
         finally:
-            # Always close the connection, whether successful or not
-            conn.close()
-    
-    return wrapper
-
-def transactional(func):
-    """Decorator that automatically handles database transactions (commit/rollback)"""
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        try:
-            # Execute the function within a transaction
-            result = func(conn, *args, **kwargs)
-            # If no exception was raised, commit the transaction
-            conn.commit()
-            return result
-        except Exception as e:
-            # If an exception occurred, rollback the transaction
-            conn.rollback()
-            # Re-raise the exception to notify the caller
-            raise e
+            # Always return the connection; anything left uncommitted is rolled back
+            pool.release(conn)
     
     return wrapper
 
@@ -45,5 +29,19 @@ def update_user_email(conn, user_id, new_email):
     cursor = conn.cursor() 
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id)) 
 
-#### Update user's email with automatic transaction handling 
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
\ No newline at end of file
+#### Queue several email updates and commit them together
+@batched(window=0.05)
+def queue_user_email_update(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+if __name__ == "__main__":
+    #### Update user's email with automatic transaction handling
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+
+    updates = [queue_user_email_update(user_id=1, new_email=email)
+               for email in ('crawford@example.com', 'Crawford_Cartwright@hotmail.com')]
+    queue_user_email_update.flush()
+    for future in updates:
+        future.result()  # Raises if the batch failed
+    print(f"Committed {len(updates)} queued email updates in one transaction")
@@ -2,6 +2,7 @@ import time
 import sqlite3 
 import functools
 from contextlib import contextmanager
+from db_pool import get_pool
 
 # Database connection decorator
 def with_db_connection(func):
@@ -11,8 +12,9 @@ def with_db_connection(func):
         if args and isinstance(args[0], sqlite3.Connection):
             return func(*args, **kwargs)
         
-        # Otherwise create a new connection
-        conn = sqlite3.connect('example.db')
+        # Otherwise borrow one from the pool for this database
+        pool = get_pool('example.db')
+        conn = pool.acquire()
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
@@ -21,7 +23,7 @@ def with_db_connection(func):
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            pool.release(conn)
     return wrapper
 
 # Retry decorator for transient errors
@@ -1,44 +1,611 @@
 import time
-import sqlite3 
+import sqlite3
 import functools
+import hashlib
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from db_pool import get_pool
+from db_transactions import database_identity, record_tables, register_cache, transactional
 
-query_cache = {}
+# Default limits of the query result cache
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+CACHE_TTL = 300.0  # Seconds a cached result stays valid
+CACHE_STRIPES = 16  # Independently locked slices of the cache
+CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024
+CACHE_DISK_TIMEOUT = 5.0  # Seconds to wait for another process holding the disk cache lock
+
+DEMO_DATABASE = 'cache_demo.db'  # Sample database used by the demo functions below
+
+def _result_size(value):
+    """Approximate memory used by a query result (a list of row tuples)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, tuple):
+                size += sum(sys.getsizeof(item) for item in row)
+    return size
+
+
+class _Flight:
+    """One in-flight execution of a query, shared by every caller waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stripe:
+    """One lock-protected slice of a QueryCache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (result, size, expires_at, tables), oldest first
+        self.by_table = {}            # (database, table) -> keys of entries that read it
+        self.inflight = {}            # key -> _Flight
+        self.bytes = 0
+        self.counters = dict.fromkeys(
+            ('hits', 'misses', 'shared', 'disk_hits', 'evictions', 'expirations', 'invalidations'), 0)
+
+
+class DiskCacheTier:
+    """
+    Second-level result cache in a SQLite file, shared by every process on
+    the host that opens the same path, so a freshly started worker can
+    reuse results computed by the others.
+
+    Results are pickled (only point it at a file your own processes
+    write). Entries expire by wall-clock time, the file is kept under
+    max_bytes by evicting the least recently used entries, and entries
+    are tagged with the tables they read so invalidations reach every
+    process. Each thread uses its own connection; WAL mode lets readers
+    proceed while another process writes.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)",
+        """
+        CREATE TABLE IF NOT EXISTS entry_tables (
+            database TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (database, table_name, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS entry_tables_key ON entry_tables (key)",
+        """
+        CREATE TABLE IF NOT EXISTS invalidations (
+            database TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            invalidated_at REAL NOT NULL,
+            PRIMARY KEY (database, table_name)
+        )
+        """,
+    )
+
+    # Reads refresh an entry's LRU position at most this often, so hits do
+    # not turn into a write each
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path, max_bytes=CACHE_DISK_MAX_BYTES, timeout=CACHE_DISK_TIMEOUT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._pending = {}  # (database, table) -> time of an invalidation not yet written
+        self._pending_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    for statement in self.SCHEMA:
+                        conn.execute(statement)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _digest(key):
+        # hash() differs between processes; the repr of the key does not
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _database(key):
+        return repr(key[0])
+
+    def get(self, key):
+        """Returns (result, tables, expires_at) for a fresh entry, or None."""
+        digest = self._digest(key)
+        now = time.time()
+        try:
+            conn = self._connection()
+            if self._pending:
+                self._flush_pending()
+            row = conn.execute("SELECT value, expires_at, accessed_at FROM entries WHERE key = ?",
+                               (digest,)).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            tables = [name for (name,) in conn.execute(
+                "SELECT table_name FROM entry_tables WHERE key = ?", (digest,))]
+            if self._reads_pending(self._database(key), tables):
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, digest))
+            return pickle.loads(row[0]), tables, row[1]
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # A locked, unavailable or corrupt disk cache, or an entry that
+            # no longer unpickles, is treated as a miss
+            return None
+
+    def put(self, key, result, tables, ttl, started_at=None):
+        """
+        Stores a result unless one of its tables was invalidated (by any
+        process) at or after started_at, then evicts expired and least
+        recently used entries until the file is within max_bytes
+        """
+        try:
+            value = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        if len(value) > self.max_bytes:
+            return False
+        digest = self._digest(key)
+        database = self._database(key)
+        tables = sorted(tables)
+        if self._pending:
+            self._flush_pending()
+        if self._reads_pending(database, tables):
+            return False
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if started_at is not None and tables:
+                    placeholders = ', '.join('?' * len(tables))
+                    stale = conn.execute(
+                        f"SELECT 1 FROM invalidations WHERE database = ? AND table_name IN ({placeholders}) "
+                        "AND invalidated_at >= ? LIMIT 1", (database, *tables, started_at)).fetchone()
+                    if stale:
+                        conn.execute("ROLLBACK")
+                        return False
+                conn.execute("DELETE FROM entry_tables WHERE key = ?", (digest,))
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (digest, value, len(value), now + ttl, now))
+                conn.executemany("INSERT INTO entry_tables VALUES (?, ?, ?)",
+                                 [(database, table, digest) for table in tables])
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+                return True
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            return False
+
+    def _evict(self, conn, now):
+        # Called inside a write transaction
+        self._delete_where(conn, "expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at LIMIT 16").fetchall()
+            if not oldest:
+                break
+            # Drop only as many of them as needed to get back within max_bytes
+            victims = []
+            for digest, size in oldest:
+                victims.append((digest,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            conn.executemany("DELETE FROM entry_tables WHERE key = ?", victims)
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    @staticmethod
+    def _delete_where(conn, condition, params):
+        conn.execute(f"DELETE FROM entry_tables WHERE key IN (SELECT key FROM entries WHERE {condition})", params)
+        conn.execute(f"DELETE FROM entries WHERE {condition}", params)
+
+    def invalidate_tables(self, database, tables):
+        """
+        Drops the entries that read the given tables of a database, in
+        every process. Never raises: if the cache file is locked or
+        unavailable, the invalidation is retried by later calls, and until
+        it goes through this process ignores disk entries that read those
+        tables. Other processes see it once it has been written.
+        """
+        database = repr(database)
+        now = time.time()
+        with self._pending_lock:
+            for table in tables:
+                self._pending[(database, table)] = now
+        return self._flush_pending()
+
+    def _flush_pending(self):
+        # Writes the invalidations not yet recorded in the file; returns the
+        # number of entries dropped, or None if the file could not be written
+        with self._pending_lock:
+            pending = dict(self._pending)
+        if not pending:
+            return 0
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                dropped = 0
+                for (database, table), invalidated_at in pending.items():
+                    conn.execute(
+                        "INSERT INTO invalidations VALUES (?, ?, ?) ON CONFLICT (database, table_name) "
+                        "DO UPDATE SET invalidated_at = MAX(invalidated_at, excluded.invalidated_at)",
+                        (database, table, invalidated_at))
+                    keys = [(digest,) for (digest,) in conn.execute(
+                        "SELECT key FROM entry_tables WHERE database = ? AND table_name = ?", (database, table))]
+                    conn.executemany("DELETE FROM entry_tables WHERE key = ?", keys)
+                    conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+                    dropped += len(keys)
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            return None
+        with self._pending_lock:
+            for item, invalidated_at in pending.items():
+                # Keep invalidations that were repeated while this one ran
+                if self._pending.get(item) == invalidated_at:
+                    del self._pending[item]
+        return dropped
+
+    def _reads_pending(self, database, tables):
+        with self._pending_lock:
+            return any((database, table) in self._pending for table in tables)
+
+    def stats(self):
+        """Returns the number of entries and their total size in bytes."""
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'entries': entries, 'bytes': size}
+
+    def close(self):
+        """Closes the calling thread's connection to the cache file."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class QueryCache:
+    """
+    LRU cache of query results, bounded by entry count and approximate
+    byte size, with a time-to-live per entry. Every entry is tagged with
+    the tables its query read, so writes can invalidate it by table.
+
+    Keys are spread over independently locked stripes, so threads working
+    on unrelated keys do not contend. The limits apply to the whole cache;
+    the LRU order is kept per stripe, and eviction takes the oldest entry
+    of each stripe in turn. get_or_load() runs at most one load per key
+    at a time.
+
+    With a DiskCacheTier as disk, misses are looked up there before the
+    query runs, and loaded results are written to it.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL,
+                 stripes=CACHE_STRIPES, disk=None):
+        self.ttl = ttl
+        self.disk = disk
+        self._stripes = [_Stripe() for _ in range(max(min(stripes, max_entries), 1))]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = 0  # Totals over every stripe, checked against the limits
+        self._bytes = 0
+        self._totals_lock = threading.Lock()
+        self._table_epochs = {}  # (database, table) -> epoch of its last invalidation
+        self._epoch = 0
+        self._epoch_lock = threading.Lock()
+        register_cache(self)
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def __contains__(self, key):
+        return key in self._stripe(key).entries
+
+    @property
+    def epoch(self):
+        """Counter bumped by every invalidation; pass it to put() to detect races."""
+        return self._epoch
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def get(self, key):
+        """Returns (True, result) for a fresh entry and (False, None) otherwise."""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return self._lookup(stripe, key)
+
+    def get_or_load(self, key, load, ttl=None):
+        """
+        Returns the cached result for key, or calls load() to produce it.
+        Concurrent callers that miss on the same key wait for a single
+        load() and share its result or exception (single flight).
+
+        Args:
+            key: Cache key; key[0] must identify the database
+            load: Callable returning (result, tables read)
+            ttl: Seconds the result stays valid (defaults to self.ttl)
+
+        Returns:
+            Tuple of (source, result), source being 'hit', 'shared', 'disk' or 'loaded'
+        """
+        stripe = self._stripe(key)
+        with stripe.lock:
+            hit, result = self._lookup(stripe, key)
+            if hit:
+                return 'hit', result
+            flight = stripe.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = stripe.inflight[key] = _Flight()
+            else:
+                stripe.counters['shared'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return 'shared', flight.result
+
+        try:
+            started_epoch = self._epoch
+            ttl = self.ttl if ttl is None else ttl
+            if self.disk is not None:
+                found = self.disk.get(key)
+                if found is not None:
+                    result, tables, expires_at = found
+                    flight.result = result
+                    self.put(key, result, tables, min(expires_at - time.time(), ttl), started_epoch)
+                    with stripe.lock:
+                        stripe.counters['disk_hits'] += 1
+                    return 'disk', result
+
+            started_at = time.time()
+            result, tables = load()
+            flight.result = result
+            self.put(key, result, tables, ttl, started_epoch)
+            if self.disk is not None:
+                self.disk.put(key, result, tables, ttl, started_at)
+            return 'loaded', result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with stripe.lock:
+                del stripe.inflight[key]
+            flight.done.set()
+
+    def put(self, key, result, tables, ttl=None, started_epoch=None):
+        """
+        Stores a result. If one of its tables was invalidated after
+        started_epoch (i.e. while the query was running), the result may
+        already be stale and is not stored.
+        """
+        database = key[0]
+        tables = frozenset((database, table) for table in tables)
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return False
+        stripe = self._stripe(key)
+        with stripe.lock:
+            # Checked under the stripe lock: invalidate_tables bumps the
+            # epochs before it clears the stripes
+            if started_epoch is not None and any(
+                    self._table_epochs.get(table, -1) > started_epoch for table in tables):
+                return False
+            if key in stripe.entries:
+                self._remove(stripe, key)
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            stripe.entries[key] = (result, size, expires_at, tables)
+            stripe.bytes += size
+            for table in tables:
+                stripe.by_table.setdefault(table, set()).add(key)
+            with self._totals_lock:
+                self._entries += 1
+                self._bytes += size
+        self._evict(self._stripes.index(stripe))
+        return True
+
+    def _over_limits(self):
+        return self._entries > self.max_entries or self._bytes > self.max_bytes
+
+    def _evict(self, start):
+        # Evicts the least recently used entry of each stripe in turn,
+        # starting after the stripe that just grew, until the cache is within
+        # its limits. Locks one stripe at a time, so puts cannot deadlock.
+        count = len(self._stripes)
+        empty = 0
+        i = start
+        while self._over_limits() and empty < count:
+            i = (i + 1) % count
+            stripe = self._stripes[i]
+            with stripe.lock:
+                if not stripe.entries:
+                    empty += 1
+                    continue
+                empty = 0
+                self._remove(stripe, next(iter(stripe.entries)))
+                stripe.counters['evictions'] += 1
+
+    def invalidate_tables(self, database, tables):
+        """Drops every entry that read one of the given tables of a database."""
+        tables = [(database, table) for table in tables]
+        with self._epoch_lock:
+            self._epoch += 1
+            for table in tables:
+                self._table_epochs[table] = self._epoch
+        dropped = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                for table in tables:
+                    for key in list(stripe.by_table.get(table, ())):
+                        self._remove(stripe, key)
+                        stripe.counters['invalidations'] += 1
+                        dropped += 1
+        if self.disk is not None:
+            self.disk.invalidate_tables(database, [table for _, table in tables])
+        return dropped
+
+    def clear(self):
+        for stripe in self._stripes:
+            with stripe.lock:
+                with self._totals_lock:
+                    self._entries -= len(stripe.entries)
+                    self._bytes -= stripe.bytes
+                stripe.entries.clear()
+                stripe.by_table.clear()
+                stripe.bytes = 0
+
+    def stats(self):
+        """Returns the hit/miss/eviction counters and the current size."""
+        totals = dict.fromkeys(('entries', 'bytes', 'hits', 'misses', 'shared', 'disk_hits',
+                                'evictions', 'expirations', 'invalidations'), 0)
+        for stripe in self._stripes:
+            with stripe.lock:
+                totals['entries'] += len(stripe.entries)
+                totals['bytes'] += stripe.bytes
+                for name, value in stripe.counters.items():
+                    totals[name] += value
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = totals['hits'] / lookups if lookups else 0.0
+        if self.disk is not None:
+            totals['disk'] = self.disk.stats()
+        return totals
+
+    def _lookup(self, stripe, key):
+        # Called with the stripe lock held
+        entry = stripe.entries.get(key)
+        if entry is not None and entry[2] < time.monotonic():
+            self._remove(stripe, key)
+            stripe.counters['expirations'] += 1
+            entry = None
+        if entry is None:
+            stripe.counters['misses'] += 1
+            return False, None
+        stripe.entries.move_to_end(key)
+        stripe.counters['hits'] += 1
+        return True, entry[0]
+
+    def _remove(self, stripe, key):
+        # Called with the stripe lock held
+        result, size, expires_at, tables = stripe.entries.pop(key)
+        stripe.bytes -= size
+        with self._totals_lock:
+            self._entries -= 1
+            self._bytes -= size
+        for table in tables:
+            keys = stripe.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del stripe.by_table[table]
+
+
+query_cache = QueryCache()
+
+
+def _hashable(params):
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params) if params is not None else ()
+
+
+def cache_query(func=None, *, ttl=None, cache=None, verbose=True):
+    """
+    Decorator that caches the results of database queries.
+
+    Results are keyed on the database file, the SQL string and its bound
+    parameters, evicted least-recently-used beyond the cache's entry and
+    byte limits, and expire after ttl seconds. Queries on in-memory
+    databases are not cached. Writes made through
+    transactional invalidate the results that read the written tables.
+    Concurrent callers that miss on the same key share one execution.
+    Use as @cache_query or @cache_query(ttl=60, verbose=False).
+    """
+    if func is None:
+        return lambda f: cache_query(f, ttl=ttl, cache=cache, verbose=verbose)
+    target = cache if cache is not None else query_cache
 
-def cache_query(func):
-    """Decorator that caches the results of database queries based on the SQL query string."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Extract the query from kwargs
+        conn = args[0] if args else kwargs.get('conn')
+
+        # Extract the query and its parameters from kwargs or args
         query = kwargs.get('query')
-        
-        # If no query found in kwargs, try to find it in args
         if query is None and len(args) > 1:
             # Assuming query is the second argument (after conn)
             query = args[1]
-        
-        if query is None:
-            # If no query parameter found, execute without caching
+        params = kwargs.get('params', args[2] if len(args) > 2 else ())
+
+        if query is None or not isinstance(conn, sqlite3.Connection) or conn.in_transaction:
+            # Without a query there is nothing to key on, and inside an open
+            # transaction results may include uncommitted writes
             return func(*args, **kwargs)
-        
-        # Check if query result is already cached
-        if query in query_cache:
-            print(f"Using cached result for query: {query}")
-            return query_cache[query]
-        
-        # Execute the query and cache the result
-        print(f"Executing query and caching result: {query}")
-        result = func(*args, **kwargs)
-        query_cache[query] = result
-        return result
-    
+
+        def load():
+            # Execute the query, noting the tables it reads
+            if verbose:
+                print(f"Executing query and caching result: {query}")
+            with record_tables(conn, 'read') as tables:
+                result = func(*args, **kwargs)
+            return result, tables
+
+        database = database_identity(conn)
+        if database is None:
+            # An in-memory database is private to its connection, so its
+            # results cannot be shared under a key
+            return func(*args, **kwargs)
+
+        key = (database, query, _hashable(params))
+        source, result = target.get_or_load(key, load, ttl)
+        if verbose and source != 'loaded':
+            print(f"Using {source if source != 'hit' else 'cached'} result for query: {query}")
+        # Hand out a copy of a cached list, so callers cannot change the cached value
+        return list(result) if isinstance(result, list) else result
+
     return wrapper
 
+
 def with_db_connection(func):
     """Decorator to handle database connection."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # For demonstration, create an in-memory SQLite database
-        conn = sqlite3.connect(':memory:')
+        # For demonstration, use a small SQLite file with sample users
+        pool = get_pool(DEMO_DATABASE)
+        conn = pool.acquire()
         try:
             # Create a sample users table for testing
             cursor = conn.cursor()
@@ -50,37 +617,86 @@ def with_db_connection(func):
                 )
             ''')
             # Insert some sample data
-            cursor.execute("INSERT OR IGNORE INTO users (name, email) VALUES ('Alice', 'alice@example.com')")
-            cursor.execute("INSERT OR IGNORE INTO users (name, email) VALUES ('Bob', 'bob@example.com')")
+            cursor.execute("INSERT OR IGNORE INTO users (id, name, email) VALUES (1, 'Alice', 'alice@example.com')")
+            cursor.execute("INSERT OR IGNORE INTO users (id, name, email) VALUES (2, 'Bob', 'bob@example.com')")
             conn.commit()
-            
+
             # Call the original function with the connection
             return func(conn, *args, **kwargs)
         finally:
-            conn.close()
+            pool.release(conn)
     return wrapper
 
 @with_db_connection
 @cache_query
-def fetch_users_with_cache(conn, query):
+def fetch_users_with_cache(conn, query, params=()):
     cursor = conn.cursor()
-    cursor.execute(query)
+    cursor.execute(query, params)
     return cursor.fetchall()
 
+@with_db_connection
+@transactional
+def add_user(conn, name, email):
+    conn.execute("INSERT INTO users (name, email) VALUES (?, ?)", (name, email))
+
 # Test the implementation
 if __name__ == "__main__":
+    # Start from the two sample users
+    import os
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(DEMO_DATABASE + suffix):
+            os.remove(DEMO_DATABASE + suffix)
+
     # First call will cache the result
     print("=== First call ===")
     users = fetch_users_with_cache(query="SELECT * FROM users")
     print(f"Users: {users}")
-    
+
     # Second call will use the cached result
     print("\n=== Second call ===")
     users_again = fetch_users_with_cache(query="SELECT * FROM users")
     print(f"Users again: {users_again}")
-    
+
     # Different query will execute fresh
     print("\n=== Different query ===")
     specific_user = fetch_users_with_cache(query="SELECT * FROM users WHERE name = 'Alice'")
     print(f"Specific user: {specific_user}")
-    
\ No newline at end of file
+
+    # Same query with different parameters is cached separately
+    print("\n=== Parameterized query ===")
+    print(fetch_users_with_cache(query="SELECT * FROM users WHERE name = ?", params=('Bob',)))
+    print(fetch_users_with_cache(query="SELECT * FROM users WHERE name = ?", params=('Alice',)))
+
+    # A write through transactional invalidates every cached query on users,
+    # so the query runs again and includes the new row
+    print("\n=== After a transactional write ===")
+    add_user(name='Carol', email='carol@example.com')
+    users = fetch_users_with_cache(query="SELECT * FROM users")
+    print(f"Users: {users}")
+
+    print(f"\nCache stats: {query_cache.stats()}")
+
+    # Disk tier: a cache created later (like a freshly started worker
+    # process) finds the result on disk instead of running the query
+    print("\n=== Disk tier ===")
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        disk_path = f"{directory}/query_cache.db"
+        warm_cache = QueryCache(disk=DiskCacheTier(disk_path))
+        cold_cache = QueryCache(disk=DiskCacheTier(disk_path))
+
+        @with_db_connection
+        @cache_query(cache=warm_cache)
+        def report_warm(conn, query):
+            return conn.execute(query).fetchall()
+
+        @with_db_connection
+        @cache_query(cache=cold_cache)
+        def report_cold(conn, query):
+            return conn.execute(query).fetchall()
+
+        print(report_warm(query="SELECT COUNT(*) FROM users"))
+        print(report_cold(query="SELECT COUNT(*) FROM users"))
+        print(f"Cold cache stats: {cold_cache.stats()}")
+        warm_cache.disk.close()
+        cold_cache.disk.close()
@@ -0,0 +1,157 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Defaults for the connection pools used by the with_db_connection decorators
+POOL_SIZE = 5
+POOL_TIMEOUT = 10.0  # Seconds to wait for a free connection
+
+# Applied once to every new connection
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",    # Readers do not block the writer and vice versa
+    "PRAGMA synchronous = NORMAL",  # Safe with WAL and much cheaper than FULL
+    "PRAGMA busy_timeout = 5000",   # Wait for locks held by other connections
+)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections to one database file.
+
+    Connections keep thread affinity: a thread gets back the connection it
+    used last whenever that one is idle, so its statement cache stays warm.
+    Idle connections of other threads are only handed over when the thread
+    has none of its own, and a new connection is opened only while fewer
+    than size exist. Connections are opened with check_same_thread=False
+    so they can change threads, but each is used by one thread at a time.
+
+    After close(), connections still checked out are closed when they are
+    released, and acquire() raises RuntimeError.
+    """
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT, pragmas=SQLITE_PRAGMAS):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self._idle = []  # (thread id, connection), most recently released last
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Checks out a connection, waiting up to timeout seconds for one to be free."""
+        thread = threading.get_ident()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool for {self.database} is closed")
+                for i in range(len(self._idle) - 1, -1, -1):
+                    if self._idle[i][0] == thread:
+                        return self._idle.pop(i)[1]
+                if self._idle:
+                    return self._idle.pop()[1]
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No connection to {self.database} available after "
+                                       f"{self.timeout:.1f}s (pool size {self.size})")
+                self._cond.wait(remaining)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        """Returns a connection, rolling back anything the caller left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append((threading.get_ident(), conn))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and returns it afterwards."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Closes the idle connections, and the others as they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for _, conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, size=None, timeout=None):
+    """
+    Returns the pool for a database file, creating it on first use.
+    Passing size or timeout reconfigures an existing pool.
+    """
+    if database != ':memory:':
+        # Relative paths name another file once the working directory changes
+        database = os.path.abspath(database)
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = ConnectionPool(database, size or POOL_SIZE,
+                                                     POOL_TIMEOUT if timeout is None else timeout)
+        else:
+            if size is not None:
+                pool.size = size
+            if timeout is not None:
+                pool.timeout = timeout
+        return pool
+
+
+@atexit.register
+def close_pools():
+    """Closes the idle connections of every pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
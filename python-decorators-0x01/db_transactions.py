@@ -0,0 +1,298 @@
+import sqlite3
+import functools
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from db_pool import get_pool
+
+# Authorizer actions that modify a table, and the argument holding the table name
+WRITE_ACTIONS = {
+    sqlite3.SQLITE_INSERT: 0,
+    sqlite3.SQLITE_UPDATE: 0,
+    sqlite3.SQLITE_DELETE: 0,
+    sqlite3.SQLITE_DROP_TABLE: 0,
+    sqlite3.SQLITE_ALTER_TABLE: 1,
+}
+
+# Caches told about committed writes, see register_cache
+_caches = weakref.WeakSet()
+
+# Table recorders active on each connection (by id), see record_tables
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+@contextmanager
+def record_tables(conn, actions):
+    """
+    Collects the names of the tables that statements executed on conn
+    inside the block read or write, using SQLite's authorizer, which sees
+    every table a statement touches, including through joins and views.
+
+    Args:
+        conn: sqlite3 connection
+        actions: 'read' or 'write'
+
+    Yields:
+        Set that receives the lower-cased table names
+    """
+    tables = set()
+    recorder = (actions, tables)
+    with _recorders_lock:
+        stack = _recorders.setdefault(id(conn), [])
+        stack.append(recorder)
+        if len(stack) == 1:
+            conn.set_authorizer(lambda action, arg1, arg2, db, trigger, stack=stack:
+                                _authorize(stack, action, arg1, arg2))
+    try:
+        yield tables
+    finally:
+        with _recorders_lock:
+            # Remove this recorder by identity; another may hold an equal set
+            del stack[next(i for i, item in enumerate(stack) if item is recorder)]
+            if not stack:
+                del _recorders[id(conn)]
+                conn.set_authorizer(None)
+
+
+def _authorize(stack, action, arg1, arg2):
+    if action == sqlite3.SQLITE_READ and arg1:
+        for actions, tables in stack:
+            if actions == 'read':
+                tables.add(arg1.lower())
+    elif action in WRITE_ACTIONS:
+        table = (arg1, arg2)[WRITE_ACTIONS[action]]
+        if table:
+            for actions, tables in stack:
+                if actions == 'write':
+                    tables.add(table.lower())
+    return sqlite3.SQLITE_OK
+
+
+def database_identity(conn):
+    """
+    Identifies the database(s) behind a connection by file path.
+
+    Returns None when one of them is in-memory or temporary: such a
+    database belongs to this connection alone, and nothing outlives the
+    connection to tell it apart from another connection's.
+    """
+    databases = tuple((name, path) for _, name, path in conn.execute("PRAGMA database_list"))
+    if not all(path for _, path in databases):
+        return None
+    return databases
+
+
+def register_cache(cache):
+    """
+    Subscribes a cache to committed writes: its invalidate_tables(database,
+    tables) is called after every transaction that wrote to a table.
+    """
+    _caches.add(cache)
+
+
+def invalidate_written(conn, tables):
+    """Tells every registered cache that tables of conn's database changed."""
+    if tables:
+        invalidate_tables(database_identity(conn), tables)
+
+
+def invalidate_tables(database, tables):
+    """
+    Tells every registered cache that tables of the database identified
+    by database (see database_identity) changed.
+    """
+    if database is None or not tables:
+        return
+    for cache in list(_caches):
+        cache.invalidate_tables(database, tables)
+
+
+def transactional(func):
+    """
+    Decorator that runs the function in a transaction (commit/rollback)
+    and, once committed, invalidates cached results of the tables it wrote
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        with record_tables(conn, 'write') as written:
+            try:
+                # Execute the function within a transaction
+                result = func(conn, *args, **kwargs)
+                # If no exception was raised, commit the transaction
+                conn.commit()
+            except Exception as e:
+                # If an exception occurred, rollback the transaction
+                conn.rollback()
+                # Re-raise the exception to notify the caller
+                raise e
+        invalidate_written(conn, written)
+        return result
+
+    return wrapper
+
+
+class RecordingConnection:
+    """Stand-in connection that records the writes a function makes instead of running them"""
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, parameters=()):
+        self.statements.append((sql, parameters))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        for parameters in seq_of_parameters:
+            self.execute(sql, parameters)
+        return self
+
+    def commit(self):
+        # The batch commits once for all queued calls
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def fetchone(self):
+        raise TypeError("Batched functions can only write; results are not available until the batch runs")
+
+    fetchall = fetchmany = fetchone
+
+
+def batched(window=0.05, max_batch=500, database='database.db'):
+    """
+    Decorator that queues calls to a write function and runs them together.
+
+    Each call runs the function against a RecordingConnection and returns a
+    Future. Queued calls are flushed window seconds after the first one, as
+    soon as max_batch are waiting, or when wrapper.flush() is called. The
+    flush borrows one pooled connection, turns each run of identical
+    statements into one executemany and commits once, then invalidates
+    cached results of the tables written, like transactional. The futures
+    resolve to the function's return values. A call whose statements fail
+    fails only its own future (see _run_batch).
+    """
+    def decorator(func):
+        pending = []
+        lock = threading.Lock()
+        flush_lock = threading.Lock()  # Keeps batches in submission order
+        timer = None
+
+        def flush():
+            nonlocal pending, timer
+            with flush_lock:
+                with lock:
+                    calls, pending = pending, []
+                    if timer is not None:
+                        timer.cancel()
+                        timer = None
+                if not calls:
+                    return 0
+
+                # Record every call; a call that raises only fails its own future
+                recorded = []
+                for args, kwargs, future in calls:
+                    proxy = RecordingConnection()
+                    try:
+                        result = func(proxy, *args, **kwargs)
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+                    recorded.append((future, result, proxy.statements))
+                if recorded:
+                    _run_batch(database, recorded)
+                return len(calls)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal timer
+            future = Future()
+            with lock:
+                pending.append((args, kwargs, future))
+                full = len(pending) >= max_batch
+                if not full and timer is None:
+                    timer = threading.Timer(window, flush)
+                    timer.start()
+            if full:
+                flush()
+            return future
+
+        wrapper.flush = flush
+        return wrapper
+
+    return decorator
+
+
+def _execute_grouped(conn, statements):
+    # Turns each run of identical statements into one executemany
+    groups = []
+    for sql, parameters in statements:
+        if groups and groups[-1][0] == sql:
+            groups[-1][1].append(parameters)
+        else:
+            groups.append((sql, [parameters]))
+    for sql, rows in groups:
+        conn.executemany(sql, rows)
+
+
+def _run_batch(database, recorded):
+    """
+    Runs the recorded calls of a batch in one transaction and resolves
+    their futures. If the batch fails, it is rolled back and retried with
+    each call in its own savepoint, so a bad call fails only its own
+    future. Any other error, including no connection being available,
+    fails every future; this never raises.
+    """
+    done = []
+    try:
+        pool = get_pool(database)
+        conn = pool.acquire()
+        try:
+            # Identified now: once released, the connection may be in use
+            # by another thread, or closed if the pool was closed
+            identity = database_identity(conn)
+            with record_tables(conn, 'write') as written:
+                try:
+                    _execute_grouped(conn, [statement for _, _, statements in recorded
+                                            for statement in statements])
+                    conn.commit()
+                    done = [(future, result) for future, result, _ in recorded]
+                except Exception:
+                    conn.rollback()
+                    conn.execute("BEGIN")
+                    for future, result, statements in recorded:
+                        conn.execute("SAVEPOINT batched_call")
+                        try:
+                            _execute_grouped(conn, statements)
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO batched_call")
+                            future.set_exception(e)
+                        else:
+                            done.append((future, result))
+                        conn.execute("RELEASE batched_call")
+                    conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            pool.release(conn)
+    except Exception as e:
+        for future, _, _ in recorded:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    # Committed: invalidate before the callers can read, then resolve
+    try:
+        invalidate_tables(identity, written)
+    finally:
+        for future, result in done:
+            future.set_result(result)
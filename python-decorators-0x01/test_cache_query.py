@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the query cache in 4-cache_query.py.
+"""
+
+import importlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from db_transactions import transactional
+
+cache_query_module = importlib.import_module('4-cache_query')
+QueryCache = cache_query_module.QueryCache
+DiskCacheTier = cache_query_module.DiskCacheTier
+cache_query = cache_query_module.cache_query
+
+DATABASE = (('main', '/tmp/users.db'),)
+
+
+def make_key(query, params=()):
+    """Builds a cache key for the DATABASE test identity."""
+    return (DATABASE, query, params)
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Base class giving each test a temporary directory."""
+
+    def setUp(self):
+        """Creates the temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_users_db(self, count=8):
+        """Creates a users database file and returns its path."""
+        path = os.path.join(self.directory, 'users.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         [(f"user{i}", f"user{i}@example.com") for i in range(count)])
+        conn.commit()
+        conn.close()
+        return path
+
+    def connect(self, path):
+        """Opens a connection that is closed when the test ends."""
+        conn = sqlite3.connect(path, check_same_thread=False)
+        self.addCleanup(conn.close)
+        return conn
+
+
+class TestQueryCache(unittest.TestCase):
+    """Tests for the in-memory QueryCache."""
+
+    def test_put_and_get(self):
+        """Test that a stored result is returned until it expires."""
+        cache = QueryCache()
+        cache.put(make_key('a'), [(1,)], ['users'])
+        cache.put(make_key('b'), [(2,)], ['users'], ttl=-1)
+        self.assertEqual(cache.get(make_key('a')), (True, [(1,)]))
+        self.assertEqual(cache.get(make_key('b')), (False, None))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_entry_limit_is_global(self):
+        """Test that max_entries bounds the whole cache, not each stripe."""
+        cache = QueryCache(max_entries=8, stripes=4)
+        for i in range(20):
+            cache.put(make_key(f"q{i}"), [(i,)], ['users'])
+            self.assertLessEqual(len(cache), 8)
+        self.assertEqual(len(cache), 8)
+        self.assertIn(make_key('q19'), cache)
+        self.assertEqual(cache.stats()['evictions'], 12)
+
+    def test_byte_limit_is_global(self):
+        """Test that one entry may use the whole byte budget of the cache."""
+        small = [(i,) for i in range(10)]
+        size = cache_query_module._result_size(small)
+        cache = QueryCache(max_bytes=size * 3, stripes=16)
+        self.assertTrue(cache.put(make_key('big'), small, ['users']))
+        cache.put(make_key('b'), small, ['users'])
+        cache.put(make_key('c'), small, ['users'])
+        cache.put(make_key('d'), small, ['users'])
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 3)
+        self.assertLessEqual(stats['bytes'], size * 3)
+        self.assertFalse(cache.put(make_key('huge'), small * 4, ['users']))
+
+    def test_lru_order_within_a_stripe(self):
+        """Test that a read keeps an entry from being evicted first."""
+        cache = QueryCache(max_entries=2, stripes=1)
+        cache.put(make_key('a'), [(1,)], ['users'])
+        cache.put(make_key('b'), [(2,)], ['users'])
+        cache.get(make_key('a'))
+        cache.put(make_key('c'), [(3,)], ['users'])
+        self.assertIn(make_key('a'), cache)
+        self.assertNotIn(make_key('b'), cache)
+
+    def test_invalidate_tables(self):
+        """Test that invalidation drops only entries that read the table."""
+        cache = QueryCache()
+        cache.put(make_key('users'), [(1,)], ['users'])
+        cache.put(make_key('orders'), [(2,)], ['orders'])
+        cache.put(make_key('other database'), [(3,)], ['users'])
+        other = ((('main', '/tmp/other.db'),), 'users', ())
+        cache.put(other, [(4,)], ['users'])
+        self.assertEqual(cache.invalidate_tables(DATABASE, ['users']), 2)
+        self.assertNotIn(make_key('users'), cache)
+        self.assertIn(make_key('orders'), cache)
+        self.assertIn(other, cache)
+
+    def test_put_after_invalidation_is_rejected(self):
+        """Test that a result loaded across an invalidation is not stored."""
+        cache = QueryCache()
+        epoch = cache.epoch
+        cache.invalidate_tables(DATABASE, ['users'])
+        self.assertFalse(cache.put(make_key('a'), [(1,)], ['users'], started_epoch=epoch))
+        self.assertTrue(cache.put(make_key('b'), [(1,)], ['orders'], started_epoch=epoch))
+
+    def test_single_flight(self):
+        """Test that concurrent misses on a key share one load."""
+        threads, keys = 32, 4
+        cache = QueryCache()
+        loads = {}
+        loads_lock = threading.Lock()
+        start_together = threading.Barrier(threads)
+
+        def load(i):
+            with loads_lock:
+                loads[i] = loads.get(i, 0) + 1
+            time.sleep(0.05)  # Keep the load in flight while the others arrive
+            return [(i,)], {'users'}
+
+        def worker(n):
+            i = n % keys
+            start_together.wait()
+            return cache.get_or_load(make_key('q', (i,)), lambda: load(i))[1]
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+
+        self.assertEqual(loads, {i: 1 for i in range(keys)})
+        self.assertEqual(results, [[(n % keys,)] for n in range(threads)])
+        self.assertEqual(cache.stats()['shared'], threads - keys)
+
+    def test_single_flight_shares_errors(self):
+        """Test that waiting callers get the leader's exception."""
+        cache = QueryCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def load():
+            started.set()
+            release.wait()
+            raise sqlite3.OperationalError("no such table: users")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(cache.get_or_load, make_key('q'), load)
+            started.wait()
+            follower = pool.submit(cache.get_or_load, make_key('q'), load)
+            while cache.stats()['shared'] == 0:
+                time.sleep(0.001)
+            release.set()
+            with self.assertRaises(sqlite3.OperationalError):
+                leader.result()
+            with self.assertRaises(sqlite3.OperationalError):
+                follower.result()
+        self.assertNotIn(make_key('q'), cache)
+
+
+class TestCacheQuery(TempDirTestCase):
+    """Tests for the cache_query decorator."""
+
+    def setUp(self):
+        """Creates a database, a private cache and a cached query function."""
+        super().setUp()
+        self.path = self.make_users_db()
+        self.cache = QueryCache()
+        self.calls = 0
+
+        @cache_query(cache=self.cache, verbose=False)
+        def fetch(conn, query, params=()):
+            self.calls += 1
+            return conn.execute(query, params).fetchall()
+
+        self.fetch = fetch
+
+    def test_repeated_query_is_cached(self):
+        """Test that the second identical query is served from the cache."""
+        conn = self.connect(self.path)
+        first = self.fetch(conn, "SELECT name FROM users WHERE id = ?", (1,))
+        second = self.fetch(conn, "SELECT name FROM users WHERE id = ?", (1,))
+        self.assertEqual(first, [('user0',)])
+        self.assertEqual(second, first)
+        self.assertEqual(self.calls, 1)
+        self.fetch(conn, "SELECT name FROM users WHERE id = ?", (2,))
+        self.assertEqual(self.calls, 2)
+
+    def test_results_are_returned_unchanged(self):
+        """Test that None, scalars and single rows come back as the function returned them."""
+        conn = self.connect(self.path)
+
+        @cache_query(cache=self.cache, verbose=False)
+        def fetch_one(conn, query, params=()):
+            return conn.execute(query, params).fetchone()
+
+        @cache_query(cache=self.cache, verbose=False)
+        def fetch_count(conn, query):
+            return conn.execute(query).fetchone()[0]
+
+        for _ in range(2):
+            self.assertIsNone(fetch_one(conn, "SELECT name FROM users WHERE id = ?", (999,)))
+            self.assertEqual(fetch_one(conn, "SELECT id, name FROM users WHERE id = ?", (1,)), (1, 'user0'))
+            self.assertEqual(fetch_count(conn, "SELECT COUNT(*) FROM users"), 8)
+        self.assertEqual(self.cache.stats()['hits'], 3)
+
+    def test_cached_list_cannot_be_changed(self):
+        """Test that changing a returned list does not change the cached result."""
+        conn = self.connect(self.path)
+        first = self.fetch(conn, "SELECT id FROM users")
+        first.clear()
+        self.assertEqual(len(self.fetch(conn, "SELECT id FROM users")), 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_transactional_write_invalidates(self):
+        """Test that a committed write makes the next query run again."""
+        conn = self.connect(self.path)
+
+        @transactional
+        def rename(conn, user_id, name):
+            conn.execute("UPDATE users SET name = ? WHERE id = ?", (name, user_id))
+
+        self.fetch(conn, "SELECT name FROM users WHERE id = ?", (1,))
+        rename(self.connect(self.path), 1, 'renamed')
+        self.assertEqual(self.fetch(conn, "SELECT name FROM users WHERE id = ?", (1,)), [('renamed',)])
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_transaction_keeps_cache(self):
+        """Test that a rolled back write does not invalidate."""
+        conn = self.connect(self.path)
+
+        @transactional
+        def failing_write(conn):
+            conn.execute("DELETE FROM users")
+            raise ValueError("abort")
+
+        self.fetch(conn, "SELECT COUNT(*) FROM users")
+        with self.assertRaises(ValueError):
+            failing_write(self.connect(self.path))
+        self.assertEqual(self.fetch(conn, "SELECT COUNT(*) FROM users"), [(8,)])
+        self.assertEqual(self.calls, 1)
+
+    def test_in_memory_database_is_not_cached(self):
+        """Test that queries on private in-memory databases always run."""
+        first = self.connect(':memory:')
+        second = self.connect(':memory:')
+        first.execute("CREATE TABLE users (name TEXT)")
+        first.execute("INSERT INTO users VALUES ('first')")
+        second.execute("CREATE TABLE users (name TEXT)")
+        second.execute("INSERT INTO users VALUES ('second')")
+        first.commit()
+        second.commit()
+        self.assertEqual(self.fetch(first, "SELECT name FROM users"), [('first',)])
+        self.assertEqual(self.fetch(second, "SELECT name FROM users"), [('second',)])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_open_transaction_bypasses_cache(self):
+        """Test that queries inside an open transaction are not cached."""
+        conn = self.connect(self.path)
+        conn.execute("DELETE FROM users WHERE id = 1")
+        self.assertEqual(self.fetch(conn, "SELECT COUNT(*) FROM users"), [(7,)])
+        conn.rollback()
+        self.assertEqual(self.fetch(conn, "SELECT COUNT(*) FROM users"), [(8,)])
+        self.assertEqual(self.calls, 2)
+
+
+class TestDiskCacheTier(TempDirTestCase):
+    """Tests for the shared disk tier."""
+
+    def setUp(self):
+        """Creates a disk cache file path."""
+        super().setUp()
+        self.disk_path = os.path.join(self.directory, 'query_cache.db')
+
+    def make_tier(self, **kwargs):
+        """Opens a DiskCacheTier that is closed when the test ends."""
+        tier = DiskCacheTier(self.disk_path, **kwargs)
+        self.addCleanup(tier.close)
+        return tier
+
+    def test_cold_cache_reads_disk(self):
+        """Test that a second cache finds a result the first one loaded."""
+        warm = QueryCache(disk=self.make_tier())
+        cold = QueryCache(disk=self.make_tier())
+        warm.get_or_load(make_key('q'), lambda: ([(1,)], {'users'}))
+        source, result = cold.get_or_load(make_key('q'), lambda: self.fail("query ran again"))
+        self.assertEqual((source, result), ('disk', [(1,)]))
+
+    def test_invalidation_reaches_other_caches(self):
+        """Test that invalidating one cache drops the entry on disk."""
+        first = QueryCache(disk=self.make_tier())
+        second = QueryCache(disk=self.make_tier())
+        first.get_or_load(make_key('q'), lambda: ([(1,)], {'users'}))
+        first.invalidate_tables(DATABASE, ['users'])
+        source, result = second.get_or_load(make_key('q'), lambda: ([(2,)], {'users'}))
+        self.assertEqual((source, result), ('loaded', [(2,)]))
+
+    def test_put_after_invalidation_is_rejected(self):
+        """Test that a result loaded across another process's invalidation is not stored."""
+        tier = self.make_tier()
+        started_at = time.time()
+        self.make_tier().invalidate_tables(DATABASE, ['users'])
+        self.assertFalse(tier.put(make_key('q'), [(1,)], ['users'], 60, started_at))
+        self.assertIsNone(tier.get(make_key('q')))
+
+    def test_locked_file_does_not_raise(self):
+        """Test that invalidating a locked cache file defers instead of raising."""
+        tier = self.make_tier(timeout=0.05)
+        cache = QueryCache(disk=tier)
+        cache.get_or_load(make_key('q'), lambda: ([(1,)], {'users'}))
+        other = self.make_tier()
+
+        locker = sqlite3.connect(self.disk_path, isolation_level=None)
+        self.addCleanup(locker.close)
+        locker.execute("BEGIN EXCLUSIVE")
+        cache.invalidate_tables(DATABASE, ['users'])
+        self.assertNotIn(make_key('q'), cache)
+        self.assertFalse(tier.put(make_key('q'), [(1,)], ['users'], 60))
+        locker.execute("ROLLBACK")
+
+        # Other processes still see the entry until the retry goes through
+        self.assertIsNotNone(other.get(make_key('q')))
+        self.assertIsNone(tier.get(make_key('q')))
+        self.assertIsNone(other.get(make_key('q')))
+
+    def test_corrupt_file_is_a_miss(self):
+        """Test that a cache file that is not a database does not raise."""
+        with open(self.disk_path, 'wb') as out:
+            out.write(b'x' * 4096)
+        tier = self.make_tier()
+        self.assertFalse(tier.put(make_key('q'), [(1,)], ['users'], 60))
+        self.assertIsNone(tier.get(make_key('q')))
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Test that an entry that does not unpickle is treated as a miss."""
+        tier = self.make_tier()
+        cache = QueryCache(disk=tier)
+        tier.put(make_key('q'), [(1,)], ['users'], 60)
+        tier._connection().execute("UPDATE entries SET value = ?", (b'\x80\x05broken',))
+        self.assertIsNone(tier.get(make_key('q')))
+        source, result = cache.get_or_load(make_key('q'), lambda: ([(2,)], {'users'}))
+        self.assertEqual((source, result), ('loaded', [(2,)]))
+
+    def test_max_bytes(self):
+        """Test that the file is kept within max_bytes."""
+        tier = self.make_tier(max_bytes=2000)
+        for i in range(20):
+            tier.put(make_key(f"q{i}"), [(i, 'x' * 200)], ['users'], 60)
+        self.assertLessEqual(tier.stats()['bytes'], 2000)
+        self.assertIsNotNone(tier.get(make_key('q19')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite connection pools in db_pool.py.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import db_pool
+from db_pool import ConnectionPool, get_pool
+
+
+class PoolTestCase(unittest.TestCase):
+    """Base class giving each test a database file in a temporary directory."""
+
+    def setUp(self):
+        """Creates the database file."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'users.db')
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+
+    def make_pool(self, **kwargs):
+        """Creates a pool that is closed when the test ends."""
+        pool = ConnectionPool(self.path, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+
+class TestConnectionPool(PoolTestCase):
+    """Tests for ConnectionPool."""
+
+    def test_connection_is_reused(self):
+        """Test that a released connection is handed out again."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+
+    def test_pragmas_are_applied(self):
+        """Test that new connections use WAL mode."""
+        pool = self.make_pool()
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_thread_gets_its_own_connection_back(self):
+        """Test that a thread prefers the idle connection it used last."""
+        pool = self.make_pool()
+        mine = pool.acquire()
+        theirs = []
+
+        def other_thread():
+            theirs.append(pool.acquire())
+            pool.release(theirs[0])
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        pool.release(mine)
+        self.assertIsNot(theirs[0], mine)
+        self.assertIs(pool.acquire(), mine)
+
+    def test_timeout(self):
+        """Test that acquire gives up when every connection is checked out."""
+        pool = self.make_pool(size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+
+    def test_release_rolls_back(self):
+        """Test that uncommitted writes are rolled back on release."""
+        pool = self.make_pool(size=1)
+        conn = pool.acquire()
+        conn.execute("INSERT INTO users (name) VALUES ('uncommitted')")
+        pool.release(conn)
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 0)
+
+    def test_release_after_close_closes_connection(self):
+        """Test that a connection released into a closed pool is closed."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.close()
+        pool.release(conn)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual(pool._open, 0)
+
+    def test_acquire_after_close_raises(self):
+        """Test that a closed pool hands out no connections."""
+        pool = self.make_pool()
+        pool.close()
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+
+class TestGetPool(PoolTestCase):
+    """Tests for get_pool."""
+
+    def setUp(self):
+        """Closes the shared pools after each test."""
+        super().setUp()
+        self.addCleanup(db_pool.close_pools)
+
+    def test_relative_and_absolute_paths_share_a_pool(self):
+        """Test that pools are keyed on the absolute path of the database."""
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.addCleanup(os.chdir, cwd)
+        pool = get_pool('users.db')
+        self.assertIs(get_pool(self.path), pool)
+        self.assertEqual(pool.database, self.path)
+
+        # The pool keeps using the same file after the directory changes
+        os.chdir(cwd)
+        with pool.connection() as conn:
+            path = conn.execute("PRAGMA database_list").fetchone()[2]
+        self.assertEqual(os.path.realpath(path), os.path.realpath(self.path))
+
+    def test_reconfigure(self):
+        """Test that size and timeout reconfigure an existing pool."""
+        pool = get_pool(self.path)
+        self.assertIs(get_pool(self.path, size=2, timeout=1.0), pool)
+        self.assertEqual((pool.size, pool.timeout), (2, 1.0))
+
+    def test_close_pools(self):
+        """Test that close_pools forgets the pools it closed."""
+        pool = get_pool(self.path)
+        db_pool.close_pools()
+        self.assertIsNot(get_pool(self.path), pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
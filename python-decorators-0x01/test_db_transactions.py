@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the transaction helpers in db_transactions.py.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import db_pool
+from db_transactions import (RecordingConnection, batched, database_identity,
+                             record_tables, register_cache, transactional)
+
+
+class FakeCache:
+    """Cache stand-in that records the invalidations it receives."""
+
+    def __init__(self):
+        self.invalidations = []
+
+    def invalidate_tables(self, database, tables):
+        """Records an invalidation."""
+        self.invalidations.append((database, set(tables)))
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base class giving each test a users database and a registered cache."""
+
+    def setUp(self):
+        """Creates the database and registers a FakeCache."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(db_pool.close_pools)
+        self.path = os.path.join(self.directory, 'users.db')
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT UNIQUE)")
+        conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER)")
+        conn.executemany("INSERT INTO users VALUES (?, ?)", [(1, 'a@example.com'), (2, 'b@example.com')])
+        conn.commit()
+        conn.close()
+        self.cache = FakeCache()
+        register_cache(self.cache)
+
+    def connect(self):
+        """Opens a connection that is closed when the test ends."""
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def emails(self):
+        """Returns the stored emails by id."""
+        conn = self.connect()
+        return dict(conn.execute("SELECT id, email FROM users"))
+
+
+class TestRecordTables(DatabaseTestCase):
+    """Tests for record_tables and database_identity."""
+
+    def test_records_reads_and_writes(self):
+        """Test that reads and writes are recorded separately."""
+        conn = self.connect()
+        with record_tables(conn, 'read') as read, record_tables(conn, 'write') as written:
+            conn.execute("INSERT INTO orders (user_id) SELECT id FROM users")
+        self.assertEqual(read, {'users'})
+        self.assertEqual(written, {'orders'})
+
+    def test_database_identity(self):
+        """Test that file databases are identified by path and in-memory ones are not."""
+        self.assertEqual(database_identity(self.connect()), (('main', os.path.realpath(self.path)),))
+        self.assertIsNone(database_identity(sqlite3.connect(':memory:')))
+
+
+class TestTransactional(DatabaseTestCase):
+    """Tests for the transactional decorator."""
+
+    def test_commit_invalidates(self):
+        """Test that a committed write is saved and reported to caches."""
+        @transactional
+        def update(conn, user_id, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+
+        conn = self.connect()
+        update(conn, 1, 'new@example.com')
+        self.assertEqual(self.emails()[1], 'new@example.com')
+        self.assertEqual(self.cache.invalidations, [(database_identity(conn), {'users'})])
+
+    def test_rollback(self):
+        """Test that a failing function is rolled back and not reported."""
+        @transactional
+        def update(conn):
+            conn.execute("UPDATE users SET email = 'lost@example.com' WHERE id = 1")
+            raise ValueError("abort")
+
+        with self.assertRaises(ValueError):
+            update(self.connect())
+        self.assertEqual(self.emails()[1], 'a@example.com')
+        self.assertEqual(self.cache.invalidations, [])
+
+
+class TestRecordingConnection(unittest.TestCase):
+    """Tests for RecordingConnection."""
+
+    def test_records_statements(self):
+        """Test that statements are recorded and reads are refused."""
+        conn = RecordingConnection()
+        conn.cursor().execute("UPDATE users SET email = ? WHERE id = ?", ('x', 1))
+        conn.executemany("DELETE FROM users WHERE id = ?", [(2,), (3,)])
+        self.assertEqual(conn.statements, [
+            ("UPDATE users SET email = ? WHERE id = ?", ('x', 1)),
+            ("DELETE FROM users WHERE id = ?", (2,)),
+            ("DELETE FROM users WHERE id = ?", (3,)),
+        ])
+        with self.assertRaises(TypeError):
+            conn.fetchall()
+
+
+class TestBatched(DatabaseTestCase):
+    """Tests for the batched decorator."""
+
+    def make_update(self, window=60):
+        """Returns a batched email update for the test database."""
+        @batched(window=window, database=self.path)
+        def update(conn, user_id, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+            return user_id
+        self.addCleanup(update.flush)
+        return update
+
+    def test_flush_commits_together(self):
+        """Test that queued calls are committed by flush and resolve their futures."""
+        update = self.make_update()
+        futures = [update(1, 'x@example.com'), update(2, 'y@example.com')]
+        self.assertFalse(any(future.done() for future in futures))
+        self.assertEqual(update.flush(), 2)
+        self.assertEqual([future.result() for future in futures], [1, 2])
+        self.assertEqual(self.emails(), {1: 'x@example.com', 2: 'y@example.com'})
+        self.assertEqual(len(self.cache.invalidations), 1)
+        self.assertEqual(self.cache.invalidations[0][1], {'users'})
+
+    def test_window_flushes(self):
+        """Test that the timer flushes the batch after the window."""
+        update = self.make_update(window=0.01)
+        self.assertEqual(update(1, 'x@example.com').result(timeout=5), 1)
+
+    def test_bad_call_fails_alone(self):
+        """Test that a call violating a constraint fails only its own future."""
+        update = self.make_update()
+        first = update(1, 'x@example.com')
+        duplicate = update(2, 'x@example.com')
+        last = update(1, 'z@example.com')
+        update.flush()
+        self.assertIsInstance(duplicate.exception(), sqlite3.IntegrityError)
+        self.assertEqual((first.result(), last.result()), (1, 1))
+        self.assertEqual(self.emails(), {1: 'z@example.com', 2: 'b@example.com'})
+
+    def test_raising_function_fails_alone(self):
+        """Test that a call raising while recorded fails only its own future."""
+        @batched(window=60, database=self.path)
+        def update(conn, user_id, email):
+            if email is None:
+                raise ValueError("email is required")
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+
+        good = update(1, 'x@example.com')
+        bad = update(2, None)
+        update.flush()
+        self.assertIsNone(good.result())
+        self.assertIsInstance(bad.exception(), ValueError)
+
+    def test_no_connection_fails_every_future(self):
+        """Test that a pool timeout fails the futures instead of leaving them pending."""
+        pool = db_pool.get_pool(self.path, size=1, timeout=0.05)
+        held = pool.acquire()
+        self.addCleanup(pool.release, held)
+        update = self.make_update()
+        futures = [update(1, 'x@example.com'), update(2, 'y@example.com')]
+        update.flush()
+        for future in futures:
+            self.assertIsInstance(future.exception(timeout=1), TimeoutError)
+        self.assertEqual(self.cache.invalidations, [])
+
+    def test_pool_closed_during_batch(self):
+        """Test that a batch whose pool closes before the connection is released still invalidates."""
+        class ClosingPool(db_pool.ConnectionPool):
+            def acquire(self):
+                conn = super().acquire()
+                self.close()
+                return conn
+
+        update = self.make_update()
+        future = update(1, 'x@example.com')
+        with patch('db_transactions.get_pool', return_value=ClosingPool(self.path)):
+            update.flush()
+        self.assertEqual(future.result(), 1)
+        self.assertEqual(self.cache.invalidations[0][1], {'users'})
+
+    def test_max_batch(self):
+        """Test that a full batch is flushed by the call that fills it."""
+        @batched(window=60, max_batch=2, database=self.path)
+        def update(conn, user_id, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+
+        first = update(1, 'x@example.com')
+        second = update(2, 'y@example.com')
+        self.assertTrue(first.done() and second.done())
+        self.assertEqual(self.emails(), {1: 'x@example.com', 2: 'y@example.com'})
+
+
+if __name__ == '__main__':
+    unittest.main()
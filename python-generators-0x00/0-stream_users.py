@@ -1,44 +1,162 @@
-from typing import Generator, Dict, Any
-from seed import DatabaseManager  # Import the DatabaseManager from seed.py
+import os
+import time
+from typing import Generator, Dict, Any, Optional
+from seed import (DatabaseManager, Condition, compile_filter, uses_binary_user_ids, user_columns_sql,
+                  open_stream_cursor, close_stream_cursor, get_instrumentation, logger,
+                  encode_cursor, decode_cursor)  # Shared database helpers from seed.py
 import mysql.connector
 from mysql.connector import Error
 
-def stream_users() -> Generator[Dict[str, Any], None, None]:
+# Defaults for stream_users_resumable
+CHECKPOINT_EVERY = 1000
+RESUMABLE_PAGE_SIZE = 1000
+MAX_RETRIES = 5
+RETRY_DELAY = 1.0
+
+def stream_users(where: Optional[Condition] = None) -> Generator[Dict[str, Any], None, None]:
     """
     Generator function that streams rows from user_data table one by one
     using yield. Only contains one loop.
     Uses DatabaseManager from seed.py to handle database connections.
     
+    Args:
+        where: Optional filter such as col('age') > 25. Whatever can be
+            expressed in SQL is sent as a WHERE clause; the rest is
+            applied to the fetched rows.
+    
     Yields:
         Dictionary containing user data (user_id, name, email, age)
     """
     db_manager = None
     cursor = None
+    rows_read = 0
     
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
+        # Check out a connection to ALX_prodev from the shared pool
         db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()  # Use the class method
+        connection = db_manager.connect_to_prodev(pooled=True)  # Reuse a pooled connection
         
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor(dictionary=True)
+        # Unbuffered cursor: rows are read from the server as they are fetched
+        cursor = open_stream_cursor(connection, dictionary=True)
         
-        # Execute query
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        # Execute query, pushing the filter down where possible
+        binary_ids = uses_binary_user_ids(connection)
+        where_clause, params, residual = compile_filter(where, binary_ids)
+        cursor.execute(f"SELECT {user_columns_sql(binary_ids)} FROM user_data" + where_clause, params)
         
         # Single loop that yields rows one by one
         while True:
             row = cursor.fetchone()  # Get one row at a time
             if row is None:  # No more rows
                 break
-            yield dict(row)  # Yield the row as a dictionary
+            rows_read += 1
+            if residual is None or residual(row):
+                yield dict(row)  # Yield the row as a dictionary
             
     except Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         raise
     finally:
         # Clean up resources
+        get_instrumentation().count('rows_read', rows_read)  # Counted once, not per row
         if cursor:
-            cursor.close()
+            close_stream_cursor(cursor, connection)
         if db_manager:
-            db_manager.close_connection()  # Use the class's cleanup method
+            db_manager.close_connection()  # Return the connection to the pool
+
+
+def load_checkpoint(checkpoint_path: str) -> Optional[str]:
+    """
+    Reads the cursor token saved by save_checkpoint, or None if there is
+    no checkpoint yet
+    """
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as checkpoint:
+            return checkpoint.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(checkpoint_path: str, token: str) -> None:
+    """
+    Atomically replaces the checkpoint file with the given cursor token,
+    so a crash mid-write never leaves a truncated checkpoint behind
+    """
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+        checkpoint.write(token)
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+    os.replace(temp_path, checkpoint_path)
+
+
+def stream_users_resumable(checkpoint_path: str, checkpoint_every: int = CHECKPOINT_EVERY,
+                           page_size: int = RESUMABLE_PAGE_SIZE, max_retries: int = MAX_RETRIES,
+                           retry_delay: float = RETRY_DELAY) -> Generator[Dict[str, Any], None, None]:
+    """
+    Streams user_data ordered by user_id like stream_users, but records
+    progress in a checkpoint file so a long export can pick up where it
+    left off.
+    
+    Rows are read page by page with keyset seeks (user_id > last id), so
+    resuming costs the same as continuing. The position of the last row
+    the consumer finished with is saved every checkpoint_every rows, and
+    again if the stream stops early or fails. Failed page fetches are
+    retried on a fresh connection with a growing delay; after max_retries
+    consecutive failures the error is raised. The checkpoint is removed
+    once the whole table has been streamed.
+    
+    Delivery is at-least-once: after a crash, rows emitted since the last
+    checkpoint write are emitted again.
+    
+    Args:
+        checkpoint_path: File holding the resume position
+        checkpoint_every: Rows between checkpoint writes
+        page_size: Rows fetched per keyset page
+        max_retries: Consecutive failed fetches tolerated before giving up
+        retry_delay: Base delay in seconds between retries
+    
+    Yields:
+        Dictionary containing user data (user_id, name, email, age)
+    """
+    token = load_checkpoint(checkpoint_path)
+    db_manager = DatabaseManager()
+    rows_since_checkpoint = 0
+    failures = 0
+    completed = False
+    
+    try:
+        while True:
+            try:
+                connection = db_manager.connect_to_prodev(pooled=True)
+                page = db_manager.fetch_page_after(connection, decode_cursor(token), page_size)
+            except (Error, TimeoutError) as e:
+                failures += 1
+                if failures > max_retries:
+                    raise
+                logger.warning("Fetch failed (%s), retrying in %.1fs (attempt %d/%d)",
+                               e, retry_delay * failures, failures, max_retries)
+                time.sleep(retry_delay * failures)
+                continue
+            finally:
+                db_manager.close_connection()
+            failures = 0
+            
+            for user in page:
+                yield user
+                # The consumer asked for the next row, so it is done with this one
+                token = encode_cursor(user['user_id'])
+                rows_since_checkpoint += 1
+                if rows_since_checkpoint >= checkpoint_every:
+                    save_checkpoint(checkpoint_path, token)
+                    rows_since_checkpoint = 0
+            
+            if len(page) < page_size:
+                break
+        
+        completed = True
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    finally:
+        if not completed and rows_since_checkpoint:
+            save_checkpoint(checkpoint_path, token)
@@ -1,66 +1,162 @@
-from typing import Generator, List, Dict, Any
-from seed import DatabaseManager
+from itertools import compress
+from typing import Generator, List, Dict, Any, Optional, Union
+import time
+from seed import (DatabaseManager, USER_COLUMNS, Condition, col, compile_filter, adaptive_sizer,
+                  get_instrumentation, logger,
+                  uses_binary_user_ids, user_columns_sql, open_stream_cursor, close_stream_cursor)
 import mysql.connector
 from mysql.connector import Error
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the 'numpy' layout needs it
+    np = None
 
-def stream_users_in_batches(batch_size: int) -> Generator[List[Dict[str, Any]], None, None]:
+# Batch layouts supported by stream_users_in_batches
+BATCH_LAYOUTS = ('rows', 'columns', 'numpy')
+
+# Strings are kept as Python objects rather than fixed-width unicode,
+# which would cost 4 bytes per character of the column's maximum length
+USER_DTYPE = [('user_id', object), ('name', object), ('email', object), ('age', 'i2')]
+
+
+def stream_users_in_batches(batch_size: int, layout: str = 'rows',
+                            where: Optional[Condition] = None,
+                            adaptive: Any = False) -> Generator[Union[List[Dict[str, Any]], Dict[str, tuple], Any], None, None]:
     """
     Generator function that streams rows from user_data table in batches.
 
     Args:
         batch_size: Number of rows to fetch in each batch
+        layout: 'rows' yields a list of dictionaries per batch, 'columns'
+            yields a dictionary mapping each column name to a tuple of
+            values, and 'numpy' yields a NumPy structured array with
+            USER_DTYPE fields. The columnar layouts skip the per-row dict.
+        where: Optional filter such as col('age') > 25. Whatever can be
+            expressed in SQL is sent as a WHERE clause; the rest is
+            applied to each fetched batch, so batches may come out smaller
+            than batch_size.
+        adaptive: True, or a seed.AdaptiveBatchSizer to read the chosen
+            sizes from afterwards, to grow or shrink each fetch toward a
+            target latency and memory budget, starting at batch_size.
+            The sizes chosen are logged at INFO level through the
+            seed logger when the stream ends.
 
     Yields:
-        List of dictionaries containing user data batches
+        One batch of user data in the requested layout
     """
+    if layout not in BATCH_LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {BATCH_LAYOUTS}")
+    if layout == 'numpy' and np is None:
+        raise ImportError("The 'numpy' layout requires NumPy to be installed")
+
+    sizer = adaptive_sizer(adaptive, batch_size)
     db_manager = None
     cursor = None
 
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
+        # Check out a connection to ALX_prodev from the shared pool
         db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
+        connection = db_manager.connect_to_prodev(pooled=True)
+
+        # Push the filter down as a WHERE clause where possible
+        binary_ids = uses_binary_user_ids(connection)
+        where_clause, params, residual = compile_filter(where, binary_ids)
 
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor(dictionary=True)
+        # Unbuffered cursor: rows are read from the server as they are fetched
+        if layout == 'rows':
+            cursor = open_stream_cursor(connection, dictionary=True)
+            cursor.execute(f"SELECT {user_columns_sql(binary_ids)} FROM user_data" + where_clause, params)
+        else:
+            # Plain tuples, with ages cast so they arrive as ints
+            cursor = open_stream_cursor(connection)
+            cursor.execute(f"SELECT {user_columns_sql(binary_ids, cast_age=True)} FROM user_data"
+                           + where_clause, params)
 
-        # Execute query
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        instrumentation = get_instrumentation()
 
         # LOOP 1: Batch streaming loop
         while True:
-            rows = cursor.fetchmany(batch_size)  # Get batch of rows
+            start = time.perf_counter()
+            rows = cursor.fetchmany(sizer.size if sizer else batch_size)  # Get batch of rows
+            elapsed = time.perf_counter() - start
+            if sizer:
+                sizer.record(rows, elapsed)
             if not rows:  # No more rows
+                if sizer:
+                    logger.info(sizer.report())
                 break
+            instrumentation.observe('batch_fetch', elapsed)
+            instrumentation.count('rows_read', len(rows))
 
-            # Convert each row to dictionary and yield the batch
-            batch = [dict(row) for row in rows]
-            yield batch
+            if residual is not None:
+                if layout == 'rows':
+                    rows = [row for row in rows if residual(row)]
+                else:
+                    rows = [row for row in rows if residual(dict(zip(USER_COLUMNS, row)))]
+                if not rows:
+                    continue
+
+            if layout == 'rows':
+                # Convert each row to dictionary and yield the batch
+                yield [dict(row) for row in rows]
+            elif layout == 'columns':
+                yield dict(zip(USER_COLUMNS, zip(*rows)))
+            else:
+                yield np.array(rows, dtype=USER_DTYPE)
 
     except Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         raise
     finally:
         # Clean up resources
         if cursor:
-            cursor.close()
+            close_stream_cursor(cursor, connection)
         if db_manager:
             db_manager.close_connection()
 
 
-def batch_processing(batch_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+def batch_processing(batch_size: int = 100, layout: str = 'rows',
+                     pushdown: bool = True) -> Generator[Dict[str, Any], None, None]:
     """
     Processes batches of users to filter those over age 25.
 
     Args:
         batch_size: Number of rows to process in each batch
+        layout: Batch layout to stream with (see stream_users_in_batches).
+            The columnar layouts filter each batch with a single mask over
+            the age column and only build dictionaries for matching users.
+        pushdown: Filter in MySQL so only matching rows are transferred.
+            With False every row is fetched and filtered here.
 
     Yields:
         Individual user dictionaries for users over age 25
     """
+    if pushdown:
+        for batch in stream_users_in_batches(batch_size, layout, where=col('age') > 25):
+            if layout == 'rows':
+                yield from batch
+            elif layout == 'columns':
+                for row in zip(*batch.values()):
+                    yield dict(zip(USER_COLUMNS, row))
+            else:
+                for row in batch.tolist():
+                    yield dict(zip(USER_COLUMNS, row))
+        return
+
     # LOOP 2: Iterate through batches from stream_users_in_batches
-    for batch in stream_users_in_batches(batch_size):
+    for batch in stream_users_in_batches(batch_size, layout):
+        if layout == 'numpy':
+            for row in batch[batch['age'] > 25].tolist():
+                yield dict(zip(USER_COLUMNS, row))
+            continue
+
+        if layout == 'columns':
+            mask = [age > 25 for age in batch['age']]
+            for row in compress(zip(*batch.values()), mask):
+                yield dict(zip(USER_COLUMNS, row))
+            continue
+
         # LOOP 3: Process each user in the current batch
         for user in batch:
             if user['age'] > 25:
@@ -1,7 +1,8 @@
 import mysql.connector
 from mysql.connector import Error
-from typing import Generator, List, Dict, Any
-from seed import DatabaseManager
+from typing import Generator, List, Dict, Any, Optional
+from seed import (DatabaseManager, encode_cursor, decode_cursor, read_ahead,
+                  uses_binary_user_ids, user_columns_sql, get_instrumentation, logger)
 
 def paginate_users(page_size: int, offset: int) -> List[Dict[str, Any]]:
     """
@@ -18,28 +19,33 @@ def paginate_users(page_size: int, offset: int) -> List[Dict[str, Any]]:
     cursor = None
     
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
+        # Check out a connection to ALX_prodev from the shared pool
         db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
+        connection = db_manager.connect_to_prodev(pooled=True)
         
         # Create a cursor
         cursor = connection.cursor(dictionary=True)
         
         # Execute paginated query
-        query = """
-            SELECT user_id, name, email, age 
+        query = f"""
+            SELECT {user_columns_sql(uses_binary_user_ids(connection))}
             FROM user_data 
-            ORDER BY user_id 
+            ORDER BY user_data.user_id 
             LIMIT %s OFFSET %s
         """
-        cursor.execute(query, (page_size, offset))
+        instrumentation = get_instrumentation()
+        with instrumentation.timer('page_fetch'):
+            cursor.execute(query, (page_size, offset))
+            page = cursor.fetchall()
+        instrumentation.count('pages_read')
+        instrumentation.count('rows_read', len(page))
         
-        # Fetch all results for this page
-        users = [dict(row) for row in cursor.fetchall()]
+        # Convert the rows of this page to dictionaries
+        users = [dict(row) for row in page]
         return users
         
     except Error as e:
-        print(f"Database error in paginate_users: {e}")
+        logger.error("Database error in paginate_users: %s", e)
         raise
     finally:
         # Clean up resources
@@ -48,28 +54,34 @@ def paginate_users(page_size: int, offset: int) -> List[Dict[str, Any]]:
         if db_manager:
             db_manager.close_connection()
 
-def lazy_paginate(page_size: int) -> Generator[List[Dict[str, Any]], None, None]:
+def lazy_paginate(page_size: int, prefetch: int = 0) -> Generator[List[Dict[str, Any]], None, None]:
     """
     Generator that lazily loads paginated user data one page at a time.
-    Only fetches the next page when needed.
+    Only fetches the next page when needed, unless prefetch is set.
     
     Args:
         page_size: Number of users per page
+        prefetch: Number of pages to fetch ahead on a background thread
+            while the consumer processes the current one (0 = on demand)
     
     Yields:
         List of user dictionaries for each page
     """
+    if prefetch > 0:
+        yield from read_ahead(lazy_paginate(page_size), prefetch)
+        return
+
     offset = 0
     
     # SINGLE LOOP: Continue until no more users are returned
     while True:
         # Fetch the next page only when generator is iterated
-        print(f"Fetching page with offset {offset}, page size {page_size}")
+        logger.debug("Fetching page with offset %d, page size %d", offset, page_size)
         current_page = paginate_users(page_size, offset)
         
         # If no users returned, we've reached the end
         if not current_page:
-            print("✅ Reached end of data")
+            logger.debug("Reached end of data")
             break
         
         # Yield the current page
@@ -77,4 +89,78 @@ def lazy_paginate(page_size: int) -> Generator[List[Dict[str, Any]], None, None]
         
         # Move to next page
         offset += page_size
-        
\ No newline at end of file
+
+
+class Page(list):
+    """
+    A page of user dictionaries that also carries the opaque cursor token
+    to pass back in to resume right after it
+    """
+
+    def __init__(self, users: List[Dict[str, Any]], next_cursor: Optional[str]):
+        super().__init__(users)
+        self.next_cursor = next_cursor
+
+
+def paginate_users_keyset(page_size: int, cursor: Optional[str] = None) -> Page:
+    """
+    Fetches the page of users that follows the given cursor token using a
+    keyset seek (WHERE user_id > last seen id) instead of OFFSET, so deep
+    pages cost the same as the first one.
+    
+    Args:
+        page_size: Number of users per page
+        cursor: Token from a previous page's next_cursor, None to start at the beginning
+    
+    Returns:
+        Page of user dictionaries with next_cursor set to resume after it
+    """
+    db_manager = None
+    
+    try:
+        # Check out a connection to ALX_prodev from the shared pool
+        db_manager = DatabaseManager()
+        connection = db_manager.connect_to_prodev(pooled=True)
+        
+        users = db_manager.fetch_page_after(connection, decode_cursor(cursor), page_size)
+        next_cursor = encode_cursor(users[-1]['user_id']) if users else cursor
+        return Page(users, next_cursor)
+        
+    except Error as e:
+        logger.error("Database error in paginate_users_keyset: %s", e)
+        raise
+    finally:
+        if db_manager:
+            db_manager.close_connection()
+
+def lazy_paginate_keyset(page_size: int, cursor: Optional[str] = None,
+                         prefetch: int = 0) -> Generator[Page, None, None]:
+    """
+    Keyset-based version of lazy_paginate. Each yielded page has a
+    next_cursor token; passing it back in as cursor resumes the iteration
+    right after that page, e.g. in a later request or after a restart.
+    
+    Args:
+        page_size: Number of users per page
+        cursor: Token to resume from, None to start at the beginning
+        prefetch: Number of pages to fetch ahead on a background thread (0 = on demand)
+    
+    Yields:
+        Page of user dictionaries
+    """
+    if prefetch > 0:
+        yield from read_ahead(lazy_paginate_keyset(page_size, cursor), prefetch)
+        return
+
+    # SINGLE LOOP: Continue until a short or empty page is returned
+    while True:
+        current_page = paginate_users_keyset(page_size, cursor)
+        
+        if current_page:
+            yield current_page
+        
+        # A short page means there is nothing after it
+        if len(current_page) < page_size:
+            break
+        
+        cursor = current_page.next_cursor
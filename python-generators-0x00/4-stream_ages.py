@@ -1,7 +1,20 @@
+from array import array
+from collections import Counter
 import mysql.connector
 from mysql.connector import Error
-from typing import Generator
-from seed import DatabaseManager
+from typing import Generator, Dict, Any, Optional, Sequence
+from seed import (DatabaseManager, open_stream_cursor, close_stream_cursor, map_partitions, scan_partition,
+                  summarize_age_histogram, logger)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the stream strategy falls back to array
+    np = None
+
+# Ages fetched per fetchmany call by the vectorized stream strategy
+AGE_BLOCK_SIZE = 10000
+
+AGGREGATION_STRATEGIES = ('sql', 'stream', 'partitioned', 'rows')
 
 def stream_user_ages() -> Generator[int, None, None]:
     """
@@ -14,12 +27,12 @@ def stream_user_ages() -> Generator[int, None, None]:
     cursor = None
     
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
+        # Check out a connection to ALX_prodev from the shared pool
         db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
+        connection = db_manager.connect_to_prodev(pooled=True)
         
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor()
+        # Unbuffered cursor: rows are read from the server as they are fetched
+        cursor = open_stream_cursor(connection)
         
         # Execute query to get only ages
         cursor.execute("SELECT age FROM user_data")
@@ -32,23 +45,157 @@ def stream_user_ages() -> Generator[int, None, None]:
             yield row[0]  # Yield just the age value
             
     except Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         raise
     finally:
         # Clean up resources
+        if cursor:
+            close_stream_cursor(cursor, connection)
+        if db_manager:
+            db_manager.close_connection()
+
+def stream_user_age_blocks(block_size: int = AGE_BLOCK_SIZE) -> Generator[Sequence[int], None, None]:
+    """
+    Generator that yields user ages in blocks of up to block_size values,
+    as a NumPy int64 array when NumPy is installed and as an array('l')
+    otherwise, so aggregations can work on whole blocks at a time.
+    
+    Args:
+        block_size: Number of ages fetched per round trip
+    
+    Yields:
+        Block of integer ages
+    """
+    db_manager = None
+    cursor = None
+    
+    try:
+        db_manager = DatabaseManager()
+        connection = db_manager.connect_to_prodev(pooled=True)
+        cursor = open_stream_cursor(connection)
+        
+        # Cast in SQL so the driver returns ints rather than Decimals
+        cursor.execute("SELECT CAST(age AS SIGNED) FROM user_data")
+        
+        while True:
+            rows = cursor.fetchmany(block_size)
+            if not rows:
+                break
+            if np is not None:
+                yield np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            else:
+                yield array('l', (row[0] for row in rows))
+            
+    except Error as e:
+        logger.error("Database error: %s", e)
+        raise
+    finally:
+        if cursor:
+            close_stream_cursor(cursor, connection)
+        if db_manager:
+            db_manager.close_connection()
+
+def _aggregate_sql(percentiles: Sequence[float]) -> Dict[str, Any]:
+    """
+    Pushes the aggregation down to MySQL: one AVG/MIN/MAX/COUNT query, plus
+    a GROUP BY age histogram (at most one row per distinct age) when
+    percentiles are requested
+    """
+    db_manager = None
+    cursor = None
+    
+    try:
+        db_manager = DatabaseManager()
+        connection = db_manager.connect_to_prodev(pooled=True)
+        cursor = connection.cursor()
+        
+        if percentiles:
+            cursor.execute("SELECT CAST(age AS SIGNED), COUNT(*) FROM user_data GROUP BY age")
+            return summarize_age_histogram(Counter(dict(cursor.fetchall())), percentiles)
+        
+        cursor.execute("SELECT COUNT(age), AVG(age), MIN(age), MAX(age) FROM user_data")
+        count, average, min_age, max_age = cursor.fetchone()
+        return {
+            'count': count,
+            'average': float(average) if count else 0.0,
+            'min': int(min_age) if count else None,
+            'max': int(max_age) if count else None,
+            'percentiles': {},
+        }
+        
+    except Error as e:
+        logger.error("Database error: %s", e)
+        raise
+    finally:
         if cursor:
             cursor.close()
         if db_manager:
             db_manager.close_connection()
 
-def calculate_average_age() -> float:
+def _age_histogram(low: Optional[str], high: Optional[str]) -> Counter:
+    """
+    Builds the age histogram of one user_id range (see seed.scan_partition)
+    """
+    histogram = Counter()
+    for rows in scan_partition(low, high, batch_size=AGE_BLOCK_SIZE,
+                               columns="CAST(age AS SIGNED)", dictionary=False):
+        histogram.update(row[0] for row in rows)
+    return histogram
+
+def aggregate_ages(strategy: str = 'sql', percentiles: Sequence[float] = (),
+                   partitions: int = 4) -> Dict[str, Any]:
+    """
+    Computes count, average, min, max and percentiles of user ages.
+    
+    Args:
+        strategy: 'sql' pushes the work down to MySQL, 'stream' fetches ages
+            in large blocks and aggregates each block with NumPy (or array
+            and Counter), 'partitioned' streams partitions user_id ranges
+            concurrently and merges their histograms, 'rows' consumes
+            stream_user_ages one value at a time
+        percentiles: Percentiles to compute, e.g. (50, 90, 99)
+        partitions: Number of user_id ranges for the 'partitioned' strategy
+    
+    Returns:
+        Dictionary with count, average, min, max and a percentiles mapping
+    """
+    if strategy not in AGGREGATION_STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {AGGREGATION_STRATEGIES}")
+    
+    if strategy == 'sql':
+        return _aggregate_sql(percentiles)
+    
+    histogram = Counter()
+    if strategy == 'partitioned':
+        for partial in map_partitions(_age_histogram, partitions):
+            histogram.update(partial)
+    elif strategy == 'stream':
+        for block in stream_user_age_blocks():
+            if np is not None:
+                values, counts = np.unique(block, return_counts=True)
+                histogram.update(dict(zip(values.tolist(), counts.tolist())))
+            else:
+                histogram.update(block)
+    else:
+        for age in stream_user_ages():
+            histogram[int(age)] += 1
+    return summarize_age_histogram(histogram, percentiles)
+
+def calculate_average_age(strategy: str = 'rows') -> float:
     """
     Calculates the average age of all users using the generator.
     Processes ages one by one without loading entire dataset into memory.
     
+    Args:
+        strategy: 'rows' (default) sums stream_user_ages one value at a
+            time; the other strategies delegate to aggregate_ages
+    
     Returns:
         Float representing the average age
     """
+    if strategy != 'rows':
+        return aggregate_ages(strategy)['average']
+    
     total_age = 0
     user_count = 0
     
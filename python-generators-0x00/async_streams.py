@@ -0,0 +1,274 @@
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence
+from seed import USER_ID_LAYOUT_TTL, Condition, compile_filter, user_columns_sql, user_id_placeholder
+
+try:
+    import aiomysql
+except ImportError:  # Only needed for the MySQL backend
+    aiomysql = None
+
+try:
+    import aiosqlite
+except ImportError:  # Only needed for the SQLite stand-in
+    aiosqlite = None
+
+# Connection settings for the async MySQL pool (mirror seed.DatabaseManager)
+ASYNC_DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',      # Change as per your setup
+    'password': '',      # Change as per your setup
+    'db': 'ALX_prodev',
+}
+ASYNC_POOL_SIZE = 10
+
+# Rows fetched per round trip by the single-row streams
+ASYNC_FETCH_SIZE = 500
+
+
+class MySQLBackend:
+    """
+    Streams query results from MySQL through an aiomysql connection pool
+    using unbuffered (SS) cursors
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.binary_ids = None
+        self._layout_checked_at = 0.0
+
+    @classmethod
+    async def create(cls, maxsize: int = ASYNC_POOL_SIZE, **config) -> 'MySQLBackend':
+        if aiomysql is None:
+            raise ImportError("The MySQL backend requires aiomysql: pip install aiomysql")
+        pool = await aiomysql.create_pool(minsize=1, maxsize=maxsize, **{**ASYNC_DB_CONFIG, **config})
+        return cls(pool)
+
+    async def uses_binary_user_ids(self) -> bool:
+        """
+        Async counterpart of seed.uses_binary_user_ids; the layout is
+        looked up again after USER_ID_LAYOUT_TTL seconds
+        """
+        if self.binary_ids is None or time.monotonic() - self._layout_checked_at > USER_ID_LAYOUT_TTL:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("""
+                        SELECT DATA_TYPE FROM information_schema.COLUMNS
+                        WHERE TABLE_SCHEMA = DATABASE()
+                          AND TABLE_NAME = 'user_data' AND COLUMN_NAME = 'user_id'
+                    """)
+                    row = await cursor.fetchone()
+            self.binary_ids = bool(row) and str(row[0]).lower() == 'binary'
+            self._layout_checked_at = time.monotonic()
+        return self.binary_ids
+
+    async def stream_batches(self, query: str, params: Sequence[Any], dictionary: bool,
+                             batch_size: int) -> AsyncGenerator[List[Any], None]:
+        conn = await self.pool.acquire()
+        cursor = None
+        finished = False
+        try:
+            cursor = await conn.cursor(aiomysql.SSDictCursor if dictionary else aiomysql.SSCursor)
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            finished = True
+        finally:
+            if finished:
+                await cursor.close()
+            else:
+                # Closing an SS cursor reads the rest of the result; drop the
+                # connection instead and let the pool replace it
+                conn.close()
+            await self.pool.release(conn)
+
+    async def close(self) -> None:
+        self.pool.close()
+        await self.pool.wait_closed()
+
+
+class SQLiteBackend:
+    """
+    Stand-in backend over a local SQLite file holding a user_data table,
+    for tests and benchmarks without a MySQL server. Queries are written
+    for MySQL; %s placeholders are rewritten for SQLite.
+    """
+
+    binary_ids = False
+
+    def __init__(self, path: str):
+        if aiosqlite is None:
+            raise ImportError("The SQLite backend requires aiosqlite: pip install aiosqlite")
+        self.path = path
+
+    async def uses_binary_user_ids(self) -> bool:
+        return False
+
+    async def stream_batches(self, query: str, params: Sequence[Any], dictionary: bool,
+                             batch_size: int) -> AsyncGenerator[List[Any], None]:
+        async with aiosqlite.connect(self.path) as db:
+            if dictionary:
+                db.row_factory = aiosqlite.Row
+            async with db.execute(query.replace('%s', '?'), tuple(params)) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows] if dictionary else rows
+
+    async def close(self) -> None:
+        pass
+
+
+_backend = None
+_backend_lock = None
+
+
+async def get_backend():
+    """
+    Returns the backend used by the async streams, creating an aiomysql
+    pool on first use unless use_backend() installed another one
+    """
+    global _backend, _backend_lock
+    if _backend_lock is None:
+        _backend_lock = asyncio.Lock()
+    async with _backend_lock:
+        if _backend is None:
+            _backend = await MySQLBackend.create()
+        return _backend
+
+
+def use_backend(backend) -> None:
+    """
+    Installs the backend used by the async streams, e.g.
+    use_backend(SQLiteBackend('users.db'))
+    """
+    global _backend
+    _backend = backend
+
+
+async def close_backend() -> None:
+    """
+    Closes the current backend's connections and forgets it
+    """
+    global _backend
+    backend, _backend = _backend, None
+    if backend is not None:
+        await backend.close()
+
+
+async def astream_users(where: Optional[Condition] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Async generator that streams rows from user_data one by one.
+    Async counterpart of stream_users in 0-stream_users.py.
+
+    Args:
+        where: Optional filter, pushed down to SQL where possible
+
+    Yields:
+        Dictionary containing user data (user_id, name, email, age)
+    """
+    # aclosing() makes closing this generator release the connection at once
+    async with aclosing(astream_users_in_batches(ASYNC_FETCH_SIZE, where)) as batches:
+        async for batch in batches:
+            for user in batch:
+                yield user
+
+
+async def astream_users_in_batches(batch_size: int,
+                                   where: Optional[Condition] = None) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    """
+    Async generator that streams rows from user_data in batches.
+    Async counterpart of stream_users_in_batches in 1-batch_processing.py.
+
+    Args:
+        batch_size: Number of rows to fetch in each batch
+        where: Optional filter, pushed down to SQL where possible
+
+    Yields:
+        List of dictionaries containing user data
+    """
+    backend = await get_backend()
+    binary_ids = await backend.uses_binary_user_ids()
+    where_clause, params, residual = compile_filter(where, binary_ids)
+    query = f"SELECT {user_columns_sql(binary_ids)} FROM user_data" + where_clause
+
+    async with aclosing(backend.stream_batches(query, params, True, batch_size)) as batches:
+        async for rows in batches:
+            if residual is not None:
+                rows = [row for row in rows if residual(row)]
+                if not rows:
+                    continue
+            yield rows
+
+
+async def alazy_paginate(page_size: int) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    """
+    Async generator that loads user_data one page at a time, ordered by
+    user_id, fetching each page with a keyset seek when it is requested.
+    Async counterpart of lazy_paginate in 2-lazy_paginate.py.
+
+    Args:
+        page_size: Number of users per page
+
+    Yields:
+        List of user dictionaries for each page
+    """
+    backend = await get_backend()
+    binary_ids = await backend.uses_binary_user_ids()
+    columns = user_columns_sql(binary_ids)
+    last_user_id = None
+
+    while True:
+        if last_user_id is None:
+            query = f"SELECT {columns} FROM user_data ORDER BY user_data.user_id LIMIT %s"
+            params = (page_size,)
+        else:
+            query = (f"SELECT {columns} FROM user_data "
+                     f"WHERE user_id > {user_id_placeholder(binary_ids)} ORDER BY user_data.user_id LIMIT %s")
+            params = (last_user_id, page_size)
+
+        page = []
+        async with aclosing(backend.stream_batches(query, params, True, page_size)) as batches:
+            async for rows in batches:
+                page.extend(rows)
+        if page:
+            yield page
+        if len(page) < page_size:
+            break
+        last_user_id = page[-1]['user_id']
+
+
+async def astream_user_ages() -> AsyncGenerator[int, None]:
+    """
+    Async generator that yields user ages one by one.
+    Async counterpart of stream_user_ages in 4-stream_ages.py.
+
+    Yields:
+        Integer representing user age
+    """
+    backend = await get_backend()
+    query = "SELECT CAST(age AS SIGNED) FROM user_data"
+    async with aclosing(backend.stream_batches(query, (), False, ASYNC_FETCH_SIZE)) as batches:
+        async for rows in batches:
+            for row in rows:
+                yield row[0]
+
+
+async def acalculate_average_age() -> float:
+    """
+    Calculates the average age of all users from astream_user_ages
+
+    Returns:
+        Float representing the average age
+    """
+    total_age = 0
+    user_count = 0
+    async for age in astream_user_ages():
+        total_age += age
+        user_count += 1
+    return total_age / user_count if user_count else 0.0
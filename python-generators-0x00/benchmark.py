@@ -0,0 +1,534 @@
+import argparse
+import contextlib
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import seed
+from seed import ConnectionPool, DatabaseManager, encode_cursor, use_pool
+from pipeline import Pipeline
+from mysql.connector import Error
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is reported as None
+    resource = None
+
+# Defaults for the benchmark run
+BENCHMARK_ROWS = 100000
+BENCHMARK_SEED = 42
+BENCHMARK_BATCH_SIZE = 1000
+BENCHMARK_DATA_DIR = '.benchmark-data'
+SAMPLE_ROWS = 1000       # Rows per latency sample for generators that yield single rows
+PAGINATE_ROWS = 100000   # OFFSET pagination is quadratic, so its full walk is capped
+DEEP_PAGES = 20          # Pages sampled across the table by the deep_pages cases
+CSV_ROWS = 20000         # Rows loaded by the load_data_from_csv cases
+
+STANDIN_SCHEMA = (
+    """
+    CREATE TABLE user_data (
+        user_id VARCHAR(36) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        age DECIMAL(3,0) NOT NULL
+    )
+    """,
+    "CREATE INDEX idx_age ON user_data (age)",
+    "CREATE INDEX idx_email ON user_data (email)",
+)
+
+# MySQL syntax used by the package, rewritten for SQLite
+_SQL_REWRITES = (
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bINSERT IGNORE\b', re.IGNORECASE), 'INSERT OR IGNORE'),
+    (re.compile(r'\bAS SIGNED\b', re.IGNORECASE), 'AS INTEGER'),
+)
+
+
+def _to_sqlite(query: str) -> str:
+    for pattern, replacement in _SQL_REWRITES:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+class StandInCursor:
+    """
+    Cursor of a StandInConnection. Unbuffered cursors step the SQLite
+    statement as rows are fetched; buffered ones read the whole result on
+    execute(), like mysql.connector's buffered cursors.
+    """
+
+    def __init__(self, connection: 'StandInConnection', dictionary: bool, buffered: bool):
+        self._cursor = connection._db.cursor()
+        self.dictionary = dictionary
+        self.buffered = buffered
+        self._buffer = None
+        self._columns = ()
+        self.rowcount = -1
+
+    def _rows(self, rows: List[tuple]) -> List[Any]:
+        if self.dictionary:
+            return [dict(zip(self._columns, row)) for row in rows]
+        return rows
+
+    def execute(self, query: str, params: Iterable[Any] = ()) -> None:
+        try:
+            self._cursor.execute(_to_sqlite(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+        self.rowcount = self._cursor.rowcount
+        self._columns = tuple(column[0] for column in self._cursor.description or ())
+        self._buffer = self._cursor.fetchall() if self.buffered else None
+
+    def executemany(self, query: str, seq_params: Iterable[Iterable[Any]]) -> None:
+        try:
+            self._cursor.executemany(_to_sqlite(query), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+        self.rowcount = self._cursor.rowcount
+
+    def fetchmany(self, size: int = 1) -> List[Any]:
+        if self._buffer is not None:
+            rows, self._buffer = self._buffer[:size], self._buffer[size:]
+            return self._rows(rows)
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchone(self) -> Optional[Any]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self) -> List[Any]:
+        if self._buffer is not None:
+            rows, self._buffer = self._buffer, []
+            return self._rows(rows)
+        return self._rows(self._cursor.fetchall())
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class StandInConnection:
+    """
+    SQLite connection with the subset of the mysql.connector connection
+    interface used by this package, so the generators can be benchmarked
+    without a MySQL server. Errors are raised as mysql.connector.Error.
+    """
+
+    unread_result = False
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._open = True
+
+    def is_connected(self) -> bool:
+        return self._open
+
+    def ping(self, reconnect: bool = False, attempts: int = 1, delay: int = 0) -> None:
+        if not self._open:
+            raise Error("Stand-in connection is closed")
+
+    def cursor(self, dictionary: bool = False, buffered: Optional[bool] = None) -> StandInCursor:
+        return StandInCursor(self, dictionary, bool(buffered))
+
+    def consume_results(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def rollback(self) -> None:
+        self._db.rollback()
+
+    def close(self) -> None:
+        if self._open:
+            self._open = False
+            self._db.close()
+
+
+def create_standin_database(path: str, rows: int = 0, seed_value: int = BENCHMARK_SEED) -> None:
+    """
+    Creates a SQLite user_data table at path holding rows synthetic users.
+    The same seed always produces the same users.
+    """
+    temp_path = f"{path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    db = sqlite3.connect(temp_path)
+    try:
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        for statement in STANDIN_SCHEMA:
+            db.execute(statement)
+        rng = random.Random(seed_value)
+        for start in range(0, rows, 100000):
+            db.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", (
+                (str(uuid.UUID(int=rng.getrandbits(128), version=4)), f"User {i}",
+                 f"user{i}@example.com", rng.randint(18, 100))
+                for i in range(start, min(start + 100000, rows))
+            ))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(temp_path, path)
+
+
+def write_standin_csv(path: str, rows: int, seed_value: int = BENCHMARK_SEED) -> None:
+    """
+    Writes rows synthetic users in the layout of user_data.csv
+    """
+    rng = random.Random(seed_value)
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['name', 'email', 'age'])
+        for i in range(rows):
+            writer.writerow([f"User {i}", f"user{i}@example.com", rng.randint(18, 100)])
+
+
+def _module(name: str):
+    return importlib.import_module(name)
+
+
+def _once(func: Callable[[], Any]):
+    yield func()
+
+
+def _deep_page_ids(options: argparse.Namespace, page_size: int) -> List[Tuple[int, Optional[str]]]:
+    """
+    Offsets spread evenly across the table, each with the user_id just
+    before it (None for the first page)
+    """
+    last = max(options.rows - page_size, 0)
+    offsets = sorted({i * last // max(DEEP_PAGES - 1, 1) for i in range(DEEP_PAGES)})
+    connection = StandInConnection(options.database)
+    try:
+        cursor = connection.cursor()
+        positions = []
+        for offset in offsets:
+            after = None
+            if offset:
+                cursor.execute("SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s", (offset - 1,))
+                after = cursor.fetchone()[0]
+            positions.append((offset, after))
+        return positions
+    finally:
+        connection.close()
+
+
+def _case_stream_rows(streaming: bool):
+    def case(options, stack):
+        connection = StandInConnection(options.database)
+        stack.callback(connection.close)
+        rows = DatabaseManager().stream_rows(connection, options.batch_size, streaming=streaming)
+        return Pipeline(rows).batch(SAMPLE_ROWS), len
+    return case
+
+
+def _case_batches(layout: str = 'rows', adaptive: bool = False):
+    def case(options, stack):
+        batch_module = _module('1-batch_processing')
+        if layout == 'numpy' and batch_module.np is None:
+            return None
+        size_of = len if layout == 'rows' else (lambda batch: len(batch['age']))
+        return batch_module.stream_users_in_batches(options.batch_size, layout, adaptive=adaptive), size_of
+    return case
+
+
+def _case_aggregate(strategy: str):
+    def case(options, stack):
+        ages = _module('4-stream_ages')
+        return _once(lambda: ages.aggregate_ages(strategy, (50, 99))), lambda result: result['count']
+    return case
+
+
+def _case_load_csv(bulk: bool):
+    def case(options, stack):
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        csv_path = os.path.join(directory, 'users.csv')
+        database = os.path.join(directory, 'users.db')
+        write_standin_csv(csv_path, options.csv_rows, options.seed)
+        create_standin_database(database)
+        connection = StandInConnection(database)
+        stack.callback(connection.close)
+        load = lambda: DatabaseManager().load_data_from_csv(connection, csv_path, bulk=bulk)
+        return _once(load), lambda _: options.csv_rows
+    return case
+
+
+def _case_stream_users(options, stack):
+    return Pipeline(_module('0-stream_users').stream_users()).batch(SAMPLE_ROWS), len
+
+
+def _case_batch_processing(options, stack):
+    return Pipeline(_module('1-batch_processing').batch_processing(options.batch_size)).batch(SAMPLE_ROWS), len
+
+
+def _case_lazy_paginate(options, stack):
+    pages = max(options.paginate_rows // options.batch_size, 1)
+    return Pipeline(_module('2-lazy_paginate').lazy_paginate(options.batch_size)).take(pages), len
+
+
+def _case_lazy_paginate_keyset(options, stack):
+    return _module('2-lazy_paginate').lazy_paginate_keyset(options.batch_size), len
+
+
+def _case_deep_pages_offset(options, stack):
+    paginate = _module('2-lazy_paginate')
+    positions = _deep_page_ids(options, options.batch_size)
+    return (paginate.paginate_users(options.batch_size, offset) for offset, _ in positions), len
+
+
+def _case_deep_pages_keyset(options, stack):
+    paginate = _module('2-lazy_paginate')
+    positions = _deep_page_ids(options, options.batch_size)
+    return (paginate.paginate_users_keyset(options.batch_size, encode_cursor(after) if after else None)
+            for _, after in positions), len
+
+
+def _case_stream_user_ages(options, stack):
+    return Pipeline(_module('4-stream_ages').stream_user_ages()).batch(SAMPLE_ROWS), len
+
+
+# Benchmark cases by name. Each returns (batches, size_of) or None when it
+# cannot run here; building the batches is not timed, iterating them is.
+CASES = {
+    'stream_users': _case_stream_users,
+    'stream_users_in_batches': _case_batches(),
+    'stream_users_in_batches[columns]': _case_batches('columns'),
+    'stream_users_in_batches[numpy]': _case_batches('numpy'),
+    'stream_users_in_batches[adaptive]': _case_batches(adaptive=True),
+    'batch_processing': _case_batch_processing,
+    'lazy_paginate': _case_lazy_paginate,
+    'lazy_paginate_keyset': _case_lazy_paginate_keyset,
+    'deep_pages[offset]': _case_deep_pages_offset,
+    'deep_pages[keyset]': _case_deep_pages_keyset,
+    'stream_user_ages': _case_stream_user_ages,
+    'aggregate_ages[sql]': _case_aggregate('sql'),
+    'aggregate_ages[stream]': _case_aggregate('stream'),
+    'aggregate_ages[partitioned]': _case_aggregate('partitioned'),
+    'aggregate_ages[rows]': _case_aggregate('rows'),
+    'stream_rows[streaming]': _case_stream_rows(True),
+    'stream_rows[buffered]': _case_stream_rows(False),
+    'load_data_from_csv[rows]': _case_load_csv(False),
+    'load_data_from_csv[bulk]': _case_load_csv(True),
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far, in MiB
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    # Nearest-rank percentile of sorted values
+    if not values:
+        return None
+    rank = max(int(-(-percentile * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def measure(batches: Iterable[Any], size_of: Callable[[Any], int]) -> Tuple[int, List[float], float]:
+    """
+    Iterates batches, timing each next() call
+
+    Returns:
+        Tuple of (rows, per-batch latencies in seconds, total seconds)
+    """
+    iterator = iter(batches)
+    clock = time.perf_counter
+    latencies = []
+    rows = 0
+    started = clock()
+    try:
+        while True:
+            start = clock()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            latencies.append(clock() - start)
+            rows += size_of(batch)
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            close()
+    return rows, latencies, clock() - started
+
+
+def run_case(name: str, options: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs one case against the stand-in database in this process. Output
+    printed by the package is discarded so it does not skew the timings.
+    """
+    use_pool(ConnectionPool(lambda: StandInConnection(options.database)))
+    with contextlib.ExitStack() as stack, open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            prepared = CASES[name](options, stack)
+            if prepared is None:
+                return {'name': name, 'skipped': 'optional dependency not installed'}
+            baseline = peak_rss_mb()
+            rows, latencies, seconds = measure(*prepared)
+            peak = peak_rss_mb()
+            seed.close_pool()
+
+    latencies.sort()
+    p50, p99 = _percentile(latencies, 50), _percentile(latencies, 99)
+    return {
+        'name': name,
+        'rows': rows,
+        'seconds': round(seconds, 6),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        'batches': len(latencies),
+        'p50_batch_ms': round(p50 * 1000, 3) if p50 is not None else None,
+        'p99_batch_ms': round(p99 * 1000, 3) if p99 is not None else None,
+        'baseline_rss_mb': round(baseline, 1) if baseline is not None else None,
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def select_cases(selection: Optional[str]) -> List[str]:
+    """
+    Resolves a comma-separated list of case names. A name without brackets
+    also selects its variants, e.g. aggregate_ages selects aggregate_ages[sql].
+    """
+    if not selection:
+        return list(CASES)
+    wanted = [item.strip() for item in selection.split(',') if item.strip()]
+    names = [name for name in CASES if any(name == item or name.startswith(f"{item}[") for item in wanted)]
+    if not names:
+        raise ValueError(f"No benchmark cases match {selection!r}")
+    return names
+
+
+def run_benchmarks(options: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Seeds (or reuses) the stand-in database and runs every selected case in
+    a fresh interpreter, so each case's peak RSS is its own
+
+    Returns:
+        Dictionary with run metadata and one result per case
+    """
+    os.makedirs(options.data_dir, exist_ok=True)
+    database = os.path.abspath(os.path.join(options.data_dir, f"users-{options.rows}-{options.seed}.db"))
+    if not os.path.exists(database):
+        print(f"Seeding {options.rows} synthetic users into {database}", file=sys.stderr)
+        create_standin_database(database, options.rows, options.seed)
+
+    results = []
+    for name in select_cases(options.cases):
+        command = [sys.executable, os.path.abspath(__file__), '--run-case', name, '--database', database,
+                   '--rows', str(options.rows), '--seed', str(options.seed),
+                   '--batch-size', str(options.batch_size), '--paginate-rows', str(options.paginate_rows),
+                   '--csv-rows', str(options.csv_rows)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode == 0:
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+        else:
+            lines = completed.stderr.strip().splitlines()
+            result = {'name': name, 'error': lines[-1] if lines else f"exit status {completed.returncode}"}
+        print(format_result(result), file=sys.stderr)
+        results.append(result)
+
+    return {
+        'meta': {
+            'rows': options.rows,
+            'seed': options.seed,
+            'batch_size': options.batch_size,
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    name = result['name']
+    if 'error' in result:
+        return f"{name:<36} ERROR {result['error']}"
+    if 'skipped' in result:
+        return f"{name:<36} skipped ({result['skipped']})"
+
+    def number(value, spec):
+        return format(value, spec) if value is not None else 'n/a'
+
+    return (f"{name:<36} {number(result['rows_per_second'], '>12,.0f')} rows/s  "
+            f"p50 {number(result['p50_batch_ms'], '>9.3f')} ms  p99 {number(result['p99_batch_ms'], '>9.3f')} ms  "
+            f"peak RSS {number(result['peak_rss_mb'], '>7.1f')} MiB")
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    Prints the change in throughput, p99 latency and peak RSS of every case
+    present in both result documents
+    """
+    before = {result['name']: result for result in previous['results'] if 'rows_per_second' in result}
+    print(f"Compared with {previous['meta'].get('commit') or 'previous run'}:", file=sys.stderr)
+    for result in current['results']:
+        old = before.get(result['name'])
+        if old is None or 'rows_per_second' not in result:
+            continue
+        changes = []
+        for key, label in (('rows_per_second', 'rows/s'), ('p99_batch_ms', 'p99'), ('peak_rss_mb', 'peak RSS')):
+            if old.get(key) and result.get(key) is not None:
+                changes.append(f"{label} {(result[key] / old[key] - 1) * 100:+.1f}%")
+        print(f"{result['name']:<36} {', '.join(changes)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the user_data generators against a local SQLite stand-in for MySQL")
+    parser.add_argument('--rows', type=int, default=BENCHMARK_ROWS, help="Synthetic users to seed")
+    parser.add_argument('--seed', type=int, default=BENCHMARK_SEED, help="Random seed for the synthetic users")
+    parser.add_argument('--batch-size', type=int, default=BENCHMARK_BATCH_SIZE, help="Batch and page size")
+    parser.add_argument('--cases', help="Comma-separated case names (default: all)")
+    parser.add_argument('--paginate-rows', type=int, default=PAGINATE_ROWS,
+                        help="Rows walked by the OFFSET lazy_paginate case")
+    parser.add_argument('--csv-rows', type=int, default=CSV_ROWS, help="Rows loaded by the CSV cases")
+    parser.add_argument('--data-dir', default=BENCHMARK_DATA_DIR, help="Where seeded databases are kept")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="Previous JSON results to compare against")
+    parser.add_argument('--list', action='store_true', help="List the benchmark cases and exit")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(CASES))
+    elif args.run_case:
+        print(json.dumps(run_case(args.run_case, args)))
+    else:
+        report = run_benchmarks(args)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as previous:
+                compare_results(json.load(previous), report)
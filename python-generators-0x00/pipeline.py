@@ -0,0 +1,268 @@
+import time
+from collections import deque
+from itertools import chain, islice, tee
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Stages that transform items one at a time and can be fused into one loop
+FUSABLE_STAGES = ('map', 'filter')
+
+# Generated fused loops, keyed by their sequence of stage kinds
+_fused_loops: Dict[Tuple[str, ...], Callable] = {}
+
+
+def _fused_loop(kinds: Tuple[str, ...]) -> Callable:
+    """
+    Returns a generator function that applies a run of map/filter stages
+    inside a single loop, e.g. for ('map', 'filter'):
+
+        def fused(source, f0, f1):
+            for item in source:
+                item = f0(item)
+                if not f1(item):
+                    continue
+                yield item
+
+    Each item passes through every step as a local variable, with no
+    generator frame or next() call between the steps.
+    """
+    loop = _fused_loops.get(kinds)
+    if loop is None:
+        names = [f"f{i}" for i in range(len(kinds))]
+        lines = [f"def fused(source, {', '.join(names)}):", "    for item in source:"]
+        for kind, name in zip(kinds, names):
+            if kind == 'map':
+                lines.append(f"        item = {name}(item)")
+            else:
+                lines.append(f"        if not {name}(item):")
+                lines.append("            continue")
+        lines.append("        yield item")
+        namespace = {}
+        exec('\n'.join(lines), namespace)
+        loop = _fused_loops[kinds] = namespace['fused']
+    return loop
+
+
+def _batch(source: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(source)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _window(source: Iterable[Any], size: int, step: int) -> Iterator[Tuple[Any, ...]]:
+    window = deque(maxlen=size)
+    pending = size  # Items still needed before the next window is complete
+    for item in source:
+        window.append(item)
+        pending -= 1
+        if pending == 0:
+            yield tuple(window)
+            pending = step
+
+
+class StageStats:
+    """
+    Counters for one executed stage of a profiled pipeline. Fused map/filter
+    runs count as one stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.seconds = 0.0    # Time spent in this stage alone
+        self._inclusive = 0.0  # Time spent in this stage and everything upstream
+
+    @property
+    def throughput(self) -> float:
+        """
+        Items produced per second of this stage's own time
+        """
+        return self.items_out / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (f"StageStats({self.name!r}, in={self.items_in}, out={self.items_out}, "
+                f"seconds={self.seconds:.4f})")
+
+
+def _metered(source: Iterable[Any], stats: StageStats) -> Iterator[Any]:
+    """
+    Passes items through while counting them and timing each next() call
+    """
+    iterator = iter(source)
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats._inclusive += clock() - start
+            return
+        stats._inclusive += clock() - start
+        stats.items_out += 1
+        yield item
+
+
+class Pipeline:
+    """
+    Composable, lazy chain of streaming stages over any iterable, such as
+    the generators in this package:
+
+        adults = (Pipeline(stream_users_in_batches(100))
+                  .unbatch()
+                  .filter(lambda user: user['age'] > 25)
+                  .take(1000))
+        for user in adults:
+            ...
+
+    Every method returns a new Pipeline; nothing runs until it is iterated.
+    Consecutive map and filter stages are fused into one generated loop.
+    When iteration stops, including after take() or an early break, the
+    source generator is closed so it releases its database connection.
+    With profile=True, per-stage counts and timings are available from
+    stats() after a run.
+    """
+
+    def __init__(self, source: Iterable[Any], profile: bool = False,
+                 _stages: Tuple[Tuple[str, Any, str], ...] = (),
+                 _upstream: Optional['Pipeline'] = None):
+        self.source = source
+        self.profile = profile
+        self._stages = _stages
+        self._upstream = _upstream
+        self._stats: List[StageStats] = []
+
+    def _then(self, kind: str, arg: Any, label: str) -> 'Pipeline':
+        return Pipeline(self.source, self.profile, self._stages + ((kind, arg, label),), self._upstream)
+
+    def map(self, func: Callable[[Any], Any]) -> 'Pipeline':
+        """
+        Replaces each item with func(item)
+        """
+        return self._then('map', func, f"map({getattr(func, '__name__', 'func')})")
+
+    def filter(self, predicate: Callable[[Any], Any]) -> 'Pipeline':
+        """
+        Keeps the items for which predicate(item) is true
+        """
+        return self._then('filter', predicate, f"filter({getattr(predicate, '__name__', 'predicate')})")
+
+    def batch(self, size: int) -> 'Pipeline':
+        """
+        Groups items into lists of size items; the last list may be shorter
+        """
+        if size < 1:
+            raise ValueError("Batch size must be at least 1")
+        return self._then('batch', size, f"batch({size})")
+
+    def unbatch(self) -> 'Pipeline':
+        """
+        Flattens batches (any iterables) back into single items
+        """
+        return self._then('unbatch', None, "unbatch()")
+
+    def window(self, size: int, step: int = 1) -> 'Pipeline':
+        """
+        Yields tuples of size consecutive items, starting a new window every
+        step items. A trailing partial window is not yielded.
+        """
+        if size < 1 or step < 1:
+            raise ValueError("Window size and step must be at least 1")
+        return self._then('window', (size, step), f"window({size}, {step})")
+
+    def take(self, count: int) -> 'Pipeline':
+        """
+        Stops after count items and closes the source
+        """
+        return self._then('take', count, f"take({count})")
+
+    def tee(self, branches: int = 2) -> List['Pipeline']:
+        """
+        Splits this pipeline into independent branches that each see every
+        item. Items are buffered until all branches have consumed them, so
+        branches should be iterated side by side.
+        """
+        return [Pipeline(branch, self.profile, _upstream=self) for branch in tee(iter(self), branches)]
+
+    def _units(self) -> List[Tuple[str, Callable[[Iterable[Any]], Iterable[Any]]]]:
+        """
+        Groups the stages into execution units, fusing runs of map/filter
+        """
+        units = []
+        i = 0
+        while i < len(self._stages):
+            kind, arg, label = self._stages[i]
+            if kind in FUSABLE_STAGES:
+                end = i
+                while end < len(self._stages) and self._stages[end][0] in FUSABLE_STAGES:
+                    end += 1
+                run = self._stages[i:end]
+                name = ' | '.join(stage[2] for stage in run)
+                if len(run) == 1:
+                    # The built-ins are faster than a generated loop for a single step
+                    builtin = map if kind == 'map' else filter
+                    units.append((name, lambda source, f=arg, builtin=builtin: builtin(f, source)))
+                else:
+                    loop = _fused_loop(tuple(stage[0] for stage in run))
+                    funcs = [stage[1] for stage in run]
+                    units.append((name, lambda source, loop=loop, funcs=funcs: loop(source, *funcs)))
+                i = end
+                continue
+            if kind == 'batch':
+                units.append((label, lambda source, size=arg: _batch(source, size)))
+            elif kind == 'unbatch':
+                units.append((label, chain.from_iterable))
+            elif kind == 'window':
+                units.append((label, lambda source, args=arg: _window(source, *args)))
+            elif kind == 'take':
+                units.append((label, lambda source, count=arg: islice(source, count)))
+            i += 1
+        return units
+
+    def __iter__(self) -> Iterator[Any]:
+        source = iter(self.source)
+        stream = source
+        if self.profile:
+            self._stats = [StageStats('source')]
+            stream = _metered(stream, self._stats[0])
+        for name, build in self._units():
+            stream = build(stream)
+            if self.profile:
+                self._stats.append(StageStats(name))
+                stream = _metered(stream, self._stats[-1])
+        try:
+            yield from stream
+        finally:
+            # Close the source even when a stage such as take() stopped early
+            close = getattr(source, 'close', None)
+            if close is not None:
+                close()
+
+    def collect(self) -> List[Any]:
+        """
+        Runs the pipeline and returns all items as a list
+        """
+        return list(self)
+
+    def stats(self) -> List[StageStats]:
+        """
+        Per-stage counters from the latest profiled run, upstream first
+        (including the pipeline this one was tee'd from)
+        """
+        upstream = self._upstream.stats() if self._upstream is not None else []
+        previous = None
+        for stats in self._stats:
+            stats.items_in = previous.items_out if previous else stats.items_out
+            stats.seconds = stats._inclusive - (previous._inclusive if previous else 0.0)
+            previous = stats
+        return upstream + self._stats
+
+    def print_stats(self) -> None:
+        """
+        Prints the per-stage counters as a table
+        """
+        for stats in self.stats():
+            print(f"{stats.name:<40} in={stats.items_in:<10} out={stats.items_out:<10} "
+                  f"{stats.seconds:8.3f}s {stats.throughput:14,.0f} items/s")
@@ -1,12 +1,1019 @@
 import mysql.connector
 from mysql.connector import Error
 import uuid
+import argparse
+import base64
 import csv
-from typing import Generator, Dict, Any, Optional
+import gzip
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from itertools import accumulate, islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Generator, Dict, Any, Iterable, List, Optional, Tuple, TypeVar
+
+try:
+    import zstandard
+except ImportError:  # Optional; only needed for zstd-compressed exports
+    zstandard = None
+
+# Columns of the user_data table, in table order
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+# Export settings for export_user_data
+EXPORT_FORMATS = ('ndjson', 'csv', 'columnar')
+EXPORT_COMPRESSIONS = ('none', 'gzip', 'zstd')
+EXPORT_ROWS_PER_FILE = 1000000
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# Columnar file layout: the magic, then row groups of
+#   <I row count, <h ages, and for user_id, name and email:
+#   <I heap length, <I offsets (row count + 1), UTF-8 heap
+COLUMNAR_MAGIC = b'UDCOL\x01'
+COLUMNAR_GROUP_ROWS = 65536
+COLUMNAR_STRING_COLUMNS = ('user_id', 'name', 'email')
+
+# Rows per executemany/commit when bulk loading from CSV
+BULK_CHUNK_SIZE = 5000
+
+BULK_INSERT_QUERY = """
+INSERT INTO user_data (user_id, name, email, age)
+VALUES ({user_id}, %s, %s, %s)
+"""
+
+# Records diffed and upserted per transaction by sync_users
+SYNC_BATCH_SIZE = 5000
+SYNC_MATCH_COLUMNS = ('user_id', 'email')
+
+# Row hash compared by sync_users; user_record_hash computes the same value
+SYNC_HASH_SQL = "MD5(CONCAT_WS(CHAR(31), name, email, age))"
+
+UPSERT_QUERY = """
+INSERT INTO user_data (user_id, name, email, age)
+VALUES ({user_id}, %s, %s, %s)
+ON DUPLICATE KEY UPDATE name = VALUES(name), email = VALUES(email), age = VALUES(age)
+"""
+
+# Rows copied per transaction by migrate_user_data
+MIGRATION_BATCH_SIZE = 10000
+
+# Triggers that mirror every write to user_data into user_data_v2 while
+# migrate_user_data copies the table, so nothing changed during the copy
+# is lost. REPLACE lets a mirrored write overwrite a row copied earlier.
+MIGRATION_TRIGGERS = {
+    'user_data_migrate_insert': """
+        CREATE TRIGGER user_data_migrate_insert AFTER INSERT ON user_data FOR EACH ROW
+        REPLACE INTO user_data_v2 (user_id, name, email, age)
+        VALUES (UUID_TO_BIN(NEW.user_id), NEW.name, NEW.email, NEW.age)
+    """,
+    'user_data_migrate_update': """
+        CREATE TRIGGER user_data_migrate_update AFTER UPDATE ON user_data FOR EACH ROW
+        BEGIN
+            DELETE FROM user_data_v2 WHERE user_id = UUID_TO_BIN(OLD.user_id);
+            REPLACE INTO user_data_v2 (user_id, name, email, age)
+            VALUES (UUID_TO_BIN(NEW.user_id), NEW.name, NEW.email, NEW.age);
+        END
+    """,
+    'user_data_migrate_delete': """
+        CREATE TRIGGER user_data_migrate_delete AFTER DELETE ON user_data FOR EACH ROW
+        DELETE FROM user_data_v2 WHERE user_id = UUID_TO_BIN(OLD.user_id)
+    """,
+}
+
+# Seconds a detected user_id layout is trusted for one connection before
+# it is looked up again, so a migration run by another process is noticed
+USER_ID_LAYOUT_TTL = 5.0
+
+# Layout of user_data.user_id per connection, see uses_binary_user_ids():
+# connection -> (True for BINARY(16), monotonic time of the lookup)
+_user_id_layouts = weakref.WeakKeyDictionary()
+_user_id_layouts_lock = threading.Lock()
+
+
+def user_columns_sql(binary_ids: bool, cast_age: bool = False) -> str:
+    """
+    Returns the select list for user_data. BINARY(16) ids are converted
+    back to their usual 36-character form, so callers always see strings.
+
+    The converted column keeps the name user_id, and MySQL resolves an
+    unqualified ORDER BY user_id to that alias, which cannot use the
+    primary key. Queries over this select list must order by
+    user_data.user_id instead.
+    """
+    user_id = "BIN_TO_UUID(user_id) AS user_id" if binary_ids else "user_id"
+    age = "CAST(age AS SIGNED) AS age" if cast_age else "age"
+    return f"{user_id}, name, email, {age}"
+
+
+def user_id_placeholder(binary_ids: bool) -> str:
+    """
+    Returns the placeholder for a user_id parameter. Converting the
+    parameter (rather than the column) keeps the primary key usable.
+    """
+    return "UUID_TO_BIN(%s)" if binary_ids else "%s"
+
+# Shared connection pool settings used by the generator entry points
+POOL_SIZE = 5
+POOL_MAX_IDLE = 300.0       # Seconds an idle connection is kept open
+POOL_TIMEOUT = 10.0         # Seconds to wait for a free connection
+POOL_PING_AFTER = 5.0       # Only ping connections idle for longer than this
+
+# Default number of user_id ranges for partitioned scans
+SCAN_PARTITIONS = 4
+
+# Defaults for AdaptiveBatchSizer
+ADAPTIVE_TARGET_LATENCY = 0.02      # Seconds per fetchmany call
+ADAPTIVE_MEMORY_BUDGET = 4 << 20    # Bytes held by one batch
+ADAPTIVE_MIN_BATCH = 16
+ADAPTIVE_MAX_BATCH = 50000
+
+
+class _DefaultHandler(logging.StreamHandler):
+    """
+    Prints the seed logger's messages to stdout, like the print calls it
+    replaced, until the application configures logging itself (gives the
+    root logger a handler); from then on records only propagate
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self.setFormatter(logging.Formatter('%(message)s'))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not logging.getLogger().handlers:
+            self.stream = sys.stdout  # Follow redirections made after import
+            super().emit(record)
+
+
+# Progress reports, errors and diagnostics of the seed helpers. INFO and
+# above are shown by default; set the level to DEBUG for per-page detail.
+logger = logging.getLogger('seed')
+logger.setLevel(logging.INFO)
+logger.addHandler(_DefaultHandler())
+
+# Seconds between periodic instrumentation summaries
+INSTRUMENTATION_SUMMARY_EVERY = 10.0
+
+# Namespace for user_ids derived from a row's position and content, so
+# reloading the same CSV always produces the same ids
+USER_ID_NAMESPACE = uuid.UUID('6f1c2b0e-4d1a-4c55-9a63-2f7d8e1b9c40')
+
+
+def csv_row_to_record(row: Dict[str, str], position: Optional[int] = None) -> Tuple[str, str, str, int]:
+    """
+    Converts a CSV row into a (user_id, name, email, age) tuple,
+    generating a UUID if the CSV does not provide one
+
+    Args:
+        row: Row produced by csv.DictReader
+        position: Byte offset of the row in its file. When given, a missing
+            id is derived from the position and content (uuid5) instead of
+            generated randomly (uuid4), so reloading the same file produces
+            the same ids while identical rows still get distinct ids.
+    """
+    user_id = row.get('user_id')
+    if not user_id:
+        if position is not None:
+            key = f"{position}\x1f{row['name']}\x1f{row['email']}\x1f{row['age']}"
+            user_id = str(uuid.uuid5(USER_ID_NAMESPACE, key))
+        else:
+            user_id = str(uuid.uuid4())
+    return (user_id, row['name'], row['email'], int(row['age']))
+
+
+def _sync_key(value: str) -> str:
+    # sync_users matches user_ids and emails the way MySQL's case-insensitive
+    # collation does
+    return value.casefold()
+
+
+def user_record_hash(name: str, email: str, age: int) -> str:
+    """
+    Hex MD5 of a record's name, email and age, equal to SYNC_HASH_SQL
+    evaluated on the stored row
+    """
+    return hashlib.md5(f"{name}\x1f{email}\x1f{int(age)}".encode('utf-8')).hexdigest()
+
+
+def read_csv_chunks(csv_file_path: str,
+                    chunk_size: int = BULK_CHUNK_SIZE) -> Generator[List[Tuple[str, str, str, int]], None, None]:
+    """
+    Generator that reads a CSV file and yields lists of record tuples
+    of at most chunk_size rows, so only one chunk is held in memory
+    """
+    with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
+        chunk = []
+        for row in csv.DictReader(csvfile):
+            chunk.append(csv_row_to_record(row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def open_stream_cursor(connection: mysql.connector.connection.MySQLConnection,
+                       dictionary: bool = False):
+    """
+    Opens an unbuffered cursor. Rows stay on the server and are read off
+    the socket as they are fetched, so client memory does not grow with
+    the size of the result set, whatever the connection's buffered default.
+    """
+    return connection.cursor(dictionary=dictionary, buffered=False)
+
+
+def close_stream_cursor(cursor, connection: mysql.connector.connection.MySQLConnection,
+                        drain: bool = False) -> None:
+    """
+    Closes a cursor opened by open_stream_cursor.
+
+    If the consumer stopped before the end of the result set, the remaining
+    rows are still in flight and the connection cannot be reused until they
+    are read. With drain=True they are read and discarded (use this for
+    connections owned by the caller); otherwise the connection is shut down
+    rather than reading what may be millions of rows, and the pool discards
+    it on release.
+    """
+    if getattr(connection, 'unread_result', False):
+        if drain:
+            connection.consume_results()
+        else:
+            shutdown = getattr(connection, 'shutdown', connection.close)
+            try:
+                shutdown()
+            except Error:
+                pass
+            return
+    cursor.close()
+
+
+def encode_cursor(last_user_id: str) -> str:
+    """
+    Encodes the last user_id of a page as an opaque, URL-safe token
+    """
+    payload = json.dumps({'after': last_user_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[str]:
+    """
+    Decodes a token produced by encode_cursor back into a user_id.
+    None (or an empty token) means "start from the beginning".
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))['after']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {token!r}") from e
+
+
+T = TypeVar('T')
+
+_END_OF_STREAM = object()
+
+
+class _ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def read_ahead(source: Iterable[T], depth: int) -> Generator[T, None, None]:
+    """
+    Iterates source on a background thread, keeping up to depth items
+    ready so the consumer's processing overlaps with fetching the next ones.
+
+    The queue between the two threads is bounded, so the producer stops
+    fetching while depth items are waiting. Exceptions raised by source are
+    re-raised in the consumer. Closing this generator (or breaking out of
+    the loop) stops the producer and waits for it to close source, so any
+    connection it holds is released before close() returns.
+
+    Args:
+        source: Iterable to consume, typically another generator
+        depth: Maximum number of items fetched ahead of the consumer
+    """
+    buffer = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Blocks while the buffer is full, but gives up once stop is set
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_END_OF_STREAM)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+
+    producer = threading.Thread(target=produce, name='read-ahead', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+class NullInstrumentation:
+    """
+    Instrumentation that records nothing. It is installed by default, so
+    an instrumented call costs one no-op method call per batch, page or
+    connection, and nothing per row.
+    """
+
+    enabled = False
+    _timer = nullcontext()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, seconds: float) -> None:
+        pass
+
+    def timer(self, name: str):
+        return self._timer
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'counters': {}, 'timers': {}}
+
+
+class Instrumentation(NullInstrumentation):
+    """
+    Thread-safe counters (connections opened, rows read and written, ...)
+    and timers (batch and page latencies). A summary is logged every
+    summary_every seconds while counts come in, and on demand with
+    log_summary().
+    """
+
+    enabled = True
+
+    def __init__(self, log: Optional[logging.Logger] = None,
+                 summary_every: Optional[float] = INSTRUMENTATION_SUMMARY_EVERY):
+        self.log = log or logger
+        self.summary_every = summary_every
+        self.counters: Counter = Counter()
+        self.timers: Dict[str, List[float]] = {}  # name -> [count, total, max]
+        self._lock = threading.Lock()
+        self._last_summary = time.monotonic()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+        self._maybe_summarize()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the counters and, per timer, its count, total, mean and max seconds
+        """
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'timers': {name: {'count': count, 'total': total, 'mean': total / count, 'max': longest}
+                           for name, (count, total, longest) in self.timers.items()},
+            }
+
+    def summary(self) -> str:
+        state = self.snapshot()
+        parts = [f"{name}={value}" for name, value in sorted(state['counters'].items())]
+        parts += [f"{name}: n={timer['count']} mean={timer['mean'] * 1000:.2f}ms max={timer['max'] * 1000:.2f}ms"
+                  for name, timer in sorted(state['timers'].items())]
+        return ', '.join(parts) or 'nothing recorded'
+
+    def log_summary(self) -> None:
+        self._last_summary = time.monotonic()
+        self.log.info("Instrumentation: %s", self.summary())
+
+    def _maybe_summarize(self) -> None:
+        if self.summary_every is not None and time.monotonic() - self._last_summary >= self.summary_every:
+            self.log_summary()
+
+
+_instrumentation = NullInstrumentation()
+
+
+def get_instrumentation() -> NullInstrumentation:
+    """
+    Returns the active instrumentation (a NullInstrumentation unless
+    enable_instrumentation() was called)
+    """
+    return _instrumentation
+
+
+def enable_instrumentation(log: Optional[logging.Logger] = None,
+                           summary_every: Optional[float] = INSTRUMENTATION_SUMMARY_EVERY) -> Instrumentation:
+    """
+    Starts recording counters and timers, logging a summary every
+    summary_every seconds (None for no periodic summaries)
+    """
+    global _instrumentation
+    _instrumentation = Instrumentation(log, summary_every)
+    return _instrumentation
+
+
+def disable_instrumentation() -> None:
+    """
+    Logs a final summary and goes back to recording nothing
+    """
+    global _instrumentation
+    instrumentation, _instrumentation = _instrumentation, NullInstrumentation()
+    if instrumentation.enabled:
+        instrumentation.log_summary()
+
+
+def _row_bytes(row: Any) -> int:
+    values = row.values() if isinstance(row, dict) else row
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses fetchmany sizes from measured fetch latency and row size.
+
+    After each fetch, record() updates running estimates of seconds per
+    row and bytes per row. The next size is the number of rows that fits
+    both the target latency and the memory budget. It changes by at most
+    a factor of two per fetch, so one slow round trip does not collapse
+    the batch size.
+    """
+
+    def __init__(self, initial: int = 100, target_latency: float = ADAPTIVE_TARGET_LATENCY,
+                 memory_budget: int = ADAPTIVE_MEMORY_BUDGET, min_size: int = ADAPTIVE_MIN_BATCH,
+                 max_size: int = ADAPTIVE_MAX_BATCH):
+        self.target_latency = target_latency
+        self.memory_budget = memory_budget
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = min(max(initial, min_size), max_size)
+        self.seconds_per_row = None
+        self.bytes_per_row = None
+        self.batches = 0
+        self.rows = 0
+        self.sizes: List[Tuple[int, int]] = [(0, self.size)]  # (batch number, new size)
+
+    def record(self, rows: List[Any], seconds: float) -> int:
+        """
+        Records one fetch and returns the size to use for the next one
+
+        Args:
+            rows: Rows returned by the fetch
+            seconds: Time the fetch took
+        """
+        if not rows:
+            return self.size
+        self.batches += 1
+        self.rows += len(rows)
+
+        # Size a handful of evenly spaced rows rather than the whole batch
+        step = max(len(rows) // 8, 1)
+        sample = rows[::step]
+        row_bytes = sum(_row_bytes(row) for row in sample) / len(sample)
+        row_seconds = seconds / len(rows)
+        if self.seconds_per_row is None:
+            self.seconds_per_row, self.bytes_per_row = row_seconds, row_bytes
+        else:
+            self.seconds_per_row = (self.seconds_per_row + row_seconds) / 2
+            self.bytes_per_row = (self.bytes_per_row + row_bytes) / 2
+
+        wanted = min(self.target_latency / max(self.seconds_per_row, 1e-9),
+                     self.memory_budget / self.bytes_per_row)
+        size = int(min(max(wanted, self.size / 2), self.size * 2))
+        size = min(max(size, self.min_size), self.max_size)
+        if size != self.size:
+            self.size = size
+            self.sizes.append((self.batches, size))
+        return self.size
+
+    def report(self) -> str:
+        """
+        One-line summary of the sizes chosen so far
+        """
+        chosen = [size for _, size in self.sizes]
+        return (f"Adaptive batches: {self.batches} fetches, {self.rows} rows, "
+                f"size {chosen[0]} -> {self.size} (range {min(chosen)}-{max(chosen)}), "
+                f"~{self.bytes_per_row or 0:.0f} bytes/row, "
+                f"~{(self.seconds_per_row or 0) * 1e6:.1f} us/row")
+
+
+def adaptive_sizer(adaptive: Any, initial: int) -> Optional[AdaptiveBatchSizer]:
+    """
+    Resolves the adaptive argument of the streaming functions: an
+    AdaptiveBatchSizer is used as is, True creates one starting at initial
+    """
+    if isinstance(adaptive, AdaptiveBatchSizer):
+        return adaptive
+    return AdaptiveBatchSizer(initial) if adaptive else None
+
+
+def uses_binary_user_ids(connection: mysql.connector.connection.MySQLConnection) -> bool:
+    """
+    Reports whether user_data.user_id is stored as BINARY(16) (see
+    migrate_user_data). The answer is remembered per connection for
+    USER_ID_LAYOUT_TTL seconds, so a migration run by another process is
+    picked up shortly afterwards.
+    """
+    try:
+        with _user_id_layouts_lock:
+            cached = _user_id_layouts.get(connection)
+    except TypeError:  # Connections that cannot be weakly referenced are not cached
+        cached = None
+    if cached is not None and time.monotonic() - cached[1] <= USER_ID_LAYOUT_TTL:
+        return cached[0]
+
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT DATA_TYPE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = 'user_data' AND COLUMN_NAME = 'user_id'
+        """)
+        row = cursor.fetchone()
+        binary_ids = bool(row) and str(row[0]).lower() == 'binary'
+    except Error:
+        # Servers without information_schema only have the original layout
+        binary_ids = False
+    finally:
+        if cursor:
+            cursor.close()
+    _remember_user_id_layout(connection, binary_ids)
+    return binary_ids
+
+
+def _remember_user_id_layout(connection: mysql.connector.connection.MySQLConnection,
+                             binary_ids: bool) -> None:
+    try:
+        with _user_id_layouts_lock:
+            _user_id_layouts[connection] = (binary_ids, time.monotonic())
+    except TypeError:
+        pass
+
+
+def forget_user_id_layout(connection: mysql.connector.connection.MySQLConnection) -> None:
+    """
+    Makes the next uses_binary_user_ids call on connection look the layout
+    up again, e.g. after a write failed because an id did not fit
+    """
+    try:
+        with _user_id_layouts_lock:
+            _user_id_layouts.pop(connection, None)
+    except TypeError:
+        pass
+
+
+class Condition(ABC):
+    """
+    Base class for filters over user_data columns. Conditions can be
+    combined with & and |, turned into a parameterized SQL fragment with
+    to_sql() and evaluated against a row dictionary with matches().
+    """
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        """
+        Returns (sql, params), or None if the condition cannot be pushed down
+
+        Args:
+            binary_ids: user_data stores user_id as BINARY(16)
+        """
+        return None
+
+    @abstractmethod
+    def matches(self, row: Dict[str, Any]) -> bool:
+        """
+        Evaluates the condition against a row dictionary, with SQL's NULL
+        semantics where they differ from Python's
+        """
+
+    def __and__(self, other: 'Condition') -> 'Condition':
+        return And(self, other)
+
+    def __or__(self, other: 'Condition') -> 'Condition':
+        return Or(self, other)
+
+
+class Column:
+    """
+    Reference to a user_data column used to build conditions, e.g.
+    col('age') > 25, col('age').between(18, 30), col('email').isin([...])
+    """
+
+    def __init__(self, name: str):
+        if name not in USER_COLUMNS:
+            raise ValueError(f"Unknown user_data column {name!r}")
+        self.name = name
+
+    def __gt__(self, value: Any) -> Condition:
+        return Comparison(self.name, '>', value)
+
+    def __ge__(self, value: Any) -> Condition:
+        return Comparison(self.name, '>=', value)
+
+    def __lt__(self, value: Any) -> Condition:
+        return Comparison(self.name, '<', value)
+
+    def __le__(self, value: Any) -> Condition:
+        return Comparison(self.name, '<=', value)
+
+    def __eq__(self, value: Any) -> Condition:
+        return Comparison(self.name, '=', value)
+
+    def __ne__(self, value: Any) -> Condition:
+        return Comparison(self.name, '!=', value)
+
+    __hash__ = None
+
+    def between(self, low: Any, high: Any) -> Condition:
+        return Between(self.name, low, high)
+
+    def isin(self, values: Iterable[Any]) -> Condition:
+        return In(self.name, values)
+
+
+def col(name: str) -> Column:
+    """
+    Returns a Column for building filter conditions
+    """
+    return Column(name)
+
+
+class Comparison(Condition):
+    _OPERATORS = {
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '=': lambda a, b: a == b,
+        '!=': lambda a, b: a != b,
+    }
+
+    def __init__(self, column: str, operator: str, value: Any):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        if self.value is None:
+            # "= NULL" never matches in SQL; compare with None means IS [NOT] NULL
+            if self.operator == '=':
+                return f"{self.column} IS NULL", []
+            if self.operator == '!=':
+                return f"{self.column} IS NOT NULL", []
+        placeholder = _placeholder(self.column, binary_ids)
+        return f"{self.column} {self.operator} {placeholder}", [self.value]
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        value = row[self.column]
+        if self.value is None:
+            if self.operator == '=':
+                return value is None
+            if self.operator == '!=':
+                return value is not None
+            return False
+        if value is None:
+            # Any other comparison with NULL is unknown, which SQL treats as false
+            return False
+        return self._OPERATORS[self.operator](value, self.value)
+
+
+class Between(Condition):
+    def __init__(self, column: str, low: Any, high: Any):
+        self.column = column
+        self.low = low
+        self.high = high
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        placeholder = _placeholder(self.column, binary_ids)
+        return f"{self.column} BETWEEN {placeholder} AND {placeholder}", [self.low, self.high]
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return self.low <= row[self.column] <= self.high
+
+
+class In(Condition):
+    def __init__(self, column: str, values: Iterable[Any]):
+        self.column = column
+        self.values = list(values)
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        if not self.values:
+            return "1 = 0", []
+        placeholders = ', '.join([_placeholder(self.column, binary_ids)] * len(self.values))
+        return f"{self.column} IN ({placeholders})", list(self.values)
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return row[self.column] in self.values
+
+
+class Where(Condition):
+    """
+    Arbitrary Python predicate over a row dictionary. It is never pushed
+    down, so rows are filtered after they have been fetched.
+    """
+
+    def __init__(self, predicate: Callable[[Dict[str, Any]], bool]):
+        self.predicate = predicate
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return bool(self.predicate(row))
+
+
+class And(Condition):
+    def __init__(self, *conditions: Condition):
+        self.conditions = conditions
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        return _join_sql(self.conditions, 'AND', binary_ids)
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return all(condition.matches(row) for condition in self.conditions)
+
+
+class Or(Condition):
+    def __init__(self, *conditions: Condition):
+        self.conditions = conditions
+
+    def to_sql(self, binary_ids: bool = False) -> Optional[Tuple[str, List[Any]]]:
+        return _join_sql(self.conditions, 'OR', binary_ids)
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return any(condition.matches(row) for condition in self.conditions)
+
+
+def _placeholder(column: str, binary_ids: bool) -> str:
+    return user_id_placeholder(binary_ids) if column == 'user_id' else '%s'
+
+
+def _join_sql(conditions: Iterable[Condition], keyword: str,
+              binary_ids: bool) -> Optional[Tuple[str, List[Any]]]:
+    parts = []
+    params = []
+    for condition in conditions:
+        compiled = condition.to_sql(binary_ids)
+        if compiled is None:
+            return None
+        parts.append(f"({compiled[0]})")
+        params.extend(compiled[1])
+    return f" {keyword} ".join(parts), params
+
+
+def _conjuncts(condition: Condition) -> List[Condition]:
+    if isinstance(condition, And):
+        return [term for nested in condition.conditions for term in _conjuncts(nested)]
+    return [condition]
+
+
+def compile_filter(condition: Optional[Condition],
+                   binary_ids: bool = False) -> Tuple[str, List[Any], Optional[Callable[[Dict[str, Any]], bool]]]:
+    """
+    Splits a condition into the part MySQL can evaluate and the part that
+    has to run in Python. Top-level AND terms are pushed down individually;
+    an OR is pushed down only if all of its branches can be.
+
+    Args:
+        condition: Filter to compile, or None
+        binary_ids: user_data stores user_id as BINARY(16)
+
+    Returns:
+        (where_clause, params, residual) where where_clause is '' or starts
+        with ' WHERE', and residual is None or a predicate over row dicts
+    """
+    if condition is None:
+        return '', [], None
+
+    terms = _conjuncts(condition)
+    pushed = []
+    params = []
+    residual = []
+    for term in terms:
+        compiled = term.to_sql(binary_ids)
+        if compiled is None:
+            residual.append(term)
+        else:
+            pushed.append(f"({compiled[0]})")
+            params.extend(compiled[1])
+
+    where_clause = f" WHERE {' AND '.join(pushed)}" if pushed else ''
+    residual_predicate = And(*residual).matches if residual else None
+    return where_clause, params, residual_predicate
+
+
+def summarize_age_histogram(histogram: Counter, percentiles: Iterable[float] = ()) -> Dict[str, Any]:
+    """
+    Builds age statistics from an age -> count histogram. Ages are
+    DECIMAL(3,0), so the histogram never has more than 1999 entries.
+    Percentiles use the nearest-rank method.
+
+    Returns:
+        Dictionary with count, average, min, max and a percentiles mapping
+    """
+    count = sum(histogram.values())
+    if count == 0:
+        return {'count': 0, 'average': 0.0, 'min': None, 'max': None,
+                'percentiles': {p: None for p in percentiles}}
+
+    ages = sorted(histogram)
+    result = {
+        'count': count,
+        'average': sum(age * n for age, n in histogram.items()) / count,
+        'min': ages[0],
+        'max': ages[-1],
+        'percentiles': {},
+    }
+    for p in percentiles:
+        rank = max(math.ceil(p / 100 * count), 1)
+        seen = 0
+        for age in ages:
+            seen += histogram[age]
+            if seen >= rank:
+                result['percentiles'][p] = age
+                break
+    return result
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections.
+
+    Connections are created on demand up to max_size. Idle connections are
+    closed once they have been unused for max_idle seconds, connections that
+    sat idle for more than ping_after seconds are pinged before being handed
+    out, and acquire() raises TimeoutError if no connection frees up within
+    timeout seconds.
+    """
+
+    def __init__(self, factory: Callable[[], mysql.connector.connection.MySQLConnection],
+                 max_size: int = POOL_SIZE, max_idle: float = POOL_MAX_IDLE,
+                 timeout: float = POOL_TIMEOUT, ping_after: float = POOL_PING_AFTER):
+        self._factory = factory
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = deque()    # (connection, released_at), most recent last
+        self._size = 0          # Open connections, idle or checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> mysql.connector.connection.MySQLConnection:
+        """
+        Checks out a connection, reusing a healthy idle one when possible
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to self.timeout)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            candidate = None
+            with self._cond:
+                expired = self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._close_all(expired)
+                        raise TimeoutError(
+                            f"No database connection available after {timeout:.1f}s "
+                            f"(pool size {self.max_size})")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    self._size += 1
+            self._close_all(expired)
+
+            if candidate is None:
+                try:
+                    return self._factory()
+                except Exception:
+                    self._forget()
+                    raise
+
+            connection, released_at = candidate
+            if time.monotonic() - released_at <= self.ping_after or self._is_healthy(connection):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection: mysql.connector.connection.MySQLConnection) -> None:
+        """
+        Returns a connection to the pool, ending any open transaction.
+        Connections that are broken or still have unread results are closed.
+        """
+        try:
+            if getattr(connection, 'unread_result', False):
+                raise Error("Unread result on released connection")
+            connection.rollback()
+        except Error:
+            self._discard(connection)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(connection)
+
+    def close(self) -> None:
+        """
+        Closes all idle connections. Checked-out connections are closed
+        when they are released back to a pool that no longer wants them.
+        """
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def _evict_idle(self) -> List[mysql.connector.connection.MySQLConnection]:
+        # Called with the lock held; the oldest idle connections are at the left
+        expired = []
+        cutoff = time.monotonic() - self.max_idle
+        while self._idle and self._idle[0][1] < cutoff:
+            expired.append(self._idle.popleft()[0])
+        self._size -= len(expired)
+        return expired
+
+    def _is_healthy(self, connection: mysql.connector.connection.MySQLConnection) -> bool:
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _discard(self, connection: mysql.connector.connection.MySQLConnection) -> None:
+        self._close_all([connection])
+        self._forget()
+
+    def _forget(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_all(connections: List[mysql.connector.connection.MySQLConnection]) -> None:
+        for connection in connections:
+            try:
+                connection.close()
+            except Error:
+                pass
+
 
 class DatabaseManager:
     def __init__(self):
         self.connection = None
+        self.pool = None  # Pool the connection was checked out from, if any
     
     def connect_db(self) -> mysql.connector.connection.MySQLConnection:
         """
@@ -19,10 +1026,11 @@ class DatabaseManager:
                 password=''   # Change as per your setup
             )
             if connection.is_connected():
-                print("Connected to MySQL server")
+                logger.debug("Connected to MySQL server")
+                get_instrumentation().count('connections_opened')
                 return connection
         except Error as e:
-            print(f"Error while connecting to MySQL: {e}")
+            logger.error("Error while connecting to MySQL: %s", e)
             raise
     
     def create_database(self, connection: mysql.connector.connection.MySQLConnection) -> None:
@@ -32,18 +1040,27 @@ class DatabaseManager:
         try:
             cursor = connection.cursor()
             cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
-            print("Database ALX_prodev created or already exists")
+            logger.info("Database ALX_prodev created or already exists")
         except Error as e:
-            print(f"Error creating database: {e}")
+            logger.error("Error creating database: %s", e)
             raise
         finally:
             if cursor:
                 cursor.close()
     
-    def connect_to_prodev(self) -> mysql.connector.connection.MySQLConnection:
+    def connect_to_prodev(self, pooled: bool = False) -> mysql.connector.connection.MySQLConnection:
         """
         Connects to the ALX_prodev database in MySQL
+
+        Args:
+            pooled: Check the connection out of the shared pool instead of
+                opening a new one; close_connection() returns it to the pool
         """
+        if pooled:
+            self.pool = get_pool()
+            self.connection = self.pool.acquire()
+            return self.connection
+
         try:
             connection = mysql.connector.connect(
                 host='localhost',
@@ -52,33 +1069,45 @@ class DatabaseManager:
                 database='ALX_prodev'
             )
             if connection.is_connected():
-                print("Connected to ALX_prodev database")
+                logger.debug("Connected to ALX_prodev database")
+                get_instrumentation().count('connections_opened')
                 self.connection = connection
                 return connection
         except Error as e:
-            print(f"Error while connecting to ALX_prodev database: {e}")
+            logger.error("Error while connecting to ALX_prodev database: %s", e)
             raise
     
-    def create_table(self, connection: mysql.connector.connection.MySQLConnection) -> None:
+    def create_table(self, connection: mysql.connector.connection.MySQLConnection,
+                     binary_ids: bool = False, table_name: str = 'user_data') -> None:
         """
         Creates a table user_data if it does not exist with the required fields
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            binary_ids: Store user_id as BINARY(16) instead of VARCHAR(36)
+            table_name: Name of the table to create (used by migrate_user_data)
         """
         try:
             cursor = connection.cursor()
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS user_data (
-                user_id VARCHAR(36) PRIMARY KEY,
+            # The primary key is already an index on user_id; the secondary
+            # indexes serve the age filters and email lookups
+            create_table_query = f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                user_id {'BINARY(16)' if binary_ids else 'VARCHAR(36)'} PRIMARY KEY,
                 name VARCHAR(255) NOT NULL,
                 email VARCHAR(255) NOT NULL,
                 age DECIMAL(3,0) NOT NULL,
-                INDEX idx_user_id (user_id)
+                INDEX idx_age (age),
+                INDEX idx_email (email)
             )
             """
             cursor.execute(create_table_query)
+            if table_name == 'user_data':
+                forget_user_id_layout(connection)
             connection.commit()
-            print("Table user_data created or already exists")
+            logger.info("Table %s created or already exists", table_name)
         except Error as e:
-            print(f"Error creating table: {e}")
+            logger.error("Error creating table: %s", e)
             raise
         finally:
             if cursor:
@@ -91,15 +1120,17 @@ class DatabaseManager:
         try:
             cursor = connection.cursor()
             
+            user_id = user_id_placeholder(uses_binary_user_ids(connection))
+            
             # Check if user already exists
-            check_query = "SELECT user_id FROM user_data WHERE user_id = %s"
+            check_query = f"SELECT user_id FROM user_data WHERE user_id = {user_id}"
             cursor.execute(check_query, (data['user_id'],))
             existing_user = cursor.fetchone()
             
             if not existing_user:
-                insert_query = """
+                insert_query = f"""
                 INSERT INTO user_data (user_id, name, email, age)
-                VALUES (%s, %s, %s, %s)
+                VALUES ({user_id}, %s, %s, %s)
                 """
                 cursor.execute(insert_query, (
                     data['user_id'],
@@ -108,54 +1139,316 @@ class DatabaseManager:
                     data['age']
                 ))
                 connection.commit()
-                print(f"Inserted user: {data['name']}")
+                logger.debug("Inserted user: %s", data['name'])
+                get_instrumentation().count('rows_written')
             else:
-                print(f"User {data['name']} already exists")
+                logger.debug("User %s already exists", data['name'])
+                get_instrumentation().count('rows_skipped')
                 
         except Error as e:
-            print(f"Error inserting data: {e}")
+            forget_user_id_layout(connection)
+            logger.error("Error inserting data: %s", e)
             raise
         finally:
             if cursor:
                 cursor.close()
     
-    def load_data_from_csv(self, connection: mysql.connector.connection.MySQLConnection, csv_file_path: str) -> None:
+    def bulk_insert_data(self, connection: mysql.connector.connection.MySQLConnection,
+                         rows: List[Tuple[str, str, str, int]]) -> int:
+        """
+        Inserts a chunk of (user_id, name, email, age) tuples with a single
+        executemany call and one commit. Rows whose user_id already exists,
+        or repeats within the chunk, are skipped after one primary key
+        lookup for the whole chunk instead of a SELECT per row. The insert
+        itself is a plain INSERT, so a value that does not fit its column
+        raises instead of being truncated the way INSERT IGNORE would.
+
+        Returns:
+            Number of rows actually inserted
+        """
+        if not rows:
+            return 0
+
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            binary_ids = uses_binary_user_ids(connection)
+            placeholder = user_id_placeholder(binary_ids)
+            user_id = "BIN_TO_UUID(user_id)" if binary_ids else "user_id"
+            ids = list({row[0] for row in rows})
+            instrumentation = get_instrumentation()
+            with instrumentation.timer('bulk_insert'):
+                cursor.execute(f"SELECT {user_id} FROM user_data "
+                               f"WHERE user_id IN ({', '.join([placeholder] * len(ids))})", ids)
+                # Ids compare case-insensitively in both layouts
+                seen = {found.lower() for (found,) in cursor.fetchall()}
+                new_rows = []
+                for row in rows:
+                    key = row[0].lower()
+                    if key not in seen:
+                        seen.add(key)
+                        new_rows.append(row)
+                if new_rows:
+                    cursor.executemany(BULK_INSERT_QUERY.format(user_id=placeholder), new_rows)
+                connection.commit()
+            inserted = len(new_rows)
+            instrumentation.count('rows_written', inserted)
+            instrumentation.count('rows_skipped', len(rows) - inserted)
+            return inserted
+        except Error as e:
+            connection.rollback()
+            forget_user_id_layout(connection)
+            logger.error("Error bulk inserting data: %s", e)
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def bulk_load_data_from_csv(self, connection: mysql.connector.connection.MySQLConnection,
+                                csv_file_path: str,
+                                chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Loads data from a CSV file in chunks, one multi-row INSERT and one
+        commit per chunk (see bulk_insert_data)
+
+        Returns:
+            Dictionary with inserted/skipped counts, elapsed seconds and rows/second
+        """
+        inserted = 0
+        skipped = 0
+        start = time.perf_counter()
+
+        for chunk in read_csv_chunks(csv_file_path, chunk_size):
+            chunk_inserted = self.bulk_insert_data(connection, chunk)
+            inserted += chunk_inserted
+            skipped += len(chunk) - chunk_inserted
+
+        elapsed = time.perf_counter() - start
+        rate = (inserted + skipped) / elapsed if elapsed > 0 else 0.0
+        logger.info("Loaded %d rows (%d already existed) in %.2fs (%.0f rows/s)",
+                    inserted, skipped, elapsed, rate)
+        return {
+            'inserted': inserted,
+            'skipped': skipped,
+            'seconds': elapsed,
+            'rows_per_second': rate,
+        }
+
+    def _stored_hashes(self, connection: mysql.connector.connection.MySQLConnection,
+                       keys: List[str], match_on: str, binary_ids: bool) -> Dict[str, Tuple[str, str]]:
+        """
+        Looks up the stored rows whose match_on column is one of keys.
+        MySQL compares both columns case-insensitively, so the result is
+        keyed by the case-folded value (see _sync_key).
+
+        Returns:
+            Dictionary mapping each found key, case-folded, to (user_id, row hash)
+        """
+        if match_on == 'user_id':
+            placeholders = ', '.join([user_id_placeholder(binary_ids)] * len(keys))
+        else:
+            placeholders = ', '.join(['%s'] * len(keys))
+        user_id = "BIN_TO_UUID(user_id)" if binary_ids else "user_id"
+        query = f"SELECT {user_id}, email, {SYNC_HASH_SQL} FROM user_data WHERE {match_on} IN ({placeholders})"
+
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, keys)
+            stored = {}
+            for found_id, email, row_hash in cursor.fetchall():
+                key = _sync_key(found_id if match_on == 'user_id' else email)
+                # email is not unique; if several rows share it, keep the first
+                stored.setdefault(key, (found_id, row_hash))
+            return stored
+        finally:
+            if cursor:
+                cursor.close()
+
+    def sync_users(self, connection: mysql.connector.connection.MySQLConnection,
+                   records: Iterable[Tuple[Optional[str], str, str, int]],
+                   batch_size: int = SYNC_BATCH_SIZE, match_on: str = 'user_id') -> Dict[str, Any]:
+        """
+        Brings user_data in line with a stream of records, writing only the
+        rows that are new or differ from what is stored.
+
+        Records are read in batches. For each batch one query fetches the
+        hash of the matching stored rows (SYNC_HASH_SQL), the hashes are
+        compared with user_record_hash, and the new or changed records
+        are written with one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+        and one commit. Running the same sync twice writes nothing the
+        second time. Rows missing from records are left alone. Keys are
+        matched case-insensitively, like MySQL compares them.
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            records: (user_id, name, email, age) tuples; user_id may be None
+            batch_size: Records diffed and written per transaction
+            match_on: 'user_id', or 'email' to match records to stored users
+                by email. Records without a user_id are matched by email in
+                either mode. New users matched by email get an id derived
+                from it, so re-running the sync is safe.
+
+        Returns:
+            Dictionary with inserted/updated/unchanged counts, elapsed seconds and rows/second
+        """
+        if match_on not in SYNC_MATCH_COLUMNS:
+            raise ValueError(f"Unknown match_on {match_on!r}, expected one of {SYNC_MATCH_COLUMNS}")
+
+        binary_ids = uses_binary_user_ids(connection)
+        upsert_query = UPSERT_QUERY.format(user_id=user_id_placeholder(binary_ids))
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        start = time.perf_counter()
+        records = iter(records)
+
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            # A later record for the same key replaces an earlier one
+            latest = {'user_id': {}, 'email': {}}
+            for record in batch:
+                column = 'user_id' if match_on == 'user_id' and record[0] else 'email'
+                if not record[2]:
+                    raise ValueError(f"Record without email: {record!r}")
+                latest[column][_sync_key(record[0 if column == 'user_id' else 2])] = record
+
+            matched = []
+            for column, records_by_key in latest.items():
+                if records_by_key:
+                    values = [record[0 if column == 'user_id' else 2] for record in records_by_key.values()]
+                    stored = self._stored_hashes(connection, values, column, binary_ids)
+                    matched.extend((record, stored.get(key)) for key, record in records_by_key.items())
+
+            changes = []
+            for (user_id, name, email, age), found in matched:
+                if found is None:
+                    user_id = user_id or str(uuid.uuid5(USER_ID_NAMESPACE, f"email:{_sync_key(email)}"))
+                    counts['inserted'] += 1
+                elif found[1] == user_record_hash(name, email, age):
+                    counts['unchanged'] += 1
+                    continue
+                else:
+                    user_id = found[0]
+                    counts['updated'] += 1
+                changes.append((user_id, name, email, int(age)))
+
+            if changes:
+                cursor = None
+                try:
+                    cursor = connection.cursor()
+                    with get_instrumentation().timer('sync_upsert'):
+                        cursor.executemany(upsert_query, changes)
+                        connection.commit()
+                    get_instrumentation().count('rows_written', len(changes))
+                except Error as e:
+                    connection.rollback()
+                    forget_user_id_layout(connection)
+                    logger.error("Error syncing users: %s", e)
+                    raise
+                finally:
+                    if cursor:
+                        cursor.close()
+
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        rate = total / elapsed if elapsed > 0 else 0.0
+        logger.info("Synced %d records: %d inserted, %d updated, %d unchanged in %.2fs (%.0f rows/s)",
+                    total, counts['inserted'], counts['updated'], counts['unchanged'], elapsed, rate)
+        return {**counts, 'seconds': elapsed, 'rows_per_second': rate}
+
+    def sync_users_from_csv(self, connection: mysql.connector.connection.MySQLConnection,
+                            csv_file_path: str, batch_size: int = SYNC_BATCH_SIZE,
+                            match_on: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Re-imports a CSV file with sync_users, so only new and changed rows
+        are written. The whole file is validated first, so a malformed row
+        raises ValueError before any batch is committed.
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            csv_file_path: Path to the CSV file
+            batch_size: Records diffed and written per transaction
+            match_on: Column identifying users; defaults to 'user_id' when
+                the CSV has that column and 'email' otherwise
+
+        Returns:
+            The counts returned by sync_users
+        """
+        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                try:
+                    int(row['age'])
+                    if not row['name'] or not row['email']:
+                        raise ValueError("missing name or email")
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"{csv_file_path}, line {reader.line_num}: invalid row {row!r} ({e})") from None
+
+        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            if match_on is None:
+                match_on = 'user_id' if 'user_id' in (reader.fieldnames or ()) else 'email'
+            records = ((row.get('user_id') or None, row['name'], row['email'], int(row['age']))
+                       for row in reader)
+            return self.sync_users(connection, records, batch_size, match_on)
+
+    def load_data_from_csv(self, connection: mysql.connector.connection.MySQLConnection, csv_file_path: str,
+                           bulk: bool = False, chunk_size: int = BULK_CHUNK_SIZE) -> None:
         """
         Loads data from CSV file into the database
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            csv_file_path: Path to the CSV file
+            bulk: Insert in chunks with executemany instead of row by row
+            chunk_size: Rows per chunk when bulk is True
         """
         try:
+            if bulk:
+                self.bulk_load_data_from_csv(connection, csv_file_path, chunk_size)
+                return
+
             with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
                 csv_reader = csv.DictReader(csvfile)
                 
                 for row in csv_reader:
                     # Generate UUID if not present in CSV
-                    user_id = row.get('user_id') or str(uuid.uuid4())
+                    user_id, name, email, age = csv_row_to_record(row)
                     
                     data = {
                         'user_id': user_id,
-                        'name': row['name'],
-                        'email': row['email'],
-                        'age': int(row['age'])
+                        'name': name,
+                        'email': email,
+                        'age': age
                     }
                     
                     self.insert_data(connection, data)
                     
-            print("Data loading from CSV completed")
+            logger.info("Data loading from CSV completed")
             
         except FileNotFoundError:
-            print(f"CSV file {csv_file_path} not found")
+            logger.error("CSV file %s not found", csv_file_path)
         except Exception as e:
-            print(f"Error loading data from CSV: {e}")
+            logger.error("Error loading data from CSV: %s", e)
             raise
     
     def stream_rows(self, connection: Optional[mysql.connector.connection.MySQLConnection] = None, 
-                   batch_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+                   batch_size: int = 100, streaming: bool = True,
+                   adaptive: Any = False) -> Generator[Dict[str, Any], None, None]:
         """
         Generator that streams rows from the user_data table one by one
         
         Args:
             connection: Database connection (uses self.connection if None)
             batch_size: Number of rows to fetch at a time
+            streaming: Use an unbuffered cursor so only batch_size rows are
+                held in memory. With False the driver buffers the whole
+                result, which frees the connection as soon as the query ends.
+            adaptive: True, or an AdaptiveBatchSizer to read the chosen sizes
+                from afterwards, to size each fetch from measured latency
+                and row size, starting at batch_size
         
         Yields:
             Dictionary containing row data
@@ -164,36 +1457,865 @@ class DatabaseManager:
         if not conn:
             raise ValueError("No database connection provided")
         
+        sizer = adaptive_sizer(adaptive, batch_size)
         cursor = None
         try:
-            # Use server-side cursor for efficient memory usage
-            cursor = conn.cursor(dictionary=True)
+            if streaming:
+                cursor = open_stream_cursor(conn, dictionary=True)
+            else:
+                cursor = conn.cursor(dictionary=True, buffered=True)
             
-            query = "SELECT user_id, name, email, age FROM user_data"
+            query = f"SELECT {user_columns_sql(uses_binary_user_ids(conn))} FROM user_data"
             cursor.execute(query)
             
+            instrumentation = get_instrumentation()
             while True:
-                rows = cursor.fetchmany(batch_size)
+                start = time.perf_counter()
+                rows = cursor.fetchmany(sizer.size if sizer else batch_size)
+                elapsed = time.perf_counter() - start
+                if sizer:
+                    sizer.record(rows, elapsed)
                 if not rows:
+                    if sizer:
+                        logger.info(sizer.report())
                     break
+                instrumentation.observe('batch_fetch', elapsed)
+                instrumentation.count('rows_read', len(rows))
                 
                 for row in rows:
                     yield dict(row)
                     
         except Error as e:
-            print(f"Error streaming rows: {e}")
+            logger.error("Error streaming rows: %s", e)
             raise
         finally:
             if cursor:
-                cursor.close()
+                # The connection may belong to the caller, so keep it usable
+                close_stream_cursor(cursor, conn, drain=True)
     
+    def fetch_page_after(self, connection: mysql.connector.connection.MySQLConnection,
+                         after_user_id: Optional[str], page_size: int) -> List[Dict[str, Any]]:
+        """
+        Fetches the next page of users ordered by user_id using a keyset seek
+        (WHERE user_id > last seen id), so every page costs the same
+        regardless of how deep into the table it is
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            after_user_id: Last user_id of the previous page, None for the first page
+            page_size: Number of users per page
+
+        Returns:
+            List of user dictionaries
+        """
+        cursor = None
+        try:
+            binary_ids = uses_binary_user_ids(connection)
+            cursor = connection.cursor(dictionary=True)
+            if after_user_id is None:
+                query = f"""
+                    SELECT {user_columns_sql(binary_ids)}
+                    FROM user_data
+                    ORDER BY user_data.user_id
+                    LIMIT %s
+                """
+                cursor.execute(query, (page_size,))
+            else:
+                query = f"""
+                    SELECT {user_columns_sql(binary_ids)}
+                    FROM user_data
+                    WHERE user_id > {user_id_placeholder(binary_ids)}
+                    ORDER BY user_data.user_id
+                    LIMIT %s
+                """
+                cursor.execute(query, (after_user_id, page_size))
+            page = [dict(row) for row in cursor.fetchall()]
+            instrumentation = get_instrumentation()
+            instrumentation.count('pages_read')
+            instrumentation.count('rows_read', len(page))
+            return page
+        except Error as e:
+            logger.error("Error fetching page: %s", e)
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def benchmark_queries(self, connection: mysql.connector.connection.MySQLConnection,
+                          repeats: int = 5) -> Dict[str, float]:
+        """
+        Times the queries the generators rely on most: an age filter, an
+        email lookup and a deep keyset page
+
+        Returns:
+            Dictionary mapping query name to best-of-repeats seconds
+        """
+        binary_ids = uses_binary_user_ids(connection)
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT email FROM user_data ORDER BY user_id LIMIT 1 OFFSET 1000")
+            row = cursor.fetchone()
+            email = row[0] if row else ''
+            # Seek from a stored id: deep into the table when it is large
+            # enough, otherwise from the first row
+            after_user_id = None
+            for offset in (10000, 0):
+                cursor.execute(f"SELECT {user_columns_sql(binary_ids)} FROM user_data "
+                               "ORDER BY user_data.user_id LIMIT 1 OFFSET %s", (offset,))
+                row = cursor.fetchone()
+                if row:
+                    after_user_id = row[0]
+                    break
+
+            queries = {
+                'age_filter': ("SELECT COUNT(*) FROM user_data WHERE age > %s", (25,)),
+                'age_range': ("SELECT COUNT(*) FROM user_data WHERE age BETWEEN %s AND %s", (30, 35)),
+                'email_lookup': ("SELECT user_id FROM user_data WHERE email = %s", (email,)),
+            }
+            if after_user_id is not None:
+                # An empty table has no id to seek from
+                queries['keyset_page'] = (f"SELECT {user_columns_sql(binary_ids)} FROM user_data "
+                                          f"WHERE user_id > {user_id_placeholder(binary_ids)} "
+                                          "ORDER BY user_data.user_id LIMIT 100", (after_user_id,))
+            timings = {}
+            for name, (query, params) in queries.items():
+                best = float('inf')
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    cursor.execute(query, params)
+                    cursor.fetchall()
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = best
+            return timings
+        finally:
+            cursor.close()
+
+    def migrate_user_data(self, connection: mysql.connector.connection.MySQLConnection,
+                          batch_size: int = MIGRATION_BATCH_SIZE,
+                          benchmark: bool = False) -> None:
+        """
+        Migrates user_data to the tuned layout: user_id as BINARY(16) and
+        secondary indexes on age and email instead of the redundant
+        idx_user_id index.
+
+        The table stays readable and writable throughout. Triggers
+        (MIGRATION_TRIGGERS) mirror every insert, update and delete into
+        user_data_v2 from the moment the copy starts, and the existing
+        rows are copied in keyset-ordered batches, one short transaction
+        each, without overwriting rows a trigger already wrote. Because the
+        triggers keep the copy current, the tables can then be swapped with
+        a single atomic RENAME TABLE without a catch-up pass. The original
+        table is kept as user_data_old. A leftover user_data_v2 from an
+        interrupted run is dropped first. Requires the TRIGGER privilege,
+        and all user_ids must be valid UUIDs.
+
+        Args:
+            connection: Connection to the ALX_prodev database
+            batch_size: Rows copied per transaction
+            benchmark: Log query timings before and after the migration
+        """
+        if uses_binary_user_ids(connection):
+            logger.info("user_data already uses BINARY(16) ids")
+            return
+
+        before = self.benchmark_queries(connection) if benchmark else None
+
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._drop_migration_triggers(cursor)
+            cursor.execute("DROP TABLE IF EXISTS user_data_v2")
+            self.create_table(connection, binary_ids=True, table_name='user_data_v2')
+            for trigger in MIGRATION_TRIGGERS.values():
+                cursor.execute(trigger)
+
+            # Rows a trigger already wrote are newer than the ones read here
+            copy_query = """
+                INSERT INTO user_data_v2 (user_id, name, email, age)
+                SELECT UUID_TO_BIN(user_id), name, email, age
+                FROM user_data
+                WHERE user_id > %s AND user_id <= %s
+                ON DUPLICATE KEY UPDATE user_id = user_data_v2.user_id
+            """
+            last_user_id = ''
+            copied = 0
+            while True:
+                # Upper bound and size of the next batch, found through the primary key
+                cursor.execute("""
+                    SELECT MAX(user_id), COUNT(*) FROM (
+                        SELECT user_id FROM user_data
+                        WHERE user_id > %s ORDER BY user_id LIMIT %s
+                    ) AS batch
+                """, (last_user_id, batch_size))
+                upper, rows = cursor.fetchone()
+                if upper is None:
+                    break
+                cursor.execute(copy_query, (last_user_id, upper))
+                connection.commit()
+                copied += rows
+                last_user_id = upper
+                logger.info("Migrated %d rows", copied)
+
+            # The triggers move with the renamed table, so they are dropped
+            # from user_data_old once the new table is in place
+            cursor.execute("RENAME TABLE user_data TO user_data_old, user_data_v2 TO user_data")
+            self._drop_migration_triggers(cursor)
+            _remember_user_id_layout(connection, True)
+            logger.info("Migration complete: %d rows, previous table kept as user_data_old", copied)
+        except Error as e:
+            connection.rollback()
+            logger.error("Error migrating user_data: %s", e)
+            if cursor:
+                try:
+                    # Stop mirroring writes into the abandoned copy
+                    self._drop_migration_triggers(cursor)
+                except Error:
+                    pass
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+        if benchmark:
+            after = self.benchmark_queries(connection)
+            for name, seconds in before.items():
+                logger.info("%s: %.2f ms -> %.2f ms", name, seconds * 1000, after[name] * 1000)
+
+    @staticmethod
+    def _drop_migration_triggers(cursor) -> None:
+        for name in MIGRATION_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
     def close_connection(self) -> None:
         """
-        Closes the database connection
+        Closes the database connection, or returns it to the pool it was
+        checked out from (which may no longer be the shared pool)
         """
+        if self.pool is not None:
+            if self.connection:
+                self.pool.release(self.connection)
+            self.connection = None
+            self.pool = None
+            return
+
         if self.connection and self.connection.is_connected():
             self.connection.close()
-            print("Database connection closed")
+            logger.debug("Database connection closed")
+            get_instrumentation().count('connections_closed')
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool of ALX_prodev connections, creating it
+    on first use
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(lambda: DatabaseManager().connect_to_prodev())
+        return _pool
+
+
+def use_pool(pool: ConnectionPool) -> None:
+    """
+    Replaces the shared pool, e.g. with one whose factory connects to a
+    local test database. The previous pool is closed.
+    """
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    if previous is not None:
+        previous.close()
+
+
+def close_pool() -> None:
+    """
+    Closes the idle connections of the shared pool and discards it
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def split_csv_shards(csv_file_path: str, shards: int) -> List[Tuple[int, int]]:
+    """
+    Splits the data section of a CSV file (everything after the header)
+    into roughly equal byte ranges. Ranges are not aligned to lines;
+    parse_csv_shard takes care of that.
+
+    Returns:
+        List of (start, end) byte offsets
+    """
+    with open(csv_file_path, 'rb') as csvfile:
+        csvfile.readline()
+        data_start = csvfile.tell()
+        size = os.fstat(csvfile.fileno()).st_size
+
+    step = max((size - data_start) // max(shards, 1), 1)
+    bounds = list(range(data_start, size, step)) + [size]
+    return [(start, end) for start, end in zip(bounds, bounds[1:])]
+
+
+def parse_csv_shard(shard: Tuple[str, int, int]) -> List[Tuple[str, str, str, int]]:
+    """
+    Parses the rows of a CSV file whose first byte lies in [start, end).
+    A row straddling start belongs to the previous shard, so every row is
+    parsed exactly once. Rows must not contain quoted newlines.
+
+    Runs in a worker process, so it takes a single picklable tuple.
+
+    Args:
+        shard: (csv_file_path, start, end)
+
+    Returns:
+        List of (user_id, name, email, age) tuples; missing ids are derived
+        from each row's byte offset and content
+    """
+    csv_file_path, start, end = shard
+    offsets = []
+    lines = []
+    with open(csv_file_path, 'rb') as csvfile:
+        header = csvfile.readline().decode('utf-8')
+        if start > csvfile.tell():
+            # Skip to the first line starting at or after start
+            csvfile.seek(start - 1)
+            csvfile.readline()
+        while csvfile.tell() < end:
+            offset = csvfile.tell()
+            line = csvfile.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue  # csv.DictReader skips blank lines too
+            offsets.append(offset)
+            lines.append(line.decode('utf-8'))
+
+    fieldnames = next(csv.reader([header]))
+    return [csv_row_to_record(row, position=offset)
+            for offset, row in zip(offsets, csv.DictReader(lines, fieldnames=fieldnames))]
+
+
+def parallel_load_data_from_csv(csv_file_path: str, processes: Optional[int] = None,
+                                writers: int = 4,
+                                chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Loads a CSV file using a process pool for parsing and several writer
+    connections for inserting.
+
+    The file is split into byte-range shards that worker processes parse
+    (including UUID generation). Parsed rows are routed to a writer by a
+    hash of their user_id, so all rows for a given id go through the same
+    connection in file order and the final table contents do not depend
+    on scheduling. Each writer bulk inserts chunk_size rows at a time.
+
+    Args:
+        csv_file_path: Path to the CSV file
+        processes: Number of parser processes (defaults to the CPU count)
+        writers: Number of writer connections
+        chunk_size: Rows per executemany/commit on each writer
+
+    Returns:
+        Dictionary with inserted/skipped counts, elapsed seconds and rows/second
+    """
+    processes = processes or os.cpu_count() or 1
+    writers = max(writers, 1)
+    start = time.perf_counter()
+
+    # Small queues give backpressure: parsing pauses while writers catch up
+    queues = [queue.Queue(maxsize=2) for _ in range(writers)]
+    results = [{'inserted': 0, 'skipped': 0, 'error': None} for _ in range(writers)]
+    failed = threading.Event()  # Set by the first writer that fails
+
+    def write(index: int) -> None:
+        result = results[index]
+        db_manager = DatabaseManager()
+        try:
+            connection = db_manager.connect_to_prodev()
+            while True:
+                chunk = queues[index].get()
+                if chunk is None:
+                    return
+                inserted = db_manager.bulk_insert_data(connection, chunk)
+                result['inserted'] += inserted
+                result['skipped'] += len(chunk) - inserted
+        except BaseException as e:
+            result['error'] = e
+            failed.set()
+            # Keep draining until the end marker so the producer never blocks
+            while queues[index].get() is not None:
+                pass
+        finally:
+            db_manager.close_connection()
+
+    def put(index: int, item) -> None:
+        # Waits for room, but gives up once the writer thread is gone
+        while threads[index].is_alive():
+            try:
+                queues[index].put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    threads = [threading.Thread(target=write, args=(i,), daemon=True)
+               for i in range(writers)]
+    for thread in threads:
+        thread.start()
+
+    buffers = [[] for _ in range(writers)]
+    shards = deque((csv_file_path, s, e)
+                   for s, e in split_csv_shards(csv_file_path, processes * 4))
+    parsed = False
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            # Keep a bounded window of shards in flight and consume them in
+            # file order, so memory stays flat and routing is reproducible
+            pending = deque()
+            try:
+                while (shards or pending) and not failed.is_set():
+                    while shards and len(pending) < processes * 2:
+                        pending.append(pool.submit(parse_csv_shard, shards.popleft()))
+                    for record in pending.popleft().result():
+                        # Route on the id as bulk_insert_data dedups it (MySQL
+                        # compares ids case-insensitively), so the copies of an
+                        # id meet in one writer, which skips all but the first
+                        index = zlib.crc32(record[0].lower().encode('utf-8')) % writers
+                        buffers[index].append(record)
+                        if len(buffers[index]) >= chunk_size:
+                            put(index, buffers[index])
+                            buffers[index] = []
+            finally:
+                for future in pending:
+                    future.cancel()
+        parsed = not failed.is_set()
+    finally:
+        for index in range(writers):
+            # Partial buffers are only written when the whole file parsed
+            if parsed and buffers[index]:
+                put(index, buffers[index])
+            put(index, None)
+        for thread in threads:
+            thread.join()
+
+    for result in results:
+        if result['error'] is not None:
+            raise result['error']
+
+    inserted = sum(r['inserted'] for r in results)
+    skipped = sum(r['skipped'] for r in results)
+    elapsed = time.perf_counter() - start
+    rate = (inserted + skipped) / elapsed if elapsed > 0 else 0.0
+    logger.info("Parallel load finished: %d inserted, %d skipped in %.2fs (%.0f rows/s, %d parsers, %d writers)",
+                inserted, skipped, elapsed, rate, processes, writers)
+    return {
+        'inserted': inserted,
+        'skipped': skipped,
+        'seconds': elapsed,
+        'rows_per_second': rate,
+    }
+
+
+def user_id_ranges(partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Splits the UUID keyspace into equal [low, high) ranges. The first range
+    has no lower bound and the last no upper bound, so every user_id falls
+    in exactly one range even if it is not a UUID.
+
+    Returns:
+        List of (low, high) user_id bounds, None meaning unbounded
+    """
+    partitions = max(partitions, 1)
+    bounds = [str(uuid.UUID(int=(i << 128) // partitions)) for i in range(1, partitions)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def scan_partition(low: Optional[str], high: Optional[str], batch_size: int = 1000,
+                   where: Optional[Condition] = None, ordered: bool = False,
+                   columns: Optional[str] = None,
+                   dictionary: bool = True) -> Generator[List[Any], None, None]:
+    """
+    Streams the rows of user_data with low <= user_id < high in batches,
+    on a pooled connection with an unbuffered cursor
+
+    Args:
+        low: Inclusive lower bound, None for unbounded
+        high: Exclusive upper bound, None for unbounded
+        batch_size: Rows fetched per round trip
+        where: Optional filter, pushed down to SQL where possible
+        ordered: Return rows in user_id order
+        columns: Select list (defaults to all user_data columns)
+        dictionary: Yield dictionaries rather than tuples; a residual
+            (non-pushable) filter requires dictionaries
+
+    Yields:
+        Lists of rows
+    """
+    db_manager = DatabaseManager()
+    cursor = None
+    try:
+        connection = db_manager.connect_to_prodev(pooled=True)
+        binary_ids = uses_binary_user_ids(connection)
+        where_clause, params, residual = compile_filter(where, binary_ids)
+        if residual is not None and not dictionary:
+            raise ValueError("Filters that cannot be pushed down need dictionary rows")
+
+        placeholder = user_id_placeholder(binary_ids)
+        bounds = []
+        if low is not None:
+            bounds.append(f"user_id >= {placeholder}")
+            params.append(low)
+        if high is not None:
+            bounds.append(f"user_id < {placeholder}")
+            params.append(high)
+        if bounds:
+            where_clause += (" AND " if where_clause else " WHERE ") + " AND ".join(bounds)
+
+        query = f"SELECT {columns or user_columns_sql(binary_ids)} FROM user_data" + where_clause
+        if ordered:
+            query += " ORDER BY user_data.user_id"
+
+        cursor = open_stream_cursor(connection, dictionary=dictionary)
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if residual is not None:
+                rows = [row for row in rows if residual(row)]
+                if not rows:
+                    continue
+            yield rows
+    except Error as e:
+        logger.error("Error scanning partition [%s, %s): %s", low, high, e)
+        raise
+    finally:
+        if cursor:
+            close_stream_cursor(cursor, connection)
+        db_manager.close_connection()
+
+
+def map_partitions(func: Callable[[Optional[str], Optional[str]], T],
+                   partitions: int = SCAN_PARTITIONS,
+                   workers: Optional[int] = None) -> List[T]:
+    """
+    Runs func(low, high) for every user_id range concurrently and returns
+    the results in range order. Typical use is a per-range aggregate that
+    is merged afterwards.
+
+    Args:
+        func: Function of a (low, high) range
+        partitions: Number of user_id ranges
+        workers: Concurrent ranges (defaults to min(partitions, POOL_SIZE))
+    """
+    ranges = user_id_ranges(partitions)
+    workers = workers or min(len(ranges), POOL_SIZE)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='partition') as executor:
+        return list(executor.map(lambda bounds: func(*bounds), ranges))
+
+
+def scan_partitioned(partitions: int = SCAN_PARTITIONS, workers: Optional[int] = None,
+                     ordered: bool = False, batch_size: int = 1000,
+                     where: Optional[Condition] = None) -> Generator[List[Dict[str, Any]], None, None]:
+    """
+    Scans user_data as partitions ranges of the user_id keyspace read
+    concurrently on pooled connections, one thread per range in flight.
+    MySQL does the filtering and the threads spend their time waiting on
+    the network, so threads are enough to keep several connections busy.
+
+    With ordered=False batches are yielded as soon as any range produces
+    them. With ordered=True each range is read in user_id order and ranges
+    are yielded one after the other, so the output is in user_id order;
+    later ranges are read ahead into bounded buffers meanwhile.
+
+    Closing the generator stops the workers and releases their connections.
+
+    Args:
+        partitions: Number of user_id ranges
+        workers: Ranges scanned at the same time (defaults to min(partitions, POOL_SIZE))
+        ordered: Yield batches in user_id order
+        batch_size: Rows fetched per round trip
+        where: Optional filter, pushed down to SQL where possible
+
+    Yields:
+        Lists of user dictionaries
+    """
+    ranges = user_id_ranges(partitions)
+    workers = workers or min(len(ranges), POOL_SIZE)
+    stop = threading.Event()
+    # One bounded buffer per range when ordered, a shared one otherwise
+    buffers = [queue.Queue(maxsize=4) for _ in (ranges if ordered else [None])]
+
+    def put(buffer: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan(index: int) -> None:
+        buffer = buffers[index if ordered else 0]
+        if stop.is_set():
+            return
+        batches = scan_partition(*ranges[index], batch_size=batch_size, where=where, ordered=ordered)
+        try:
+            for batch in batches:
+                if not put(buffer, batch):
+                    return
+            put(buffer, _END_OF_STREAM)
+        except BaseException as e:
+            put(buffer, _ProducerError(e))
+        finally:
+            batches.close()
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='partition')
+    try:
+        for index in range(len(ranges)):
+            executor.submit(scan, index)
+
+        remaining = len(ranges)
+        current = 0
+        while remaining:
+            item = buffers[current if ordered else 0].get()
+            if item is _END_OF_STREAM:
+                remaining -= 1
+                current += 1
+                continue
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ColumnarWriter:
+    """
+    Writes user rows in the columnar file format described at the top of
+    this module. Rows are buffered and written one group of group_rows at
+    a time, so memory is bounded by the group size.
+    """
+
+    def __init__(self, fileobj, group_rows: int = COLUMNAR_GROUP_ROWS):
+        self.fileobj = fileobj
+        self.group_rows = group_rows
+        self._rows = []
+        fileobj.write(COLUMNAR_MAGIC)
+
+    def write(self, row: Tuple[str, str, str, int]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.group_rows:
+            self.flush_group()
+
+    def flush_group(self) -> None:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        parts = [struct.pack('<I', len(rows)),
+                 _little_endian(array('h', [int(row[3]) for row in rows]))]
+        for index in range(len(COLUMNAR_STRING_COLUMNS)):
+            encoded = [row[index].encode('utf-8') for row in rows]
+            offsets = array('I', accumulate(map(len, encoded), initial=0))
+            heap = b''.join(encoded)
+            parts += [struct.pack('<I', len(heap)), _little_endian(offsets), heap]
+        self.fileobj.write(b''.join(parts))
+
+    def close(self) -> None:
+        self.flush_group()
+
+
+def read_columnar(fileobj) -> Generator[Dict[str, List[Any]], None, None]:
+    """
+    Reads a columnar file written by ColumnarWriter one row group at a time
+
+    Yields:
+        Dictionary mapping each column name to a list of values
+    """
+    if fileobj.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a user_data columnar file")
+    while True:
+        header = fileobj.read(4)
+        if not header:
+            break
+        (count,) = struct.unpack('<I', header)
+        ages = array('h')
+        ages.frombytes(fileobj.read(2 * count))
+        if sys.byteorder == 'big':
+            ages.byteswap()
+        group = {'age': ages.tolist()}
+        for name in COLUMNAR_STRING_COLUMNS:
+            (heap_length,) = struct.unpack('<I', fileobj.read(4))
+            offsets = array('I')
+            offsets.frombytes(fileobj.read(4 * (count + 1)))
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            heap = fileobj.read(heap_length)
+            group[name] = [heap[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+        yield group
+
+
+class _CountingWriter(io.RawIOBase):
+    """
+    Binary sink that counts the uncompressed bytes written through it
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.bytes_written += len(data)
+        self.target.write(data)
+        return len(data)
+
+
+def _open_export_file(path: str, compression: str, buffer_size: int):
+    """
+    Opens path for binary writing with the requested compression, returning
+    (stream, closers) where closers must be closed in order
+    """
+    raw = open(path, 'wb', buffering=buffer_size)
+    if compression == 'gzip':
+        compressed = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raw.close()
+            raise ImportError("zstd compression requires the zstandard package")
+        compressed = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+    else:
+        compressed = None
+    target = compressed or raw
+    # Batch small writes before they reach the compressor
+    stream = io.BufferedWriter(_CountingWriter(target), buffer_size=buffer_size)
+    return stream, [c for c in (stream, compressed, raw) if c is not None]
+
+
+def export_user_data(output_dir: str, fmt: str = 'ndjson', compression: str = 'gzip',
+                     rows_per_file: int = EXPORT_ROWS_PER_FILE,
+                     buffer_size: int = EXPORT_BUFFER_SIZE,
+                     batch_size: int = 5000) -> Dict[str, Any]:
+    """
+    Streams user_data straight into compressed export files.
+
+    Rows are read with an unbuffered cursor and written as they arrive, so
+    memory is bounded by batch_size, the write buffer and (for the columnar
+    format) one row group. A new file is started every rows_per_file rows.
+
+    Args:
+        output_dir: Directory for the export files (created if needed)
+        fmt: 'ndjson', 'csv' or 'columnar' (see ColumnarWriter)
+        compression: 'gzip', 'zstd' (needs zstandard) or 'none'
+        rows_per_file: Rows per output file
+        buffer_size: Bytes buffered before each write to the compressor and to disk
+        batch_size: Rows fetched per round trip
+
+    Returns:
+        Dictionary with files, rows, uncompressed and on-disk bytes,
+        elapsed seconds and throughput in MB/s of uncompressed output
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {EXPORT_FORMATS}")
+    if compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {EXPORT_COMPRESSIONS}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = {'ndjson': '.ndjson', 'csv': '.csv', 'columnar': '.ucol'}[fmt]
+    suffix += {'gzip': '.gz', 'zstd': '.zst', 'none': ''}[compression]
+
+    files = []
+    rows = 0
+    uncompressed = 0
+    stream = closers = writer = None
+    start = time.perf_counter()
+
+    def finish_file() -> None:
+        nonlocal uncompressed, stream, closers, writer
+        if stream is None:
+            return
+        if fmt == 'columnar':
+            writer.close()
+        stream.flush()
+        uncompressed += stream.raw.bytes_written
+        for closer in closers:
+            closer.close()
+        stream = closers = writer = None
+
+    db_manager = DatabaseManager()
+    cursor = None
+    try:
+        connection = db_manager.connect_to_prodev(pooled=True)
+        cursor = open_stream_cursor(connection)
+        cursor.execute(f"SELECT {user_columns_sql(uses_binary_user_ids(connection), cast_age=True)} "
+                       "FROM user_data")
+
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                if stream is None:
+                    path = os.path.join(output_dir, f"user_data-{len(files):05d}{suffix}")
+                    files.append(path)
+                    stream, closers = _open_export_file(path, compression, buffer_size)
+                    if fmt == 'csv':
+                        text = io.TextIOWrapper(stream, encoding='utf-8', newline='', write_through=True)
+                        closers.insert(0, text)
+                        writer = csv.writer(text)
+                        writer.writerow(USER_COLUMNS)
+                    elif fmt == 'columnar':
+                        writer = ColumnarWriter(stream)
+
+                if fmt == 'ndjson':
+                    stream.write(json.dumps(dict(zip(USER_COLUMNS, row))).encode('utf-8') + b'\n')
+                elif fmt == 'csv':
+                    writer.writerow(row)
+                else:
+                    writer.write(row)
+
+                rows += 1
+                if rows % rows_per_file == 0:
+                    finish_file()
+        finish_file()
+    except Error as e:
+        logger.error("Error exporting user_data: %s", e)
+        raise
+    finally:
+        if cursor:
+            close_stream_cursor(cursor, connection)
+        db_manager.close_connection()
+        if closers:
+            for closer in closers:
+                closer.close()
+
+    elapsed = time.perf_counter() - start
+    on_disk = sum(os.path.getsize(path) for path in files)
+    rate = uncompressed / elapsed / 1e6 if elapsed > 0 else 0.0
+    logger.info("Exported %d rows to %d %s file(s) in %.2fs: %.1f MB (%.1f MB on disk), %.1f MB/s",
+                rows, len(files), fmt, elapsed, uncompressed / 1e6, on_disk / 1e6, rate)
+    return {
+        'files': files,
+        'rows': rows,
+        'bytes': uncompressed,
+        'bytes_on_disk': on_disk,
+        'seconds': elapsed,
+        'mb_per_second': rate,
+    }
 
 
 # Example usage and demonstration
@@ -212,7 +2334,7 @@ def main():
         db_manager.create_table(prodev_connection)
         
         # Step 3: Load sample data from CSV (uncomment when you have the CSV file)
-        # db_manager.load_data_from_csv(prodev_connection, 'user_data.csv')
+        # db_manager.load_data_from_csv(prodev_connection, 'user_data.csv', bulk=True)
         
         # Step 4: Insert some sample data for demonstration
         sample_data = [
@@ -250,6 +2372,41 @@ def main():
                 break
         
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error("An error occurred: %s", e)
     finally:
         db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed, sync or export the ALX_prodev user_data table")
+    commands = parser.add_subparsers(dest='command')
+    export_parser = commands.add_parser('export', help="Stream user_data into compressed files")
+    export_parser.add_argument('output_dir')
+    export_parser.add_argument('--format', dest='fmt', choices=EXPORT_FORMATS, default='ndjson')
+    export_parser.add_argument('--compression', choices=EXPORT_COMPRESSIONS, default='gzip')
+    export_parser.add_argument('--rows-per-file', type=int, default=EXPORT_ROWS_PER_FILE)
+    export_parser.add_argument('--buffer-size', type=int, default=EXPORT_BUFFER_SIZE,
+                               help="Write buffer in bytes")
+    sync_parser = commands.add_parser('sync', help="Re-import a CSV, writing only new or changed users")
+    sync_parser.add_argument('csv_file')
+    sync_parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE)
+    sync_parser.add_argument('--match-on', choices=SYNC_MATCH_COLUMNS,
+                             help="Column identifying users (default: user_id if the CSV has it, else email)")
+    commands.add_parser('demo', help="Create the database and table, insert sample users and stream them")
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        sync_manager = DatabaseManager()
+        try:
+            sync_manager.sync_users_from_csv(sync_manager.connect_to_prodev(), args.csv_file,
+                                             args.batch_size, args.match_on)
+        finally:
+            sync_manager.close_connection()
+    elif args.command == 'export':
+        export_user_data(args.output_dir, args.fmt, args.compression,
+                         args.rows_per_file, args.buffer_size)
+    elif args.command == 'demo':
+        main()
+    else:
+        # Without a command nothing touches the database
+        parser.print_help()
@@ -0,0 +1,387 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Dict, Generator, List, Optional, Sequence
+from seed import (And, Between, Comparison, Condition, In, USER_COLUMNS, DatabaseManager,
+                  map_partitions, scan_partition, summarize_age_histogram, user_columns_sql,
+                  logger, user_id_ranges, uses_binary_user_ids)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; aggregations fall back to Counter
+    np = None
+
+# Snapshot file layout:
+#   SNAPSHOT_MAGIC
+#   one segment per user_id range, each 8-byte aligned:
+#       <h ages, then for user_id, name and email: <Q offsets (rows + 1), UTF-8 heap
+#   JSON footer describing the segments, the byte order and the version stamp
+#   <Q footer length, SNAPSHOT_MAGIC
+SNAPSHOT_MAGIC = b'UDSNAP01'
+SNAPSHOT_BYTEORDER = 'little'
+SNAPSHOT_PARTITIONS = 16
+STRING_COLUMNS = ('user_id', 'name', 'email')
+
+_FINGERPRINT_COLUMNS = ("COUNT(*), "
+                        "COALESCE(BIT_XOR(CRC32(CONCAT_WS(0x1f, user_id, name, email, age))), 0)")
+
+
+def _check_byteorder() -> None:
+    # Columns are written and mapped as native arrays, which only match the
+    # little-endian file layout on little-endian hosts
+    if sys.byteorder != SNAPSHOT_BYTEORDER:
+        raise RuntimeError("Snapshots are little-endian and can only be written or mapped on little-endian hosts")
+
+
+def _pad(fileobj) -> None:
+    fileobj.write(b'\0' * (-fileobj.tell() % 8))
+
+
+def _range_fingerprint(low: Optional[str], high: Optional[str]) -> List[int]:
+    """
+    Row count and XOR of row checksums for one user_id range, computed in MySQL
+    """
+    for rows in scan_partition(low, high, columns=_FINGERPRINT_COLUMNS, dictionary=False):
+        count, checksum = rows[0]
+        return [int(count), int(checksum)]
+    return [0, 0]
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a user_data snapshot file.
+
+    Columns are read straight from the mapping without copying: ages as
+    int16 memoryviews (or NumPy arrays when NumPy is installed), strings as
+    slices of a UTF-8 heap located through an offsets array.
+    """
+
+    def __init__(self, path: str):
+        _check_byteorder()
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if len(view) < 24 or bytes(view[:8]) != SNAPSHOT_MAGIC or bytes(view[-8:]) != SNAPSHOT_MAGIC:
+            view.release()
+            self._map.close()
+            self._file.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+        (footer_length,) = struct.unpack('<Q', view[-16:-8])
+        footer_start = len(view) - 16 - footer_length
+        self.meta = json.loads(bytes(view[footer_start:-16]))
+        if self.meta.get('byteorder', SNAPSHOT_BYTEORDER) != SNAPSHOT_BYTEORDER:
+            view.release()
+            self._map.close()
+            self._file.close()
+            raise ValueError(f"{path} has unsupported byte order {self.meta['byteorder']!r}")
+        self.version = self.meta['version']
+        self.fingerprint = self.meta['fingerprint']
+        self.segments = self.meta['segments']
+        self._view = view
+
+    def __len__(self) -> int:
+        return sum(segment['rows'] for segment in self.segments)
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """
+        Closes the snapshot. The file is unmapped right away unless views
+        into it are still referenced, e.g. by an unfinished rows() or
+        column() generator; the mapping then stays valid for them and is
+        unmapped once the last one is garbage-collected.
+        """
+        if self._map is None:
+            return
+        view, self._view = self._view, None
+        try:
+            view.release()
+            self._map.close()
+        except BufferError:
+            # Views handed out are still alive; the mmap object closes itself
+            # when they are gone
+            pass
+        self._map = None
+        self._file.close()
+
+    def _open_view(self) -> memoryview:
+        # Generators read through their own view of the whole file, which
+        # keeps it mapped if the snapshot is closed while they are suspended
+        if self._view is None:
+            raise ValueError(f"Snapshot {self.path} is closed")
+        return self._view[:]
+
+    def _ages(self, segment: Dict[str, Any], view: Optional[memoryview] = None):
+        view = self._view if view is None else view
+        start = segment['ages']
+        view = view[start:start + 2 * segment['rows']]
+        if np is not None:
+            return np.frombuffer(view, dtype='<i2')
+        return view.cast('h')
+
+    def _strings(self, segment: Dict[str, Any], name: str, view: Optional[memoryview] = None):
+        view = self._view if view is None else view
+        offsets_start, heap_start = segment[name]
+        rows = segment['rows']
+        offsets = view[offsets_start:offsets_start + 8 * (rows + 1)].cast('Q')
+        heap = view[heap_start:heap_start + offsets[rows]]
+        return offsets, heap
+
+    def column(self, name: str) -> Generator[Any, None, None]:
+        """
+        Yields every value of one column in user_id order
+        """
+        view = self._open_view()
+        for segment in self.segments:
+            if name == 'age':
+                yield from (int(age) for age in self._ages(segment, view))
+                continue
+            offsets, heap = self._strings(segment, name, view)
+            for i in range(segment['rows']):
+                yield str(heap[offsets[i]:offsets[i + 1]], 'utf-8')
+
+    def rows(self, where: Optional[Condition] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Yields user dictionaries in user_id order, optionally filtered.
+        Age conditions are evaluated on whole segments with NumPy when
+        available; strings are only decoded for rows that pass.
+        """
+        view = self._open_view()
+        for segment in self.segments:
+            ages = self._ages(segment, view)
+            indices = range(segment['rows'])
+            if where is not None and np is not None:
+                mask = _age_mask(where, ages)
+                if mask is not None:
+                    indices = np.flatnonzero(mask).tolist()
+            strings = {name: self._strings(segment, name, view) for name in STRING_COLUMNS}
+            for i in indices:
+                row = {name: str(heap[offsets[i]:offsets[i + 1]], 'utf-8')
+                       for name, (offsets, heap) in strings.items()}
+                row['age'] = int(ages[i])
+                if where is None or where.matches(row):
+                    yield row
+
+    def aggregate_ages(self, percentiles: Sequence[float] = ()) -> Dict[str, Any]:
+        """
+        Computes count, average, min, max and percentiles of ages from the
+        snapshot, with the same result shape as aggregate_ages in 4-stream_ages.py
+        """
+        histogram = Counter()
+        view = self._open_view()
+        for segment in self.segments:
+            ages = self._ages(segment, view)
+            if np is not None:
+                values, counts = np.unique(ages, return_counts=True)
+                histogram.update(dict(zip(values.tolist(), counts.tolist())))
+            else:
+                histogram.update(ages)
+        return summarize_age_histogram(histogram, percentiles)
+
+    def average_age(self) -> float:
+        return self.aggregate_ages()['average']
+
+
+def _age_mask(condition: Condition, ages):
+    """
+    Evaluates an age-only condition on a NumPy age array, or returns None
+    if the condition involves other columns
+    """
+    if isinstance(condition, And):
+        masks = [_age_mask(term, ages) for term in condition.conditions]
+        if any(mask is None for mask in masks):
+            return None
+        return np.logical_and.reduce(masks)
+    if getattr(condition, 'column', None) != 'age':
+        return None
+    if isinstance(condition, Comparison):
+        return Comparison._OPERATORS[condition.operator](ages, condition.value)
+    if isinstance(condition, Between):
+        return (ages >= condition.low) & (ages <= condition.high)
+    if isinstance(condition, In):
+        return np.isin(ages, condition.values)
+    return None
+
+
+def _write_fetched_segment(out, low: Optional[str], high: Optional[str],
+                           binary_ids: bool) -> Dict[str, Any]:
+    """
+    Streams one user_id range from MySQL into out as a segment. Each column
+    goes to its own temporary file first, so memory stays bounded.
+    """
+    spools = {name: (tempfile.TemporaryFile(), tempfile.TemporaryFile()) for name in STRING_COLUMNS}
+    ages_spool = tempfile.TemporaryFile()
+    positions = dict.fromkeys(STRING_COLUMNS, 0)
+    rows = 0
+    try:
+        for name in STRING_COLUMNS:
+            spools[name][0].write(struct.pack('<Q', 0))
+        for batch in scan_partition(low, high, ordered=True, dictionary=False,
+                                    columns=user_columns_sql(binary_ids, cast_age=True)):
+            ages_spool.write(array('h', [row[3] for row in batch]).tobytes())
+            for index, name in enumerate(STRING_COLUMNS):
+                encoded = [row[index].encode('utf-8') for row in batch]
+                ends = array('Q')
+                position = positions[name]
+                for value in encoded:
+                    position += len(value)
+                    ends.append(position)
+                positions[name] = position
+                spools[name][0].write(ends.tobytes())
+                spools[name][1].write(b''.join(encoded))
+            rows += len(batch)
+
+        segment = {'rows': rows, 'ages': out.tell()}
+        ages_spool.seek(0)
+        shutil.copyfileobj(ages_spool, out)
+        _pad(out)
+        for name in STRING_COLUMNS:
+            offsets_spool, heap_spool = spools[name]
+            offsets_start = out.tell()
+            offsets_spool.seek(0)
+            shutil.copyfileobj(offsets_spool, out)
+            heap_start = out.tell()
+            heap_spool.seek(0)
+            shutil.copyfileobj(heap_spool, out)
+            _pad(out)
+            segment[name] = [offsets_start, heap_start]
+        return segment
+    finally:
+        ages_spool.close()
+        for offsets_spool, heap_spool in spools.values():
+            offsets_spool.close()
+            heap_spool.close()
+
+
+def _copy_segment(out, previous: Snapshot, segment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copies an unchanged segment from the previous snapshot, byte for byte
+    """
+    starts = [segment['ages']] + [segment[name][0] for name in STRING_COLUMNS]
+    begin = min(starts)
+    last_offsets, last_heap = previous._strings(segment, STRING_COLUMNS[-1])
+    end = segment[STRING_COLUMNS[-1]][1] + len(last_heap)
+    end += -end % 8
+    shift = out.tell() - begin
+    out.write(previous._view[begin:end])
+    copied = dict(segment)
+    copied['ages'] = segment['ages'] + shift
+    for name in STRING_COLUMNS:
+        copied[name] = [segment[name][0] + shift, segment[name][1] + shift]
+    return copied
+
+
+def refresh_snapshot(path: str, partitions: int = SNAPSHOT_PARTITIONS) -> Dict[str, Any]:
+    """
+    Creates or refreshes the snapshot of user_data at path.
+
+    The user_id keyspace is split into partitions ranges, and MySQL
+    computes a row count and checksum for each range. Ranges whose
+    fingerprint matches the existing snapshot are copied from it as is;
+    only changed ranges are fetched again. The new file is written next to
+    the old one and swapped in atomically, so open Snapshot objects keep
+    reading the version they mapped. The version stamp is bumped only if
+    something changed.
+
+    Args:
+        path: Snapshot file path
+        partitions: Number of user_id ranges (changing it rebuilds everything)
+
+    Returns:
+        Dictionary with version, rows, refetched and reused range counts and seconds
+    """
+    _check_byteorder()
+    start = time.perf_counter()
+    previous = None
+    if os.path.exists(path):
+        try:
+            previous = Snapshot(path)
+        except (ValueError, OSError):
+            previous = None
+
+    db_manager = DatabaseManager()
+    try:
+        binary_ids = uses_binary_user_ids(db_manager.connect_to_prodev(pooled=True))
+    finally:
+        db_manager.close_connection()
+
+    ranges = user_id_ranges(partitions)
+    fingerprints = map_partitions(_range_fingerprint, partitions)
+    old_segments = {}
+    if previous is not None and len(previous.segments) == len(ranges):
+        old_segments = {(s['low'], s['high']): s for s in previous.segments}
+
+    overall = zlib.crc32(json.dumps(fingerprints).encode('utf-8'))
+    if previous is not None and previous.fingerprint == overall and old_segments:
+        stats = {'version': previous.version, 'rows': len(previous), 'refetched': 0,
+                 'reused': len(ranges), 'seconds': time.perf_counter() - start}
+        previous.close()
+        return stats
+
+    temp_path = f"{path}.tmp"
+    segments = []
+    refetched = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            out.write(SNAPSHOT_MAGIC)
+            for (low, high), fingerprint in zip(ranges, fingerprints):
+                old = old_segments.get((low, high))
+                if old is not None and old['fingerprint'] == fingerprint:
+                    segment = _copy_segment(out, previous, old)
+                else:
+                    segment = _write_fetched_segment(out, low, high, binary_ids)
+                    refetched += 1
+                segment.update(low=low, high=high, fingerprint=fingerprint)
+                segments.append(segment)
+
+            version = previous.version + 1 if previous is not None else 1
+            footer = json.dumps({
+                'version': version,
+                'byteorder': SNAPSHOT_BYTEORDER,
+                'fingerprint': overall,
+                'created_at': time.time(),
+                'columns': list(USER_COLUMNS),
+                'segments': segments,
+            }).encode('utf-8')
+            out.write(footer)
+            out.write(struct.pack('<Q', len(footer)))
+            out.write(SNAPSHOT_MAGIC)
+        os.replace(temp_path, path)
+    except BaseException:
+        # Do not leave a partial file behind
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+
+    rows = sum(segment['rows'] for segment in segments)
+    elapsed = time.perf_counter() - start
+    logger.info("Snapshot v%d: %d rows, %d of %d ranges refetched in %.2fs",
+                version, rows, refetched, len(ranges), elapsed)
+    return {'version': version, 'rows': rows, 'refetched': refetched,
+            'reused': len(ranges) - refetched, 'seconds': elapsed}
+
+
+def open_snapshot(path: str) -> Snapshot:
+    """
+    Maps an existing snapshot file for reading
+    """
+    return Snapshot(path)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the async generators in async_streams.py, run against the
+SQLite stand-in backend.
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import uuid
+
+import async_streams
+from seed import Where, col
+
+
+@unittest.skipIf(async_streams.aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncStreams(unittest.IsolatedAsyncioTestCase):
+    """Tests for the async streams over a SQLite user_data table."""
+
+    def setUp(self):
+        """Creates a user_data table with 120 users and installs the backend."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'users.db')
+        self.rows = sorted((str(uuid.UUID(int=i * 7919 << 64)), f"user {i}", f"user{i}@example.com", 18 + i % 50)
+                           for i in range(120))
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE user_data (user_id VARCHAR(36) PRIMARY KEY, name VARCHAR(255), "
+                     "email VARCHAR(255), age DECIMAL(3, 0))")
+        conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", self.rows)
+        conn.commit()
+        conn.close()
+        async_streams.use_backend(async_streams.SQLiteBackend(path))
+
+    async def asyncTearDown(self):
+        """Forgets the backend."""
+        await async_streams.close_backend()
+
+    async def test_astream_users(self):
+        """Test that every user is streamed as a dictionary."""
+        users = [user async for user in async_streams.astream_users()]
+        self.assertEqual(sorted(tuple(user.values()) for user in users), self.rows)
+        self.assertEqual(set(users[0]), {'user_id', 'name', 'email', 'age'})
+
+    async def test_astream_users_filtered(self):
+        """Test that pushed-down and Python filters are both applied."""
+        condition = (col('age') > 40) & Where(lambda user: user['name'].endswith('1'))
+        users = [user['name'] async for user in async_streams.astream_users(condition)]
+        expected = [row[1] for row in self.rows if row[3] > 40 and row[1].endswith('1')]
+        self.assertEqual(sorted(users), sorted(expected))
+
+    async def test_astream_users_in_batches(self):
+        """Test that batches have the requested size."""
+        sizes = [len(batch) async for batch in async_streams.astream_users_in_batches(50)]
+        self.assertEqual(sizes, [50, 50, 20])
+
+    async def test_alazy_paginate(self):
+        """Test that keyset pages cover the table in user_id order."""
+        pages = [page async for page in async_streams.alazy_paginate(40)]
+        self.assertEqual([len(page) for page in pages], [40, 40, 40])
+        self.assertEqual([user['user_id'] for page in pages for user in page], [row[0] for row in self.rows])
+
+    async def test_average_age(self):
+        """Test that the average matches the stored ages."""
+        average = await async_streams.acalculate_average_age()
+        self.assertAlmostEqual(average, sum(row[3] for row in self.rows) / len(self.rows))
+
+    async def test_concurrent_streams(self):
+        """Test that many streams can run on one event loop at once."""
+        averages = await asyncio.gather(*[async_streams.acalculate_average_age() for _ in range(20)])
+        self.assertEqual(len(set(averages)), 1)
+
+    async def test_early_close(self):
+        """Test that a stream closed early stops cleanly."""
+        users = async_streams.astream_users()
+        first = await users.__anext__()
+        await users.aclose()
+        self.assertIn(first['user_id'], {row[0] for row in self.rows})
+
+
+if __name__ == '__main__':
+    unittest.main()
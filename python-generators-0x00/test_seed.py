@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the database-independent helpers in seed.py.
+"""
+
+import io
+import threading
+import unittest
+from unittest.mock import Mock
+
+from mysql.connector import Error
+
+from seed import (AdaptiveBatchSizer, ColumnarWriter, ConnectionPool, Where, col,
+                  compile_filter, decode_cursor, encode_cursor, read_columnar)
+
+
+class TestPaginationCursor(unittest.TestCase):
+    """Tests for encode_cursor and decode_cursor."""
+
+    def test_round_trip(self):
+        """Test that a token decodes back to the user_id it encodes."""
+        user_id = '00c6e9a8-0f5e-4a4b-9b1e-3c0a4e1f2d3b'
+        token = encode_cursor(user_id)
+        self.assertNotIn('=', token)
+        self.assertEqual(decode_cursor(token), user_id)
+
+    def test_empty_token_starts_at_beginning(self):
+        """Test that None and '' mean the first page."""
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor(''))
+
+    def test_invalid_token(self):
+        """Test that malformed tokens raise ValueError."""
+        for token in ('not a token', encode_cursor('x')[:-3] + '!!!', 'e30'):
+            with self.assertRaises(ValueError):
+                decode_cursor(token)
+
+
+class TestCompileFilter(unittest.TestCase):
+    """Tests for compile_filter and the condition classes."""
+
+    def test_no_condition(self):
+        """Test that no condition compiles to an empty clause."""
+        self.assertEqual(compile_filter(None), ('', [], None))
+
+    def test_comparisons_are_pushed_down(self):
+        """Test that comparisons, ranges and lists become a WHERE clause."""
+        condition = (col('age') > 25) & col('age').between(30, 40) & col('email').isin(['a', 'b'])
+        where, params, residual = compile_filter(condition)
+        self.assertEqual(where, " WHERE (age > %s) AND (age BETWEEN %s AND %s) AND (email IN (%s, %s))")
+        self.assertEqual(params, [25, 30, 40, 'a', 'b'])
+        self.assertIsNone(residual)
+
+    def test_python_predicate_is_residual(self):
+        """Test that Where terms run in Python and the rest is pushed down."""
+        condition = (col('age') >= 18) & Where(lambda row: row['name'].startswith('A'))
+        where, params, residual = compile_filter(condition)
+        self.assertEqual((where, params), (" WHERE (age >= %s)", [18]))
+        self.assertTrue(residual({'name': 'Alice', 'age': 30}))
+        self.assertFalse(residual({'name': 'Bob', 'age': 30}))
+
+    def test_or_with_python_predicate_is_residual(self):
+        """Test that an OR is only pushed down if every branch can be."""
+        condition = (col('age') < 18) | Where(lambda row: row['age'] > 90)
+        where, params, residual = compile_filter(condition)
+        self.assertEqual((where, params), ('', []))
+        self.assertTrue(residual({'age': 10}))
+        self.assertTrue(residual({'age': 95}))
+        self.assertFalse(residual({'age': 50}))
+
+    def test_none_compiles_to_is_null(self):
+        """Test that comparing with None uses IS NULL like SQL."""
+        self.assertEqual(compile_filter(col('email') == None)[:2], (" WHERE (email IS NULL)", []))  # noqa: E711
+        self.assertEqual(compile_filter(col('email') != None)[:2], (" WHERE (email IS NOT NULL)", []))  # noqa: E711
+        self.assertTrue((col('email') == None).matches({'email': None}))  # noqa: E711
+        self.assertFalse((col('age') > 1).matches({'age': None}))
+
+    def test_empty_isin(self):
+        """Test that an empty list matches nothing."""
+        self.assertEqual(compile_filter(col('age').isin([]))[:2], (" WHERE (1 = 0)", []))
+
+    def test_binary_ids(self):
+        """Test that user_id parameters are converted for BINARY(16) ids."""
+        where, params, _ = compile_filter(col('user_id') > 'abc', binary_ids=True)
+        self.assertEqual((where, params), (" WHERE (user_id > UUID_TO_BIN(%s))", ['abc']))
+
+    def test_unknown_column(self):
+        """Test that unknown columns are rejected."""
+        with self.assertRaises(ValueError):
+            col('password')
+
+
+class TestAdaptiveBatchSizer(unittest.TestCase):
+    """Tests for AdaptiveBatchSizer."""
+
+    def test_grows_at_most_twice(self):
+        """Test that fast fetches double the size, no more."""
+        sizer = AdaptiveBatchSizer(initial=100)
+        self.assertEqual(sizer.record([(1, 'x')] * 100, 0.0001), 200)
+        self.assertEqual(sizer.record([(1, 'x')] * 200, 0.0002), 400)
+        self.assertEqual(sizer.sizes, [(0, 100), (1, 200), (2, 400)])
+
+    def test_shrinks_at_most_half(self):
+        """Test that slow fetches halve the size, no more."""
+        sizer = AdaptiveBatchSizer(initial=1000)
+        self.assertEqual(sizer.record([(1, 'x')] * 1000, 10.0), 500)
+
+    def test_memory_budget(self):
+        """Test that large rows keep the size within the memory budget."""
+        sizer = AdaptiveBatchSizer(initial=100, memory_budget=100_000, min_size=1)
+        row = ('x' * 10_000,)
+        for _ in range(10):
+            size = sizer.record([row] * sizer.size, 0.0)
+        self.assertLessEqual(size * 10_000, 100_000)
+
+    def test_bounds(self):
+        """Test that sizes stay within min_size and max_size."""
+        sizer = AdaptiveBatchSizer(initial=1, min_size=16, max_size=32)
+        self.assertEqual(sizer.size, 16)
+        for _ in range(5):
+            sizer.record([(1,)] * sizer.size, 0.0)
+        self.assertEqual(sizer.size, 32)
+
+    def test_empty_fetch(self):
+        """Test that an empty fetch changes nothing."""
+        sizer = AdaptiveBatchSizer(initial=100)
+        self.assertEqual(sizer.record([], 1.0), 100)
+        self.assertEqual(sizer.batches, 0)
+
+
+class TestColumnarFormat(unittest.TestCase):
+    """Tests for ColumnarWriter and read_columnar."""
+
+    def test_round_trip(self):
+        """Test that rows read back as per-column lists, one group at a time."""
+        rows = [(f"id-{i}", f"name {i} é", f"user{i}@example.com", 20 + i) for i in range(5)]
+        buffer = io.BytesIO()
+        writer = ColumnarWriter(buffer, group_rows=2)
+        for row in rows:
+            writer.write(row)
+        writer.close()
+
+        buffer.seek(0)
+        groups = list(read_columnar(buffer))
+        self.assertEqual([len(group['age']) for group in groups], [2, 2, 1])
+        read_back = [(user_id, name, email, age) for group in groups
+                     for user_id, name, email, age in zip(group['user_id'], group['name'],
+                                                          group['email'], group['age'])]
+        self.assertEqual(read_back, rows)
+
+    def test_bad_magic(self):
+        """Test that other files are rejected."""
+        with self.assertRaises(ValueError):
+            list(read_columnar(io.BytesIO(b'not columnar')))
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Tests for ConnectionPool with mock connections."""
+
+    def make_pool(self, **kwargs):
+        """Creates a pool whose factory returns new Mock connections."""
+        self.created = []
+
+        def factory():
+            connection = Mock(unread_result=False)
+            self.created.append(connection)
+            return connection
+
+        pool = ConnectionPool(factory, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuse(self):
+        """Test that released connections are handed out again after a rollback."""
+        pool = self.make_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        connection.rollback.assert_called_once()
+        self.assertEqual(len(self.created), 1)
+
+    def test_timeout(self):
+        """Test that acquire raises TimeoutError when the pool is exhausted."""
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+
+    def test_waiter_gets_released_connection(self):
+        """Test that a waiting thread gets a connection as soon as one is released."""
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection = pool.acquire()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+        waiter.start()
+        pool.release(connection)
+        waiter.join()
+        self.assertEqual(got, [connection])
+
+    def test_broken_connection_is_discarded(self):
+        """Test that a connection failing its rollback is closed, not reused."""
+        pool = self.make_pool()
+        connection = pool.acquire()
+        connection.rollback.side_effect = Error("lost connection")
+        pool.release(connection)
+        connection.close.assert_called_once()
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_stale_connection_is_pinged(self):
+        """Test that a connection idle past ping_after is replaced if the ping fails."""
+        pool = self.make_pool(ping_after=0)
+        connection = pool.acquire()
+        connection.ping.side_effect = Error("gone away")
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+        connection.close.assert_called_once()
+
+    def test_idle_connections_expire(self):
+        """Test that connections idle longer than max_idle are closed."""
+        pool = self.make_pool(max_idle=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+        connection.close.assert_called_once()
+
+    def test_release_after_close(self):
+        """Test that a connection released into a closed pool is closed."""
+        pool = self.make_pool()
+        connection = pool.acquire()
+        pool.close()
+        pool.release(connection)
+        connection.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
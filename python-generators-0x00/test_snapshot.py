@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the columnar snapshots in snapshot.py, with the MySQL
+range scans replaced by an in-memory table.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import uuid
+import zlib
+from unittest.mock import patch
+
+import snapshot
+from seed import col
+
+
+class FakeTable:
+    """In-memory user_data standing in for seed.scan_partition."""
+
+    def __init__(self, count):
+        generator = random.Random(7)
+        self.rows = sorted((str(uuid.UUID(int=generator.getrandbits(128))), f"user {i}",
+                            f"user{i}@example.com", 18 + i % 60) for i in range(count))
+        self.fail = False
+
+    def scan_partition(self, low, high, batch_size=1000, where=None, ordered=False,
+                       columns=None, dictionary=True):
+        """Yields the rows with low <= user_id < high like seed.scan_partition."""
+        if self.fail:
+            raise RuntimeError("connection lost")
+        rows = [row for row in self.rows
+                if (low is None or row[0] >= low) and (high is None or row[0] < high)]
+        if columns == snapshot._FINGERPRINT_COLUMNS:
+            checksum = 0
+            for row in rows:
+                checksum ^= zlib.crc32('\x1f'.join(map(str, row)).encode('utf-8'))
+            yield [(len(rows), checksum)]
+            return
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for refresh_snapshot and Snapshot."""
+
+    def setUp(self):
+        """Patches the MySQL access and creates a snapshot path."""
+        self.table = FakeTable(200)
+        for target, replacement in (('scan_partition', self.table.scan_partition),
+                                    ('uses_binary_user_ids', lambda connection: False),
+                                    ('DatabaseManager', unittest.mock.MagicMock)):
+            patcher = patch(f"snapshot.{target}", replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'users.snap')
+
+    def open(self):
+        """Opens the snapshot; it is closed when the test ends."""
+        opened = snapshot.open_snapshot(self.path)
+        self.addCleanup(opened.close)
+        return opened
+
+    def test_refresh_and_read(self):
+        """Test that a new snapshot holds every row in user_id order."""
+        stats = snapshot.refresh_snapshot(self.path, partitions=4)
+        self.assertEqual((stats['version'], stats['rows'], stats['refetched']), (1, 200, 4))
+        snap = self.open()
+        self.assertEqual(len(snap), 200)
+        self.assertEqual([tuple(row.values()) for row in snap.rows()], self.table.rows)
+        self.assertEqual(list(snap.column('email')), [row[2] for row in self.table.rows])
+        self.assertEqual(list(snap.column('age')), [row[3] for row in self.table.rows])
+
+    def test_filter_and_aggregate(self):
+        """Test that filters and aggregates match the source rows."""
+        snapshot.refresh_snapshot(self.path, partitions=4)
+        snap = self.open()
+        older = [row[0] for row in self.table.rows if row[3] > 60]
+        self.assertEqual([row['user_id'] for row in snap.rows(col('age') > 60)], older)
+        named = snap.rows(col('name') == 'user 3')
+        self.assertEqual([row['name'] for row in named], ['user 3'])
+        ages = sorted(row[3] for row in self.table.rows)
+        stats = snap.aggregate_ages(percentiles=[50])
+        self.assertEqual((stats['count'], stats['min'], stats['max']), (200, ages[0], ages[-1]))
+        self.assertAlmostEqual(stats['average'], sum(ages) / len(ages))
+        self.assertEqual(stats['percentiles'][50], ages[99])
+
+    def test_unchanged_refresh_reuses_everything(self):
+        """Test that refreshing an unchanged table keeps the version."""
+        snapshot.refresh_snapshot(self.path, partitions=4)
+        stats = snapshot.refresh_snapshot(self.path, partitions=4)
+        self.assertEqual((stats['version'], stats['refetched'], stats['reused']), (1, 0, 4))
+
+    def test_changed_range_is_refetched(self):
+        """Test that only the range holding a changed row is fetched again."""
+        snapshot.refresh_snapshot(self.path, partitions=4)
+        user_id, name, email, age = self.table.rows[0]
+        self.table.rows[0] = (user_id, 'renamed', email, age)
+        stats = snapshot.refresh_snapshot(self.path, partitions=4)
+        self.assertEqual((stats['version'], stats['refetched'], stats['reused']), (2, 1, 3))
+        snap = self.open()
+        self.assertEqual(next(snap.rows())['name'], 'renamed')
+        self.assertEqual([tuple(row.values()) for row in snap.rows()], self.table.rows)
+
+    def test_failed_refresh_keeps_old_snapshot(self):
+        """Test that a failed refresh removes its temporary file."""
+        snapshot.refresh_snapshot(self.path, partitions=4)
+        self.table.rows.append((str(uuid.uuid4()), 'new', 'new@example.com', 30))
+        with patch('snapshot._write_fetched_segment', side_effect=RuntimeError("connection lost")):
+            with self.assertRaises(RuntimeError):
+                snapshot.refresh_snapshot(self.path, partitions=4)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+        self.assertEqual(self.open().version, 1)
+
+    def test_close_with_suspended_generator(self):
+        """Test that closing does not break a generator that is still running."""
+        snapshot.refresh_snapshot(self.path, partitions=4)
+        snap = snapshot.open_snapshot(self.path)
+        rows = snap.rows()
+        first = next(rows)
+        snap.close()
+        snap.close()
+        self.assertEqual([first] + list(rows), [dict(zip(('user_id', 'name', 'email', 'age'), row))
+                                                for row in self.table.rows])
+
+    def test_not_a_snapshot(self):
+        """Test that other files are rejected."""
+        with open(self.path, 'wb') as out:
+            out.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            snapshot.open_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()